@@ -4,6 +4,8 @@ import streamlit as st
 from dotenv import load_dotenv
 
 from core.logic import JDWorker, Configurations
+from core.batch import load_jd_bytes
+from core.jobs import JobQueue
 
 load_dotenv()
 
@@ -24,6 +26,11 @@ MODEL_OPTIONS = {
     ],
 }
 
+# --- One background job queue shared by every session ---
+@st.cache_resource
+def get_job_queue() -> JobQueue:
+    return JobQueue(max_workers=16)
+
 # --- Keep one worker instance in session ---
 if "worker" not in st.session_state:
     st.session_state.worker = JDWorker(Configurations())
@@ -61,9 +68,37 @@ with st.sidebar:
     )
     worker.set_reasoning(reasoning)
 
-    sys_prompt = st.text_area("System prompt (optional)", value=worker.config.system_prompt, height=140)
+    sys_prompt = st.text_area(
+        "System prompt (optional)", value=worker.config.system_prompt, height=140,
+        help="Leave empty to use the built-in prompt with the current vocabulary",
+    )
     worker.set_system_prompt(sys_prompt)
 
+    vocab_budget = st.number_input(
+        "Vocab token budget (0 = send full vocab)",
+        min_value=0, value=worker.config.vocab_budget or 0, step=100,
+        help="Only vocabulary entries found in the JD are sent, up to this many prompt tokens",
+    )
+    worker.set_vocab_budget(int(vocab_budget) or None)
+
+    prune = st.checkbox(
+        "Strip JD boilerplate", value=worker.config.prune_jd,
+        help="Drop job-board buttons, EEO, salary and benefits sections before sending",
+    )
+    worker.set_prune_jd(prune)
+
+    structured = st.checkbox(
+        "Structured output (JSON schema)", value=worker.config.structured_output,
+        help="Let the provider enforce the record schema instead of prompting for it",
+    )
+    worker.set_structured_output(structured)
+
+    compact = st.checkbox(
+        "Compact output encoding", value=worker.config.compact_output,
+        help="Ask for short positional skill arrays (fewer output tokens); expanded to the usual record",
+    )
+    worker.set_compact_output(compact)
+
     st.markdown("---")
     st.header("API Keys")
 
@@ -96,9 +131,24 @@ col_gen, col_save = st.columns(2)
 
 with col_gen:
     st.subheader("2) Generate JSON")
+    stream = st.checkbox("Stream (show skills as they arrive)", value=True)
     if st.button("Generate", type="primary", use_container_width=True, disabled=not jd_text.strip()):
         try:
-            ai_text = worker.generate(jd_text)
+            if stream:
+                live = st.empty()
+                found = {"required": [], "preferred": []}
+
+                def show(event):
+                    if event[0] == "skill":
+                        found[event[1]].append(event[2].get("name", ""))
+                        live.markdown(
+                            f"**Required:** {', '.join(found['required']) or '...'}  \n"
+                            f"**Preferred:** {', '.join(found['preferred']) or '...'}"
+                        )
+
+                ai_text = worker.generate_stream(jd_text, on_event=show)
+            else:
+                ai_text = worker.generate(jd_text)
             st.session_state["ai_text"] = ai_text
             st.success("Generated. You can edit the JSON below before saving.")
         except Exception as e:
@@ -113,9 +163,53 @@ with col_save:
     save_path = st.text_input("JSONL Path", value="data/extracted_skills.jsonl")
     if st.button("Save to JSONL", use_container_width=True, disabled=not (ai_text_box.strip() and save_path.strip())):
         try:
-            worker.save(ai_text_box, save_path)
+            worker.save(ai_text_box, save_path, jd_text=jd_text or None)
             st.success(f"Saved to: {save_path}")
         except Exception as e:
             st.error(f"Save failed: {e}")
 
+# --- Bulk: upload many JDs -> background jobs -> JSONL ---
+st.markdown("---")
+st.subheader("Bulk Extraction")
+queue = get_job_queue()
+uploads = st.file_uploader(
+    "JD files (.jsonl / .csv / .txt / .md, or a .zip of them)",
+    type=["jsonl", "csv", "txt", "md", "zip"], accept_multiple_files=True,
+)
+col_path, col_tries = st.columns([3, 1])
+bulk_path = col_path.text_input("Output JSONL Path", value="data/extracted_skills.jsonl", key="bulk_path")
+max_attempts = col_tries.number_input("Attempts per JD", min_value=1, max_value=10, value=3)
+if st.button("Queue JDs", disabled=not (uploads and bulk_path.strip())):
+    try:
+        jds = [item for f in uploads for item in load_jd_bytes(f.name, f.getvalue())]
+        job = queue.submit(worker, jds, bulk_path.strip(), max_attempts=int(max_attempts))
+        st.session_state.setdefault("job_ids", []).append(job.id)
+        st.success(f"Queued {len(job.items)} JDs as job {job.id}.")
+    except Exception as e:
+        st.error(f"Could not queue: {e}")
+
+@st.fragment(run_every=2)
+def show_jobs():
+    # reruns on its own timer, so the rest of the page stays interactive
+    for job_id in reversed(st.session_state.get("job_ids", [])):
+        job = queue.get(job_id)
+        if job is None:
+            continue
+        c = job.counts()
+        state = "done" if job.done else ("cancelling" if job.cancelled else "running")
+        with st.expander(f"Job {job.id} -> {job.out_path} ({state})", expanded=not job.done):
+            st.progress(job.progress, text=(
+                f"{c['ok']} ok, {c['failed']} failed, {c['running'] + c['retrying']} running, "
+                f"{c['queued']} queued, {c['cancelled']} cancelled of {len(job.items)}"
+            ))
+            if not job.done and st.button("Cancel", key=f"cancel_{job.id}"):
+                queue.cancel(job.id)
+            st.dataframe(
+                [{"id": it.id, "status": it.status, "attempts": it.attempts,
+                  "seconds": round(it.seconds, 1), "error": it.error or ""} for it in job.items],
+                use_container_width=True, hide_index=True,
+            )
+
+show_jobs()
+
 st.caption("Notes: Use the sidebar to switch provider and model. Edit MODEL_OPTIONS at the top to change dropdown choices.")
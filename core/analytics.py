@@ -0,0 +1,221 @@
+# core/analytics.py
+import argparse
+import json
+import os
+import re
+import sys
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+from .vocab import get_store, DEFAULT_PATH
+from .schema import RECORD_SCHEMA
+
+BUCKETS = ["required", "preferred"]
+_SKILL_PROPS = RECORD_SCHEMA["properties"]["skills"]["properties"]["required"]["items"]["properties"]
+CATEGORIES = _SKILL_PROPS["category"]["enum"]
+LEVELS = _SKILL_PROPS["level"]["enum"]
+MAX_YEARS = 30  # ">=Ny" above this lands in the last histogram bin
+_YEARS_RE = re.compile(r"(\d+)")
+
+_PAIR_SHIFT = np.int64(1 << 31)  # pair code = a * 2^31 + b with a < b
+_CAT_INDEX = {c: i for i, c in enumerate(CATEGORIES)}
+_LVL_INDEX = {c: i for i, c in enumerate(LEVELS)}
+_TRIU: Dict[int, tuple] = {}
+
+
+def _years(value: Any) -> int:
+    """Histogram bin of a ">=Ny" value, or -1 when no number is given."""
+    m = _YEARS_RE.search(value) if isinstance(value, str) else None
+    return min(int(m.group(1)), MAX_YEARS) if m else -1
+
+def _triu(k: int) -> tuple:
+    pair = _TRIU.get(k)
+    if pair is None:
+        pair = _TRIU[k] = np.triu_indices(k, k=1)
+    return pair
+
+
+class SkillAnalytics:
+    """
+    Streaming aggregates over extracted records. Skills are integer-encoded (vocab order
+    first, unseen skills appended), per-skill counts live in growable NumPy arrays, and
+    co-occurring pairs are counted in batches with np.unique over encoded pair ids.
+    """
+
+    def __init__(self, vocab_path: str = DEFAULT_PATH, batch_size: int = 4096):
+        self.names: List[str] = list(get_store(vocab_path).terms("skills"))
+        self.ids: Dict[str, int] = {n: i for i, n in enumerate(self.names)}
+        cap = max(1024, len(self.names))
+        self.by_bucket = np.zeros((cap, len(BUCKETS)), dtype=np.int64)
+        self.by_category = np.zeros((cap, len(CATEGORIES) + 1), dtype=np.int64)  # last col: other
+        self.by_level = np.zeros((cap, len(LEVELS) + 1), dtype=np.int64)
+        self.years = np.zeros((len(BUCKETS), MAX_YEARS + 1), dtype=np.int64)
+        self.records = 0
+
+        self.batch_size = int(batch_size)
+        self._rows: List[tuple] = []                    # (skill id, bucket, category, level, years)
+        self._batch: List[List[int]] = []               # deduped skill ids per record
+        self.pair_codes = np.zeros(0, dtype=np.int64)   # sorted, unique
+        self.pair_counts = np.zeros(0, dtype=np.int64)
+        self._offsets: Dict[str, int] = {}              # bytes consumed per JSONL file
+
+    # ------ Encoding ------
+    def _id(self, name: str) -> int:
+        sid = self.ids.get(name)
+        if sid is None:
+            sid = self.ids[name] = len(self.names)
+            self.names.append(name)
+            if sid >= self.by_bucket.shape[0]:
+                self._grow(2 * self.by_bucket.shape[0])
+        return sid
+
+    def _grow(self, cap: int) -> None:
+        for attr in ("by_bucket", "by_category", "by_level"):
+            old = getattr(self, attr)
+            new = np.zeros((cap, old.shape[1]), dtype=old.dtype)
+            new[:old.shape[0]] = old
+            setattr(self, attr, new)
+
+    # ------ Updates ------
+    def update(self, record: Dict[str, Any]) -> None:
+        """Queue one record; counts are applied in vectorized batches."""
+        skills = record.get("skills") or {}
+        ids = []
+        for b, bucket in enumerate(BUCKETS):
+            for it in skills.get(bucket) or []:
+                name = ((it or {}).get("name") or "").strip().lower()
+                if not name:
+                    continue
+                sid = self._id(name)
+                ids.append(sid)
+                self._rows.append((
+                    sid, b,
+                    _CAT_INDEX.get(it.get("category"), len(CATEGORIES)),
+                    _LVL_INDEX.get(it.get("level"), len(LEVELS)),
+                    _years(it.get("years")),
+                ))
+        self.records += 1
+        if len(ids) > 1:
+            self._batch.append(sorted(set(ids)))
+        if self.records % self.batch_size == 0:
+            self._flush()
+
+    def _flush(self) -> None:
+        if self._rows:
+            sid, b, cat, lvl, yrs = (np.asarray(col, dtype=np.int64) for col in zip(*self._rows))
+            self._rows = []
+            np.add.at(self.by_bucket, (sid, b), 1)
+            np.add.at(self.by_category, (sid, cat), 1)
+            np.add.at(self.by_level, (sid, lvl), 1)
+            has = yrs >= 0
+            np.add.at(self.years, (b[has], yrs[has]), 1)
+        if self._batch:
+            self._flush_pairs()
+
+    def _flush_pairs(self) -> None:
+        codes = []
+        for ids in self._batch:
+            a, b = _triu(len(ids))
+            arr = np.asarray(ids, dtype=np.int64)
+            codes.append(arr[a] * _PAIR_SHIFT + arr[b])
+        self._batch = []
+        batch_codes, batch_counts = np.unique(np.concatenate(codes), return_counts=True)
+        # merge with the running totals: both sides are sorted unique code arrays
+        merged = np.concatenate([self.pair_codes, batch_codes])
+        counts = np.concatenate([self.pair_counts, batch_counts])
+        self.pair_codes, inverse = np.unique(merged, return_inverse=True)
+        self.pair_counts = np.bincount(inverse, weights=counts, minlength=len(self.pair_codes)).astype(np.int64)
+
+    def consume(self, records: Iterable[Dict[str, Any]]) -> None:
+        for rec in records:
+            self.update(rec)
+        self._flush()
+
+    def consume_jsonl(self, path: str) -> int:
+        """Read records appended to `path` since the last call; returns how many were read."""
+        start = self._offsets.get(path, 0)
+        if os.path.exists(path) and os.path.getsize(path) < start:
+            start = 0  # file was truncated / replaced
+        n = 0
+        with open(path, "rb") as f:
+            f.seek(start)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # partially written last line; pick it up next time
+                start += len(line)
+                if line.strip():
+                    self.update(json.loads(line))
+                    n += 1
+        self._offsets[path] = start
+        self._flush()
+        return n
+
+    # ------ Results ------
+    def top_skills(self, top: int = 20, bucket: Optional[str] = None) -> List[tuple]:
+        self._flush()
+        n = len(self.names)
+        counts = self.by_bucket[:n].sum(axis=1) if bucket is None else self.by_bucket[:n, BUCKETS.index(bucket)]
+        order = np.argsort(-counts, kind="stable")[:top]
+        return [(self.names[i], int(counts[i])) for i in order if counts[i] > 0]
+
+    def top_pairs(self, top: int = 20) -> List[tuple]:
+        self._flush()
+        order = np.argsort(-self.pair_counts, kind="stable")[:top]
+        a, b = np.divmod(self.pair_codes[order], _PAIR_SHIFT)
+        return [(self.names[i], self.names[j], int(c)) for i, j, c in zip(a, b, self.pair_counts[order])]
+
+    def cooccurrence_matrix(self, top: int = 50):
+        """(names, dense symmetric matrix) restricted to the `top` most frequent skills."""
+        self._flush()
+        names = [n for n, _ in self.top_skills(top)]
+        ids = np.array([self.ids[n] for n in names], dtype=np.int64)
+        pos = {int(s): k for k, s in enumerate(ids)}
+        mat = np.zeros((len(ids), len(ids)), dtype=np.int64)
+        a, b = np.divmod(self.pair_codes, _PAIR_SHIFT)
+        keep = np.isin(a, ids) & np.isin(b, ids)
+        for i, j, c in zip(a[keep], b[keep], self.pair_counts[keep]):
+            mat[pos[int(i)], pos[int(j)]] = mat[pos[int(j)], pos[int(i)]] = c
+        return names, mat
+
+    def report(self, top: int = 20) -> Dict[str, Any]:
+        self._flush()
+        n = len(self.names)
+        cat_totals = self.by_category[:n].sum(axis=0)
+        lvl_totals = self.by_level[:n].sum(axis=0)
+        return {
+            "records": self.records,
+            "distinct_skills": int((self.by_bucket[:n].sum(axis=1) > 0).sum()),
+            "top_skills": self.top_skills(top),
+            "top_required": self.top_skills(top, "required"),
+            "top_preferred": self.top_skills(top, "preferred"),
+            "categories": dict(zip(CATEGORIES + ["other"], cat_totals.tolist())),
+            "levels": dict(zip(LEVELS + ["other"], lvl_totals.tolist())),
+            "years": {
+                bucket: {str(y) if y < MAX_YEARS else f"{MAX_YEARS}+": int(c)
+                         for y, c in enumerate(self.years[b]) if c}
+                for b, bucket in enumerate(BUCKETS)
+            },
+            "top_pairs": self.top_pairs(top),
+        }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Skill statistics over extracted records.")
+    parser.add_argument("source", help="extracted JSONL file or RecordStore directory")
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--vocab", default=DEFAULT_PATH)
+    args = parser.parse_args(argv)
+
+    stats = SkillAnalytics(args.vocab)
+    if os.path.isdir(args.source):
+        from .recordstore import RecordStore
+        stats.consume(RecordStore(args.source).iter_records())
+    else:
+        stats.consume_jsonl(args.source)
+    print(json.dumps(stats.report(args.top), ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
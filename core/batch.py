@@ -0,0 +1,423 @@
+# core/batch.py
+import argparse
+import asyncio
+import contextlib
+import csv
+import io
+import json
+import os
+import sys
+import time
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Callable, Iterable, Iterator, List, Optional, Union
+
+from .logic import JDWorker, Configurations
+from .storage import JsonlBuffer, save_to_jsonl, save_to_store
+from .recordstore import RecordStore, jd_hash
+from .cascade import parse_cascade
+from .packing import pack
+from .provenance import reused
+from .filesync import FSYNC_POLICIES, set_fsync_policy
+from .metrics import METRICS, profile
+
+if TYPE_CHECKING:  # numpy-backed; imported only when --dedupe / a NearDupIndex is used
+    from .dedupe import NearDupIndex
+
+# field names tried (in order) when a JSONL/CSV row holds the JD text
+TEXT_KEYS = ("jd", "jd_text", "text", "description", "job_description")
+ID_KEYS = ("id", "jd_id", "job_id", "url")
+TEXT_EXTS = (".txt", ".md")
+
+
+@dataclass
+class JDItem:
+    id: str
+    text: str
+
+
+@dataclass
+class BatchStats:
+    total: int = 0
+    ok: int = 0
+    failed: int = 0
+    skipped: int = 0          # already present in the RecordStore
+    reused: int = 0           # saved from a near-duplicate JD's output, no model call
+    seconds: float = 0.0
+    errors: List[dict] = field(default_factory=list)
+
+
+# ------ Input loading ------
+def _item_from_row(row: Any, fallback_id: str) -> Optional[JDItem]:
+    if isinstance(row, JDItem):
+        return row
+    if isinstance(row, str):
+        return JDItem(fallback_id, row) if row.strip() else None
+    if isinstance(row, dict):
+        text = next((row[k] for k in TEXT_KEYS if row.get(k)), None)
+        if not text or not str(text).strip():
+            return None
+        jd_id = next((str(row[k]) for k in ID_KEYS if row.get(k)), fallback_id)
+        return JDItem(jd_id, str(text))
+    raise TypeError(f"Unsupported JD row type: {type(row).__name__}")
+
+def _iter_stream(name: str, ext: str, f) -> Iterator[JDItem]:
+    if ext == ".jsonl":
+        for i, line in enumerate(f):
+            if not line.strip():
+                continue
+            item = _item_from_row(json.loads(line), f"{name}:{i}")
+            if item:
+                yield item
+    elif ext == ".csv":
+        for i, row in enumerate(csv.DictReader(f)):
+            item = _item_from_row(row, f"{name}:{i}")
+            if item:
+                yield item
+    elif ext in TEXT_EXTS:
+        item = _item_from_row(f.read(), name)
+        if item:
+            yield item
+    else:
+        raise ValueError(f"Unsupported JD file type: {name}")
+
+def _iter_file(path: str) -> Iterator[JDItem]:
+    ext = os.path.splitext(path)[1].lower()
+    with open(path, "r", encoding="utf-8", newline="" if ext == ".csv" else None) as f:
+        yield from _iter_stream(os.path.basename(path), ext, f)
+
+def load_jd_bytes(name: str, data: bytes) -> Iterator[JDItem]:
+    """JDItems from an in-memory .jsonl/.csv/.txt/.md file or a .zip of such files (e.g. an upload)."""
+    ext = os.path.splitext(name)[1].lower()
+    if ext == ".zip":
+        with zipfile.ZipFile(io.BytesIO(data)) as zf:
+            for member in sorted(zf.namelist()):
+                mext = os.path.splitext(member)[1].lower()
+                if not member.endswith("/") and mext in (".jsonl", ".csv") + TEXT_EXTS:
+                    yield from load_jd_bytes(member, zf.read(member))
+        return
+    text = data.decode("utf-8-sig")
+    yield from _iter_stream(os.path.basename(name), ext, io.StringIO(text, newline="" if ext == ".csv" else None))
+
+def load_jds(source: Union[str, Iterable[Any]]) -> Iterator[JDItem]:
+    """
+    Yield JDItems from a .jsonl/.csv/.txt file, a directory of such files,
+    or an iterable of strings / dicts / JDItems.
+    """
+    if isinstance(source, str):
+        if os.path.isdir(source):
+            for entry in sorted(os.listdir(source)):
+                p = os.path.join(source, entry)
+                ext = os.path.splitext(entry)[1].lower()
+                if os.path.isfile(p) and ext in (".jsonl", ".csv") + TEXT_EXTS:
+                    yield from _iter_file(p)
+        else:
+            yield from _iter_file(source)
+        return
+    for i, row in enumerate(source):
+        item = _item_from_row(row, str(i))
+        if item:
+            yield item
+
+
+# ------ Batch runner ------
+def iter_batch(
+    worker: JDWorker,
+    jds: Iterable[Any],
+    concurrency: int = 8,
+    pack_tokens: Optional[int] = None,
+) -> Iterator[tuple]:
+    """
+    Run worker.generate over jds with at most `concurrency` calls in flight.
+    With pack_tokens, consecutive short JDs share one request (JDWorker.generate_packed).
+    Yields (JDItem, text, error) in completion order; one of text/error is None.
+    """
+    concurrency = max(1, int(concurrency))
+    items = iter(load_jds(jds))
+    groups = pack(items, pack_tokens) if pack_tokens else ([item] for item in items)
+
+    def run(group: List[JDItem]) -> List[tuple]:
+        if len(group) > 1:
+            return worker.generate_packed([item.text for item in group])
+        try:
+            return [(worker.generate(group[0].text), None)]
+        except Exception as e:
+            return [(None, e)]
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        pending = {}
+
+        def fill():
+            # bounded submission: never materialize the whole input
+            while len(pending) < concurrency:
+                group = next(groups, None)
+                if group is None:
+                    return
+                pending[pool.submit(run, group)] = group
+
+        fill()
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in done:
+                group = pending.pop(fut)
+                for item, (text, err) in zip(group, fut.result()):
+                    yield item, text, err
+            fill()
+
+Output = Union[str, RecordStore, JsonlBuffer]
+
+def _open_output(out: Output) -> Output:
+    # a JSONL path is written through a buffer, so records and their vocab terms are group-committed
+    return JsonlBuffer(out) if isinstance(out, str) else out
+
+def _todo(
+    worker: JDWorker,
+    jds: Iterable[Any],
+    out: Output,
+    stats: BatchStats,
+    dedupe: Optional["NearDupIndex"] = None,
+    on_result=None,
+) -> Iterator[JDItem]:
+    # a RecordStore knows which JDs were already extracted
+    for item in load_jds(jds):
+        if isinstance(out, RecordStore) and jd_hash(item.text) in out:
+            stats.skipped += 1
+            continue
+        dup = dedupe.reuse(item.text) if dedupe is not None else None
+        if dup is not None:
+            stats.reused += 1
+            stamp = reused(item.text, dup.key, dup.similarity, dup.provenance)
+            _record(worker, stats, item, dup.text, None, out, on_result, stamp=stamp)
+            continue
+        yield item
+
+def _record(worker: JDWorker, stats: BatchStats, item: JDItem, text, err, out: Output, on_result,
+            dedupe: Optional["NearDupIndex"] = None, stamp: Optional[dict] = None) -> None:
+    stats.total += 1
+    if err is None:
+        try:
+            stamp = stamp or worker.provenance(item.text)
+            if isinstance(out, RecordStore):
+                save_to_store(text, out, jd_text=item.text, provenance=stamp)
+            elif isinstance(out, JsonlBuffer):
+                out.add(text, provenance=stamp)
+            else:
+                save_to_jsonl(text, out, provenance=stamp)
+            if dedupe is not None:
+                dedupe.add(item.text, text, stamp)
+        except Exception as e:
+            err = e
+    if err is None:
+        stats.ok += 1
+    else:
+        stats.failed += 1
+        stats.errors.append({"id": item.id, "error": str(err)})
+    if on_result:
+        on_result(item, text, err)
+
+def run_batch(
+    worker: JDWorker,
+    jds: Iterable[Any],
+    out: Output,
+    concurrency: int = 8,
+    on_result: Optional[Callable[[JDItem, Optional[str], Optional[Exception]], None]] = None,
+    dedupe: Optional["NearDupIndex"] = None,
+    pack_tokens: Optional[int] = None,
+) -> BatchStats:
+    """
+    Extract every JD and save each result as soon as it finishes, to a JSONL path or a
+    RecordStore (which also skips JDs it already holds). With a NearDupIndex, JDs that are
+    near-duplicates of an already extracted one reuse its output instead of calling the model.
+    With pack_tokens, short JDs are sent several to a request (see iter_batch).
+    """
+    stats = BatchStats()
+    t0 = time.perf_counter()
+    out = _open_output(out)
+    # results are consumed on this thread only, so saves never interleave
+    try:
+        todo = _todo(worker, jds, out, stats, dedupe, on_result)
+        for item, text, err in iter_batch(worker, todo, concurrency, pack_tokens):
+            _record(worker, stats, item, text, err, out, on_result, dedupe)
+    finally:
+        out.flush()
+    stats.seconds = time.perf_counter() - t0
+    return stats
+
+async def arun_batch(
+    worker: JDWorker,
+    jds: Iterable[Any],
+    out: Output,
+    concurrency: int = 32,
+    on_result: Optional[Callable[[JDItem, Optional[str], Optional[Exception]], None]] = None,
+    dedupe: Optional["NearDupIndex"] = None,
+    pack_tokens: Optional[int] = None,
+) -> BatchStats:
+    """Like run_batch, but drives worker.agenerate on one event loop instead of a thread pool."""
+    stats = BatchStats()
+    t0 = time.perf_counter()
+    concurrency = max(1, int(concurrency))
+    out = _open_output(out)
+    items = _todo(worker, jds, out, stats, dedupe, on_result)
+    groups = pack(items, pack_tokens) if pack_tokens else ([item] for item in items)
+    pending = {}
+
+    async def run(group: List[JDItem]) -> List[tuple]:
+        if len(group) > 1:
+            return await worker.agenerate_packed([item.text for item in group])
+        try:
+            return [(await worker.agenerate(group[0].text), None)]
+        except Exception as e:
+            return [(None, e)]
+
+    def fill():
+        while len(pending) < concurrency:
+            group = next(groups, None)
+            if group is None:
+                return
+            pending[asyncio.ensure_future(run(group))] = group
+
+    try:
+        fill()
+        while pending:
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                group = pending.pop(task)
+                for item, (text, err) in zip(group, task.result()):
+                    _record(worker, stats, item, text, err, out, on_result, dedupe)
+            fill()
+    finally:
+        out.flush()
+
+    stats.seconds = time.perf_counter() - t0
+    return stats
+
+
+# ------ CLI ------
+def add_config_args(parser: argparse.ArgumentParser) -> None:
+    """Arguments that map onto Configurations (shared with core.reextract)."""
+    parser.add_argument("--provider", default="openai", choices=["openai", "gemini"])
+    parser.add_argument("--model", default=None)
+    parser.add_argument("--temperature", type=float, default=0.0)
+    parser.add_argument("--reasoning", default="low",
+                        choices=["low", "medium", "high", "minimal", "dynamic"])
+    parser.add_argument("--cache", default=None, metavar="PATH",
+                        help="SQLite response cache (e.g. data/llm_cache.sqlite)")
+    parser.add_argument("--vocab-budget", type=int, default=None, metavar="TOKENS",
+                        help="send only JD-relevant vocab, capped at TOKENS prompt tokens")
+    parser.add_argument("--prune", action="store_true",
+                        help="drop job-board chrome and EEO/salary/benefits sections before prompting")
+    parser.add_argument("--chunk-tokens", type=int, default=None, metavar="TOKENS",
+                        help="split JDs longer than TOKENS on sections and extract the chunks in parallel")
+    parser.add_argument("--rpm", type=int, default=None, help="requests-per-minute quota for the model")
+    parser.add_argument("--tpm", type=int, default=None, help="tokens-per-minute quota for the model")
+    parser.add_argument("--structured", action="store_true",
+                        help="use the provider's JSON-schema output mode")
+    parser.add_argument("--compact", action="store_true",
+                        help="ask for the compact wire encoding (positional skill arrays, one-letter codes) "
+                             "to cut output tokens; expanded to the usual record before saving")
+    parser.add_argument("--cascade", default=None, metavar="STEPS",
+                        help="cheapest model first, e.g. gemini:gemini-2.5-flash:minimal,openai:gpt-5:low; "
+                             "escalates on invalid output, too few skills or disagreement with the vocab")
+    parser.add_argument("--hedge", default=None, metavar="STEP",
+                        help="secondary provider:model[:reasoning] raced against the primary once it is slower "
+                             "than --hedge-quantile of its recent calls, or fails; with --cascade each step is hedged")
+    parser.add_argument("--hedge-quantile", type=float, default=0.95,
+                        help="primary latency percentile used as the hedging deadline")
+    parser.add_argument("--local", action="store_true",
+                        help="fast mode: match vocab terms locally (core.prepass) instead of calling a model")
+
+def config_from_args(args: argparse.Namespace) -> Configurations:
+    return Configurations(
+        provider=args.provider,
+        model=args.model or ("gpt-5" if args.provider == "openai" else "gemini-2.5-flash"),
+        temperature=args.temperature,
+        reasoning_effort=args.reasoning,
+        cache_path=args.cache,
+        vocab_budget=args.vocab_budget,
+        prune_jd=args.prune,
+        chunk_tokens=args.chunk_tokens,
+        rpm=args.rpm,
+        tpm=args.tpm,
+        structured_output=args.structured,
+        compact_output=args.compact,
+        cascade=parse_cascade(args.cascade) or None,
+        hedge=(parse_cascade(args.hedge) or [None])[0],
+        hedge_quantile=args.hedge_quantile,
+        local_only=args.local,
+    )
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Batch-extract skills from many JDs.")
+    parser.add_argument("source", help=".jsonl / .csv / .txt file, or a directory of them")
+    parser.add_argument("--out", default="data/extracted_skills.jsonl", help="JSONL output path")
+    parser.add_argument("--store", default=None, metavar="DIR",
+                        help="write to a segmented RecordStore instead of --out; JDs already stored are skipped")
+    parser.add_argument("--compression", default=None, choices=["gzip", "zstd"],
+                        help="compress RecordStore segments")
+    parser.add_argument("--segment-mb", type=int, default=256, help="RecordStore segment size")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--pack-tokens", type=int, default=None, metavar="TOKENS",
+                        help="send several short JDs per request, up to TOKENS of JD text, to amortize the system prompt")
+    add_config_args(parser)
+    parser.add_argument("--dedupe", default=None, metavar="PATH",
+                        help="near-duplicate JD index (e.g. data/neardup.sqlite); near-duplicates reuse the earlier output")
+    parser.add_argument("--dedupe-threshold", type=float, default=0.8,
+                        help="estimated Jaccard similarity at which two JDs count as near-duplicates")
+    parser.add_argument("--fsync", default="interval", choices=list(FSYNC_POLICIES),
+                        help="when group-committed JSONL / vocab journal writes are fsynced")
+    parser.add_argument("--metrics-log", default=None, metavar="PATH",
+                        help="append per-stage spans and per-call token usage / cost to a JSONL file")
+    parser.add_argument("--metrics-port", type=int, default=None, metavar="PORT",
+                        help="serve Prometheus metrics at http://127.0.0.1:PORT/metrics while running")
+    parser.add_argument("--profile", default=None, metavar="PATH",
+                        help="cProfile the run and dump stats to PATH")
+    parser.add_argument("--async", dest="use_async", action="store_true",
+                        help="use the async SDK clients on one event loop instead of threads")
+    args = parser.parse_args(argv)
+
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    config = config_from_args(args)
+    worker = JDWorker(config)
+
+    def report(item, text, err):
+        status = "ok" if err is None else f"FAILED: {err}"
+        print(f"[{item.id}] {status}", file=sys.stderr)
+
+    out: Output = args.out
+    if args.store:
+        out = RecordStore(args.store, segment_bytes=args.segment_mb * 1024 * 1024,
+                          compression=args.compression)
+    dedupe = None
+    if args.dedupe:
+        from .dedupe import NearDupIndex
+        dedupe = NearDupIndex(args.dedupe, threshold=args.dedupe_threshold)
+    set_fsync_policy(args.fsync)
+    METRICS.set_log(args.metrics_log)
+    if args.metrics_port:
+        METRICS.serve(args.metrics_port)
+    with (profile(args.profile) if args.profile else contextlib.nullcontext()):
+        if args.use_async:
+            stats = asyncio.run(arun_batch(worker, args.source, out, args.concurrency, on_result=report,
+                                           dedupe=dedupe, pack_tokens=args.pack_tokens))
+        else:
+            stats = run_batch(worker, args.source, out, args.concurrency, on_result=report,
+                              dedupe=dedupe, pack_tokens=args.pack_tokens)
+    print(f"[INFO] {stats.ok}/{stats.total} saved to {args.store or args.out} "
+          f"({stats.failed} failed, {stats.skipped} already stored, {stats.reused} near-duplicates reused) "
+          f"in {stats.seconds:.1f}s")
+    if dedupe is not None:
+        print(f"[INFO] dedupe: {dedupe.stats()}")
+    print(f"[INFO] scheduler: {worker.scheduler_stats()}")
+    if config.hedge:
+        print(f"[INFO] hedging: {worker.hedge_stats()}")
+    if worker.cache_stats():
+        print(f"[INFO] cache: {worker.cache_stats()}")
+    print(f"[INFO] metrics: {json.dumps(METRICS.snapshot())}")
+    return 0 if stats.failed == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,309 @@
+# core/bench.py
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+from .batch import run_batch
+from .logic import JDWorker, Configurations
+from .metrics import METRICS
+from .mockserver import MockConfig, MockServer
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_SYLLABLES = ["ka", "lo", "mi", "ra", "ton", "vex", "dra", "quo", "zel", "pin", "gar", "sul", "bri", "nov", "ph", "tek"]
+BOILERPLATE = (
+    "Equal Opportunity Employer\n\nWe are an equal opportunity employer. All qualified applicants will receive "
+    "consideration without regard to race, religion, national origin, gender identity, sexual orientation, "
+    "veteran or disability status.\n\nBenefits\n\nMedical, dental and vision insurance, 401(k), paid time off."
+)
+
+
+# ------ Synthetic data ------
+def _word(i: int) -> str:
+    out = ""
+    while True:
+        out += _SYLLABLES[i % len(_SYLLABLES)]
+        i //= len(_SYLLABLES)
+        if not i:
+            return out
+
+def make_vocab(n_terms: int, seed: int = 0) -> Dict[str, List[str]]:
+    """A vocab.json of roughly n_terms word-like terms, most of them skills."""
+    rng = random.Random(seed)
+    ids = rng.sample(range(n_terms * 4), n_terms)
+    terms = [_word(i) for i in ids]
+    n_skills = int(n_terms * 0.7)
+    n_titles = int(n_terms * 0.1)
+    n_companies = int(n_terms * 0.1)
+    rest = terms[n_skills + n_titles + n_companies:]
+    return {
+        "skills": terms[:n_skills],
+        "title": [f"{t} engineer" for t in terms[n_skills:n_skills + n_titles]],
+        "company": [f"{t} inc" for t in terms[n_skills + n_titles:n_skills + n_titles + n_companies]],
+        "degrees": ["bachelor", "master", "phd"],
+        "majors": [f"{t} studies" for t in rest] or ["computer science"],
+    }
+
+def make_corpus(n_jds: int, vocab: Dict[str, List[str]], seed: int = 0, new_skill_rate: float = 0.1) -> List[str]:
+    """n_jds JDs mentioning 8-20 skills each; ~new_skill_rate of them are not in the vocab yet."""
+    rng = random.Random(seed)
+    skills = vocab["skills"] or ["python"]
+    titles = vocab["title"] or ["software engineer"]
+    companies = vocab["company"] or ["acme inc"]
+    jds = []
+    for i in range(n_jds):
+        picked = []
+        for _ in range(rng.randint(8, 20)):
+            picked.append(_word(rng.randrange(1 << 20)) + "x" if rng.random() < new_skill_rate else rng.choice(skills))
+        req = "\n".join(f"- {rng.randint(1, 8)}+ years of experience with {s}." for s in picked[:len(picked) * 2 // 3])
+        pref = "\n".join(f"- Hands-on experience with {s}." for s in picked[len(picked) * 2 // 3:])
+        jds.append(
+            f"{rng.choice(titles).title()}\n{rng.choice(companies).title()}\n\n"
+            f"About the role\n\nYou will design and build data systems for team {i}.\n\n"
+            f"Requirements:\n{req}\n- Bachelor degree in a related field.\n\n"
+            f"Preferred:\n{pref}\n\n{BOILERPLATE}\n"
+        )
+    return jds
+
+
+# ------ Measurement ------
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    s = sorted(values)
+    # nearest rank
+    return s[min(len(s) - 1, max(0, math.ceil(q / 100 * len(s)) - 1))]
+
+def _summary(values: List[float], scale: float = 1.0) -> Dict[str, float]:
+    return {
+        "mean": round(scale * sum(values) / len(values), 3) if values else 0.0,
+        "p50": round(scale * percentile(values, 50), 3),
+        "p95": round(scale * percentile(values, 95), 3),
+        "p99": round(scale * percentile(values, 99), 3),
+        "max": round(scale * max(values), 3) if values else 0.0,
+    }
+
+def run_case(params: Dict[str, Any]) -> Dict[str, Any]:
+    """Run one configuration in this process; cwd must be a scratch directory (data/ is written)."""
+    os.makedirs("data", exist_ok=True)
+    vocab = make_vocab(params["vocab"], params["seed"])
+    with open("data/vocab.json", "w", encoding="utf-8") as f:
+        json.dump(vocab, f)
+    jds = make_corpus(params["jds"], vocab, params["seed"])
+
+    provider = params["provider"]
+    worker = JDWorker(Configurations(
+        provider=provider,
+        model=params["model"],
+        base_url=params["base_url"],
+        vocab_budget=params.get("vocab_budget"),
+        prune_jd=params.get("prune", False),
+        structured_output=params.get("structured", False),
+        compact_output=params.get("compact", False),
+    ))
+    worker.set_api_key(provider, "mock")
+
+    latencies: List[float] = []
+
+    class Timed:
+        # per-JD latency as seen by the batch runner (includes scheduling and retries);
+        # everything else (provenance, packing, ...) is the wrapped worker's
+        def __getattr__(self, name):
+            return getattr(worker, name)
+
+        def generate(self, jd_text):
+            t0 = time.perf_counter()
+            try:
+                return worker.generate(jd_text)
+            finally:
+                latencies.append(time.perf_counter() - t0)
+
+    t0 = time.perf_counter()
+    stats = run_batch(Timed(), jds, "data/out.jsonl", concurrency=params["concurrency"])
+    wall = time.perf_counter() - t0
+
+    snap = METRICS.snapshot()
+    return {
+        "wall_seconds": round(wall, 3),
+        "throughput_jds_per_s": round(stats.total / wall, 2) if wall else 0.0,
+        "ok": stats.ok,
+        "failed": stats.failed,
+        "latency_ms": _summary(latencies, 1000.0),
+        "stages_ms": {k: round(v["mean"] * 1000, 4) for k, v in snap["stages"].items()},
+        "stage_totals_s": {k: v["seconds"] for k, v in snap["stages"].items()},
+        "scheduler": worker.scheduler_stats(),
+    }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run_suite(
+    corpus_sizes: List[int],
+    vocab_sizes: List[int],
+    mock: MockConfig,
+    base: Dict[str, Any],
+) -> List[Dict[str, Any]]:
+    """Every (corpus, vocab) combination in its own process (fresh vocab / caches / metrics), one mock server."""
+    results = []
+    commit = _git_commit()
+    with MockServer(mock) as server:
+        for n_jds in corpus_sizes:
+            for n_vocab in vocab_sizes:
+                params = dict(base, jds=n_jds, vocab=n_vocab, base_url=server.base_url(base["provider"]))
+                server.llm.reset()
+                with tempfile.TemporaryDirectory(prefix="jd_bench_") as tmp:
+                    env = dict(os.environ, PYTHONPATH=REPO_ROOT + os.pathsep + os.environ.get("PYTHONPATH", ""))
+                    proc = subprocess.run(
+                        [sys.executable, "-m", "core.bench", "--case", json.dumps(params)],
+                        cwd=tmp, env=env, capture_output=True, text=True,
+                    )
+                if proc.returncode != 0:
+                    raise RuntimeError(f"benchmark case failed:\n{proc.stderr[-2000:]}")
+                case = json.loads(proc.stdout.strip().splitlines()[-1])
+                results.append({
+                    "commit": commit,
+                    "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                    "python": platform.python_version(),
+                    "params": {k: v for k, v in params.items() if k != "base_url"},
+                    "mock": {**vars(mock), **server.llm.stats()},
+                    **case,
+                    "prompt_tokens": _summary(server.llm.prompt_tokens),
+                    "completion_tokens": _summary(server.llm.completion_tokens),
+                })
+    return results
+
+def compare(results: List[Dict[str, Any]], baseline_path: str) -> List[str]:
+    """One line per case that also appears (same params) in the baseline results file."""
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = {json.dumps(r["params"], sort_keys=True): r for r in map(json.loads, f) if r}
+    lines = []
+    for r in results:
+        old = baseline.get(json.dumps(r["params"], sort_keys=True))
+        if old is None:
+            continue
+
+        def delta(a, b):
+            return f"{(b - a) / a * 100:+.1f}%" if a else "n/a"
+
+        lines.append(
+            f"jds={r['params']['jds']} vocab={r['params']['vocab']}: "
+            f"throughput {old['throughput_jds_per_s']} -> {r['throughput_jds_per_s']} "
+            f"({delta(old['throughput_jds_per_s'], r['throughput_jds_per_s'])}), "
+            f"p95 {old['latency_ms']['p95']} -> {r['latency_ms']['p95']} ms "
+            f"({delta(old['latency_ms']['p95'], r['latency_ms']['p95'])}), "
+            f"prompt p50 {old['prompt_tokens']['p50']} -> {r['prompt_tokens']['p50']} tokens"
+        )
+    return lines
+
+
+def compare_wires(results: List[Dict[str, Any]]) -> List[str]:
+    """One line per case run in both the JSON and the compact output encoding."""
+    def key(r):
+        return json.dumps({k: v for k, v in r["params"].items() if k != "compact"}, sort_keys=True)
+    plain = {key(r): r for r in results if not r["params"].get("compact")}
+    lines = []
+    for r in results:
+        old = plain.get(key(r)) if r["params"].get("compact") else None
+        if old is None:
+            continue
+
+        def delta(a, b):
+            return f"{(b - a) / a * 100:+.1f}%" if a else "n/a"
+
+        lines.append(
+            f"jds={r['params']['jds']} vocab={r['params']['vocab']} json -> compact: "
+            f"completion p50 {old['completion_tokens']['p50']} -> {r['completion_tokens']['p50']} tokens "
+            f"({delta(old['completion_tokens']['p50'], r['completion_tokens']['p50'])}), "
+            f"prompt p50 {old['prompt_tokens']['p50']} -> {r['prompt_tokens']['p50']} tokens, "
+            f"latency p50 {old['latency_ms']['p50']} -> {r['latency_ms']['p50']} ms "
+            f"({delta(old['latency_ms']['p50'], r['latency_ms']['p50'])}), "
+            f"throughput {old['throughput_jds_per_s']} -> {r['throughput_jds_per_s']} JD/s, "
+            f"failed {old['failed']} -> {r['failed']}"
+        )
+    return lines
+
+
+def _sizes(text: str) -> List[int]:
+    return [int(x) for x in text.split(",") if x.strip()]
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the JDWorker pipeline against a local mock LLM.")
+    parser.add_argument("--jds", default="100,1000", help="comma-separated corpus sizes")
+    parser.add_argument("--vocab", default="1000,10000", help="comma-separated vocab sizes (terms)")
+    parser.add_argument("--provider", default="openai", choices=["openai", "gemini"])
+    parser.add_argument("--model", default=None)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--vocab-budget", type=int, default=None)
+    parser.add_argument("--prune", action="store_true")
+    parser.add_argument("--structured", action="store_true")
+    parser.add_argument("--wire", default="json",
+                        help="comma-separated output encodings to run (json, compact); both to compare them")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--latency", type=float, default=0.2, help="mock median seconds to first token")
+    parser.add_argument("--latency-sigma", type=float, default=0.5)
+    parser.add_argument("--tokens-per-second", type=float, default=2000)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--max-concurrency", type=int, default=None)
+    parser.add_argument("--retry-after", type=float, default=0.2)
+    parser.add_argument("--malformed-rate", type=float, default=0.0)
+    parser.add_argument("--out", default="bench/results.jsonl", help="results are appended here (JSONL)")
+    parser.add_argument("--compare", default=None, metavar="JSONL", help="earlier results to diff against")
+    parser.add_argument("--case", default=None, help=argparse.SUPPRESS)  # internal: run one case
+    args = parser.parse_args(argv)
+
+    if args.case:
+        print(json.dumps(run_case(json.loads(args.case))))
+        return 0
+
+    mock = MockConfig(
+        latency=args.latency, latency_sigma=args.latency_sigma, tokens_per_second=args.tokens_per_second,
+        throttle_rate=args.throttle_rate, max_concurrency=args.max_concurrency,
+        retry_after=args.retry_after, malformed_rate=args.malformed_rate, seed=args.seed,
+    )
+    base = dict(
+        provider=args.provider,
+        model=args.model or ("gpt-5" if args.provider == "openai" else "gemini-2.5-flash"),
+        concurrency=args.concurrency, vocab_budget=args.vocab_budget, prune=args.prune,
+        structured=args.structured, seed=args.seed,
+    )
+    results = []
+    for wire in [w.strip() for w in args.wire.split(",") if w.strip()]:
+        if wire not in ("json", "compact"):
+            parser.error(f"unknown --wire {wire!r}")
+        # params only carry "compact" when set, so --compare still matches earlier JSON results
+        results += run_suite(_sizes(args.jds), _sizes(args.vocab), mock,
+                             dict(base, compact=True) if wire == "compact" else base)
+
+    os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+    with open(args.out, "a", encoding="utf-8") as f:
+        for r in results:
+            f.write(json.dumps(r) + "\n")
+    for r in results:
+        print(f"[INFO] jds={r['params']['jds']} vocab={r['params']['vocab']}: "
+              f"{r['throughput_jds_per_s']} JD/s, p50/p95/p99 {r['latency_ms']['p50']}/{r['latency_ms']['p95']}/"
+              f"{r['latency_ms']['p99']} ms, prompt p50 {r['prompt_tokens']['p50']} tokens, "
+              f"completion p50 {r['completion_tokens']['p50']} tokens{' (compact)' if r['params'].get('compact') else ''}, "
+              f"{r['ok']} ok / {r['failed']} failed")
+    if args.compare:
+        for line in compare(results, args.compare):
+            print(f"[INFO] {line}")
+    for line in compare_wires(results):
+        print(f"[INFO] {line}")
+    print(f"[INFO] results appended to {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,175 @@
+# core/cache.py
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+DEFAULT_CACHE_PATH = "data/llm_cache.sqlite"
+
+
+def _sha256(text: str) -> str:
+    return hashlib.sha256((text or "").encode("utf-8")).hexdigest()
+
+def make_key(
+    provider: str,
+    model: str,
+    temperature: float,
+    reasoning_effort: str,
+    system_prompt: str,
+    prompt: str,
+    *extra: str,
+) -> str:
+    """Content address of one LLM request; `extra` covers request options such as output mode."""
+    parts = [
+        provider, model, float(temperature), reasoning_effort,
+        _sha256(system_prompt), _sha256(prompt), *extra,
+    ]
+    return _sha256(json.dumps(parts))
+
+
+class ResponseCache:
+    """
+    Two-tier response cache: an in-memory LRU in front of an optional SQLite file.
+    Disk entries are evicted by age (max_age seconds) and by total size (max_bytes),
+    least recently used first.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = DEFAULT_CACHE_PATH,
+        memory_entries: int = 2048,
+        max_bytes: int = 512 * 1024 * 1024,
+        max_age: Optional[float] = 30 * 24 * 3600,
+        evict_every: int = 256,
+    ):
+        self.path = path
+        self.memory_entries = int(memory_entries)
+        self.max_bytes = int(max_bytes)
+        self.max_age = max_age
+        self.evict_every = max(1, int(evict_every))
+
+        self._mem: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._puts_since_evict = 0
+        self.hits_memory = 0
+        self.hits_disk = 0
+        self.misses = 0
+
+        self._db: Optional[sqlite3.Connection] = None
+        if path:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                " key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL,"
+                " created REAL NOT NULL, accessed REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses(accessed)")
+            self._db.commit()
+            self.evict()
+
+    # ------ Lookup / Store ------
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            if key in self._mem:
+                self._mem.move_to_end(key)
+                self.hits_memory += 1
+                return self._mem[key]
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT value, created FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+                now = time.time()
+                if row and not self._expired(row[1], now):
+                    self._db.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+                    self._db.commit()
+                    self._remember(key, row[0])
+                    self.hits_disk += 1
+                    return row[0]
+
+            self.misses += 1
+            return None
+
+    def put(self, key: str, value: str) -> None:
+        with self._lock:
+            self._remember(key, value)
+            if self._db is None:
+                return
+            now = time.time()
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses(key, value, size, created, accessed)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (key, value, len(value.encode("utf-8")), now, now),
+            )
+            self._db.commit()
+            self._puts_since_evict += 1
+            if self._puts_since_evict >= self.evict_every:
+                self._evict_locked()
+
+    # ------ Eviction ------
+    def evict(self) -> None:
+        with self._lock:
+            self._evict_locked()
+
+    def _evict_locked(self) -> None:
+        self._puts_since_evict = 0
+        if self._db is None:
+            return
+        if self.max_age is not None:
+            self._db.execute("DELETE FROM responses WHERE created < ?", (time.time() - self.max_age,))
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total > self.max_bytes:
+            excess = total - self.max_bytes
+            freed = 0
+            doomed = []
+            for key, size in self._db.execute("SELECT key, size FROM responses ORDER BY accessed"):
+                doomed.append((key,))
+                freed += size
+                if freed >= excess:
+                    break
+            self._db.executemany("DELETE FROM responses WHERE key = ?", doomed)
+        self._db.commit()
+
+    def _expired(self, created: float, now: float) -> bool:
+        return self.max_age is not None and created < now - self.max_age
+
+    def _remember(self, key: str, value: str) -> None:
+        self._mem[key] = value
+        self._mem.move_to_end(key)
+        while len(self._mem) > self.memory_entries:
+            self._mem.popitem(last=False)
+
+    # ------ Stats ------
+    def stats(self) -> Dict[str, float]:
+        hits = self.hits_memory + self.hits_disk
+        lookups = hits + self.misses
+        return {
+            "hits_memory": self.hits_memory,
+            "hits_disk": self.hits_disk,
+            "misses": self.misses,
+            "hit_rate": (hits / lookups) if lookups else 0.0,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+# one cache per path, shared by every worker/client in the process
+_CACHES: Dict[Optional[str], ResponseCache] = {}
+_CACHES_LOCK = threading.Lock()
+
+def get_cache(path: Optional[str] = DEFAULT_CACHE_PATH, **kwargs) -> ResponseCache:
+    with _CACHES_LOCK:
+        cache = _CACHES.get(path)
+        if cache is None:
+            cache = _CACHES[path] = ResponseCache(path, **kwargs)
+        return cache
@@ -0,0 +1,225 @@
+# core/canonical.py
+import json
+import os
+import re
+import threading
+from collections import Counter, defaultdict
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from .vocab import get_store, DEFAULT_PATH
+
+DEFAULT_ALIASES_PATH = "data/aliases.json"
+FIELDS = ["skills", "degrees", "majors"]
+
+# built-in aliases; data/aliases.json entries take precedence
+DEFAULT_ALIASES: Dict[str, Dict[str, str]] = {
+    "skills": {
+        "k8s": "kubernetes",
+        "js": "javascript",
+        "ts": "typescript",
+        "golang": "go",
+        "postgres": "postgresql",
+        "ml": "machine learning",
+        "nlp": "natural language processing",
+    },
+    "degrees": {
+        "bs": "bachelor's degree",
+        "ba": "bachelor's degree",
+        "ms": "master's degree",
+        "msc": "master's degree",
+        "ph.d.": "phd",
+    },
+    "majors": {
+        "cs": "computer science",
+        "ee": "electrical engineering",
+    },
+}
+
+_FINAL = 2.0  # memo score of alias and exact hits: above any Dice score, never re-matched
+
+_PAREN_RE = re.compile(r"\s*\([^)]*\)")
+_SPACE_RE = re.compile(r"\s+")
+
+
+def normalize_term(term: str) -> str:
+    """Lowercase, drop parenthesized decorations (versions etc.), collapse whitespace."""
+    t = _PAREN_RE.sub("", (term or "").lower())
+    return _SPACE_RE.sub(" ", t).strip()
+
+def _trigrams(term: str) -> Set[str]:
+    padded = f"  {term} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def load_aliases(path: str = DEFAULT_ALIASES_PATH) -> Dict[str, Dict[str, str]]:
+    out = {cat: dict(DEFAULT_ALIASES.get(cat, {})) for cat in FIELDS}
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        for cat in FIELDS:
+            for alias, target in (data.get(cat) or {}).items():
+                out[cat][normalize_term(alias)] = normalize_term(target)
+    return out
+
+
+class _TrigramIndex:
+    """Character-trigram postings for one vocab category."""
+
+    def __init__(self):
+        self.terms: List[str] = []
+        self.sizes: List[int] = []
+        self.exact: Dict[str, int] = {}
+        self.postings: Dict[str, List[int]] = defaultdict(list)
+
+    def add(self, term: str) -> None:
+        if term in self.exact:
+            return
+        tid = len(self.terms)
+        grams = _trigrams(term)
+        self.terms.append(term)
+        self.sizes.append(len(grams))
+        self.exact[term] = tid
+        for g in grams:
+            self.postings[g].append(tid)
+
+    def best(self, term: str, threshold: float) -> Optional[str]:
+        """Vocab term with the highest Dice similarity >= threshold, if any."""
+        tid, _ = self.best_scored(term, threshold)
+        return None if tid is None else self.terms[tid]
+
+    def best_scored(self, term: str, threshold: float) -> Tuple[Optional[int], float]:
+        """(term id, Dice score) of the best vocab match >= threshold; (None, threshold) if none."""
+        grams = _trigrams(term)
+        n = len(grams)
+        # Dice >= t bounds the candidate size to [n*t/(2-t), n*(2-t)/t]
+        lo, hi = n * threshold / (2 - threshold), n * (2 - threshold) / threshold
+        shared: Counter = Counter()
+        for g in grams:
+            shared.update(self.postings.get(g, ()))
+
+        best_tid, best_score = None, threshold
+        for tid, common in shared.items():
+            size = self.sizes[tid]
+            if size < lo or size > hi:
+                continue
+            score = 2.0 * common / (n + size)
+            # ties go to the older (earlier-seen) vocab term
+            if score > best_score or (score == best_score and (best_tid is None or tid < best_tid)):
+                best_tid, best_score = tid, score
+        return best_tid, best_score
+
+
+class Canonicalizer:
+    """
+    Maps extracted skill names, degrees and majors onto their vocab forms:
+    alias table first, then exact match, then the closest vocab term by
+    character-trigram Dice similarity when it clears `threshold`.
+    """
+
+    def __init__(
+        self,
+        vocab_path: str = DEFAULT_PATH,
+        aliases_path: str = DEFAULT_ALIASES_PATH,
+        threshold: float = 0.85,
+        memo_size: int = 100_000,
+    ):
+        self.store = get_store(vocab_path)
+        self.aliases = load_aliases(aliases_path)
+        self.threshold = float(threshold)
+        self.memo_size = int(memo_size)
+        self._indexes = {cat: _TrigramIndex() for cat in FIELDS}
+        self._synced = {cat: 0 for cat in FIELDS}
+        # (cat, norm) -> (canonical, Dice score of a fuzzy match, None for a miss, _FINAL otherwise)
+        self._memo: Dict[tuple, Tuple[str, Optional[float]]] = {}
+        self._lock = threading.Lock()
+
+    def _sync(self) -> None:
+        for cat in FIELDS:
+            terms = self.store.terms(cat)
+            if len(terms) == self._synced[cat]:
+                continue
+            added = _TrigramIndex()
+            for term in terms[self._synced[cat]:]:
+                self._indexes[cat].add(term)
+                added.add(term)
+            self._synced[cat] = len(terms)
+            self._recheck(cat, added)
+
+    def _recheck(self, cat: str, added: _TrigramIndex) -> None:
+        """Re-match memoized misses and fuzzy matches against just the newly added terms."""
+        for key, (out, score) in list(self._memo.items()):
+            if key[0] != cat or score == _FINAL:
+                continue
+            norm = key[1]
+            if norm in added.exact:
+                self._memo[key] = (norm, _FINAL)
+                continue
+            tid, new_score = added.best_scored(norm, self.threshold)
+            # ties keep the older vocab term, so a new term has to score strictly higher
+            if tid is not None and (score is None or new_score > score):
+                self._memo[key] = (added.terms[tid], new_score)
+
+    def canonical(self, cat: str, term: str) -> str:
+        norm = normalize_term(term)
+        if not norm:
+            return norm
+        with self._lock:
+            self._sync()
+            key = (cat, norm)
+            hit = self._memo.get(key)
+            if hit is not None:
+                return hit[0]
+
+            out, score = self.aliases.get(cat, {}).get(norm), _FINAL
+            if out is None:
+                index = self._indexes[cat]
+                if norm in index.exact:
+                    out = norm
+                else:
+                    tid, score = index.best_scored(norm, self.threshold)
+                    out, score = (norm, None) if tid is None else (index.terms[tid], score)
+
+            if len(self._memo) >= self.memo_size:
+                self._memo.clear()
+            self._memo[key] = (out, score)
+            return out
+
+    def canonicalize_record(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        """Canonicalize a record in place (and return it); duplicate names collapse."""
+        skills = record.get("skills") or {}
+        for bucket in ("required", "preferred"):
+            items = skills.get(bucket)
+            if not isinstance(items, list):
+                continue
+            seen = set()
+            kept = []
+            for it in items:
+                if isinstance(it, dict) and it.get("name"):
+                    it["name"] = self.canonical("skills", it["name"])
+                    if it["name"] in seen:
+                        continue
+                    seen.add(it["name"])
+                kept.append(it)
+            skills[bucket] = kept
+
+        edu = record.get("education") or {}
+        for cat in ("degrees", "majors"):
+            values = edu.get(cat)
+            if isinstance(values, list):
+                out = []
+                for v in values:
+                    c = self.canonical(cat, v) if isinstance(v, str) else v
+                    if c and c not in out:
+                        out.append(c)
+                edu[cat] = out
+        return record
+
+
+_CANONICALIZERS: Dict[str, Canonicalizer] = {}
+_CANONICALIZERS_LOCK = threading.Lock()
+
+def get_canonicalizer(vocab_path: str = DEFAULT_PATH) -> Canonicalizer:
+    with _CANONICALIZERS_LOCK:
+        c = _CANONICALIZERS.get(vocab_path)
+        if c is None:
+            c = _CANONICALIZERS[vocab_path] = Canonicalizer(vocab_path)
+        return c
@@ -0,0 +1,74 @@
+# core/cascade.py
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+from .canonical import normalize_term
+from .retrieval import estimate_tokens
+from .storage import parse_record
+from .prepass import dictionary_skills
+from .metrics import METRICS
+
+REASONS = ["error", "invalid", "few_skills", "dictionary"]
+
+
+@dataclass(frozen=True)
+class CascadeStep:
+    provider: str
+    model: str
+    reasoning_effort: str = "low"
+
+    def __str__(self) -> str:
+        return f"{self.provider}:{self.model}:{self.reasoning_effort}"
+
+
+# "who answered" for records of the vocab pre-pass (Configurations.local_only)
+LOCAL_STEP = CascadeStep("local", "prepass", "n/a")
+
+
+@dataclass
+class CascadePolicy:
+    """When the output of a cheaper step is not trusted and the next step runs."""
+    tokens_per_skill: int = 150      # expect about one skill per this many JD tokens...
+    max_expected_skills: int = 5     # ...but never demand more than this many
+    min_dictionary_hits: int = 4     # vocab skills found in the JD before the dictionary check applies
+    min_dictionary_recall: float = 0.5
+
+
+def parse_cascade(spec: str) -> List[CascadeStep]:
+    """
+    "gemini:gemini-2.5-flash:minimal,openai:gpt-5:low" -> steps, cheapest first.
+    The reasoning effort may be omitted ("openai:gpt-5").
+    """
+    steps = []
+    for part in (spec or "").split(","):
+        if not part.strip():
+            continue
+        fields = [f.strip() for f in part.split(":")]
+        if len(fields) not in (2, 3) or fields[0] not in ("openai", "gemini") or not fields[1]:
+            raise ValueError(f"Bad cascade step {part!r}; expected provider:model[:reasoning]")
+        steps.append(CascadeStep(*fields))
+    return steps
+
+def review(text: str, jd_text: str, policy: Optional[CascadePolicy] = None) -> Optional[Tuple[str, str]]:
+    """(reason, detail) when the output should be escalated, None when it is accepted."""
+    policy = policy or CascadePolicy()
+    try:
+        record = parse_record(text)
+    except ValueError as e:
+        return "invalid", str(e)
+
+    names = {normalize_term(it["name"]) for bucket in ("required", "preferred") for it in record["skills"][bucket]}
+    expected = min(policy.max_expected_skills, estimate_tokens(jd_text) // policy.tokens_per_skill)
+    if len(names) < expected:
+        return "few_skills", f"{len(names)} skills for a {estimate_tokens(jd_text)}-token JD (expected >= {expected})"
+
+    found = {normalize_term(t) for t in dictionary_skills(jd_text)}
+    if len(found) >= policy.min_dictionary_hits:
+        recall = len(found & names) / len(found)
+        if recall < policy.min_dictionary_recall:
+            return "dictionary", f"only {recall:.0%} of {len(found)} dictionary skills extracted"
+    return None
+
+def record_escalation(step: CascadeStep, reason: str, detail: str) -> None:
+    METRICS.inc("jd_cascade_escalations_total", provider=step.provider, model=step.model, reason=reason)
+    METRICS.log({"type": "escalation", "from": str(step), "reason": reason, "detail": detail})
@@ -0,0 +1,103 @@
+# core/chunking.py
+import re
+from typing import Any, Dict, List
+
+from .preprocess import segment
+from .retrieval import estimate_tokens
+from .canonical import normalize_term
+
+# the JD's opening lines (title / company) are repeated in every chunk, capped at this many tokens
+HEADER_TOKENS = 100
+LEVEL_ORDER = {"n/a": 0, "junior": 1, "mid": 2, "senior": 3}
+_YEARS_RE = re.compile(r">=(\d+)y")
+
+
+# ------ Split ------
+def _pieces(text: str, max_tokens: int) -> List[str]:
+    """Cut an oversized section at line boundaries (and a single huge line at max_tokens*4 chars)."""
+    out, cur = [], []
+    for line in text.splitlines():
+        while estimate_tokens(line) > max_tokens:
+            out.extend(["\n".join(cur)] if cur else [])
+            cur = []
+            out.append(line[:max_tokens * 4])
+            line = line[max_tokens * 4:]
+        if cur and estimate_tokens("\n".join(cur + [line])) > max_tokens:
+            out.append("\n".join(cur))
+            cur = []
+        cur.append(line)
+    if cur:
+        out.append("\n".join(cur))
+    return out
+
+def split_jd(jd_text: str, max_tokens: int) -> List[str]:
+    """
+    Split a JD on section boundaries into chunks of at most ~max_tokens each; whole sections
+    are packed greedily and only sections larger than a chunk are cut at line boundaries.
+    Every chunk after the first starts with the JD's header so title / company stay visible.
+    """
+    if estimate_tokens(jd_text or "") <= max_tokens:
+        return [jd_text]
+    sections = segment(jd_text)
+    header = sections[0].text[:HEADER_TOKENS * 4] if sections else ""
+    budget = max(1, max_tokens - estimate_tokens(header))
+
+    chunks: List[str] = []
+    cur: List[str] = []
+    for section in sections:
+        for piece in _pieces(section.text, budget):
+            if cur and estimate_tokens("\n\n".join(cur + [piece])) > budget:
+                chunks.append("\n\n".join(cur))
+                cur = []
+            cur.append(piece)
+    if cur:
+        chunks.append("\n\n".join(cur))
+    return [chunks[0]] + [f"{header}\n\n{c}" for c in chunks[1:]]
+
+
+# ------ Merge ------
+def _years(value: str) -> int:
+    m = _YEARS_RE.match(value or "")
+    return int(m.group(1)) if m else -1
+
+def merge_records(records: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Deterministically merge per-chunk records (in chunk order) into one record:
+    skills are deduped by normalized name, "required" wins over "preferred", the largest
+    years / highest level win, and the first non-"n/a" meta values are kept.
+    """
+    meta = {"company": "n/a", "title": "n/a"}
+    skills: Dict[str, Dict[str, Any]] = {}   # normalized name -> merged item (first-seen order)
+    bucket_of: Dict[str, str] = {}
+    education: Dict[str, List[str]] = {"degrees": [], "majors": []}
+
+    for rec in records:
+        for k in meta:
+            v = (rec.get("meta") or {}).get(k)
+            if meta[k] == "n/a" and v and v != "n/a":
+                meta[k] = v
+        for bucket in ("required", "preferred"):
+            for it in (rec.get("skills") or {}).get(bucket) or []:
+                name = normalize_term(it.get("name", ""))
+                if not name:
+                    continue
+                cur = skills.get(name)
+                if cur is None:
+                    skills[name] = dict(it, name=name)
+                    bucket_of[name] = bucket
+                    continue
+                if bucket == "required":
+                    bucket_of[name] = "required"
+                if _years(it.get("years")) > _years(cur.get("years")):
+                    cur["years"] = it["years"]
+                if LEVEL_ORDER.get(it.get("level"), 0) > LEVEL_ORDER.get(cur.get("level"), 0):
+                    cur["level"] = it["level"]
+        for k in education:
+            for v in (rec.get("education") or {}).get(k) or []:
+                if v not in education[k]:
+                    education[k].append(v)
+
+    merged = {"required": [], "preferred": []}
+    for name, item in skills.items():
+        merged[bucket_of[name]].append(item)
+    return {"meta": meta, "skills": merged, "education": education}
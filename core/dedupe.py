@@ -0,0 +1,206 @@
+# core/dedupe.py
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import threading
+import zlib
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from .preprocess import prune_jd
+from .recordstore import jd_hash
+from .storage import parse_record
+from .retrieval import tokenize, _fold
+
+DEFAULT_DEDUPE_PATH = "data/neardup.sqlite"
+SHINGLE_WORDS = 4
+_PRIME = np.uint64((1 << 61) - 1)
+
+
+def shingles(jd_text: str, k: int = SHINGLE_WORDS) -> np.ndarray:
+    """crc32 hashes of the k-word shingles of a JD, after job-board chrome and EEO / benefits text is pruned."""
+    toks = tokenize(prune_jd(jd_text).text)
+    if len(toks) < k:
+        toks = toks + [""] * (k - len(toks))
+    grams = {" ".join(toks[i:i + k]) for i in range(len(toks) - k + 1)}
+    return np.fromiter((zlib.crc32(g.encode("utf-8")) for g in grams), dtype=np.uint64, count=len(grams))
+
+
+class MinHasher:
+    """MinHash signatures from `num_perm` universal hash functions (a*x + b) mod (2^61 - 1)."""
+
+    def __init__(self, num_perm: int = 128, seed: int = 1):
+        rng = np.random.RandomState(seed)
+        # a, b < 2^31 and x < 2^32 keep a*x + b inside uint64
+        self.a = rng.randint(1, 1 << 31, size=num_perm).astype(np.uint64)
+        self.b = rng.randint(0, 1 << 31, size=num_perm).astype(np.uint64)
+
+    def signature(self, hashes: np.ndarray) -> np.ndarray:
+        return ((np.outer(hashes, self.a) + self.b) % _PRIME).min(axis=0)
+
+
+def similarity(sig_a: np.ndarray, sig_b: np.ndarray) -> float:
+    """Estimated Jaccard similarity of two MinHash signatures."""
+    return float(np.mean(sig_a == sig_b))
+
+def _covered(record: Dict[str, Any], jd_text: str) -> float:
+    """Share of the record's skills whose tokens all occur in jd_text."""
+    jd_tokens = {_fold(t) for t in tokenize(jd_text)}
+    skills = record.get("skills") or {}
+    names = [it.get("name") for b in ("required", "preferred") for it in skills.get(b) or [] if isinstance(it, dict)]
+    names = [n for n in names if n]
+    if not names:
+        return 1.0
+    hit = sum(all(_fold(t) in jd_tokens for t in tokenize(n)) for n in names)
+    return hit / len(names)
+
+
+@dataclass
+class NearDuplicate:
+    key: str              # jd_hash of the stored JD
+    similarity: float     # estimated Jaccard of the two JDs
+    text: str             # the stored model output
+    provenance: Optional[Dict[str, Any]] = None  # stamp of the stored record (None for older indexes)
+
+
+class NearDupIndex:
+    """
+    Persistent MinHash / LSH index over extracted JDs, kept in SQLite next to the response cache.
+    The signature is cut into `bands` bands; JDs sharing any band are candidates, and a candidate
+    is a near-duplicate when its estimated Jaccard similarity is at least `threshold`.
+
+    A near-duplicate's stored output is reused only if at least `verify_ratio` of its skills
+    still occur in the new JD; otherwise the JD goes to the model as usual.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = DEFAULT_DEDUPE_PATH,
+        threshold: float = 0.8,
+        num_perm: int = 128,
+        bands: int = 16,
+        verify_ratio: float = 0.8,
+    ):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.path = path
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.verify_ratio = verify_ratio
+        self.hasher = MinHasher(num_perm)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.rejected = 0     # near-duplicates that failed verification
+        self.misses = 0
+
+        if path:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path or ":memory:", check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS docs (key TEXT PRIMARY KEY, sig BLOB NOT NULL, output TEXT NOT NULL)")
+        self._db.execute("CREATE TABLE IF NOT EXISTS bands (band INTEGER NOT NULL, bucket INTEGER NOT NULL, key TEXT NOT NULL)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS bands_bucket ON bands(band, bucket)")
+        if "provenance" not in {row[1] for row in self._db.execute("PRAGMA table_info(docs)")}:
+            self._db.execute("ALTER TABLE docs ADD COLUMN provenance TEXT")  # indexes from before stamps
+        self._db.commit()
+
+    # ------ Hashing ------
+    def signature(self, jd_text: str) -> np.ndarray:
+        return self.hasher.signature(shingles(jd_text))
+
+    def _buckets(self, sig: np.ndarray) -> List[int]:
+        return [zlib.crc32(sig[i * self.rows:(i + 1) * self.rows].tobytes()) for i in range(self.bands)]
+
+    # ------ Lookup / Store ------
+    def find(self, jd_text: str) -> Optional[NearDuplicate]:
+        """Most similar stored JD at or above the threshold, or None."""
+        sig = self.signature(jd_text)
+        best = None
+        with self._lock:
+            keys = set()
+            for band, bucket in enumerate(self._buckets(sig)):
+                keys.update(k for (k,) in self._db.execute(
+                    "SELECT key FROM bands WHERE band = ? AND bucket = ?", (band, bucket)))
+            for key in keys:
+                row = self._db.execute("SELECT sig, output, provenance FROM docs WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    continue
+                sim = similarity(sig, np.frombuffer(row[0], dtype=np.uint64))
+                if sim >= self.threshold and (best is None or sim > best.similarity):
+                    best = NearDuplicate(key, sim, row[1], json.loads(row[2]) if row[2] else None)
+        return best
+
+    def reuse(self, jd_text: str) -> Optional[NearDuplicate]:
+        """A verified near-duplicate whose output can stand in for this JD's, or None."""
+        dup = self.find(jd_text)
+        if dup is not None:
+            try:
+                ok = _covered(parse_record(dup.text, canonicalize=False), jd_text) >= self.verify_ratio
+            except ValueError:
+                ok = False
+            if ok:
+                self.hits += 1
+                return dup
+            self.rejected += 1
+        self.misses += 1
+        return None
+
+    def add(self, jd_text: str, output: str, provenance: Optional[Dict[str, Any]] = None) -> str:
+        """Index a JD with the model output extracted from it (and that record's stamp); returns its key."""
+        key = jd_hash(jd_text)
+        sig = self.signature(jd_text)
+        stamp = json.dumps(provenance, ensure_ascii=False) if provenance else None
+        with self._lock:
+            if self._db.execute("SELECT 1 FROM docs WHERE key = ?", (key,)).fetchone():
+                self._db.execute("UPDATE docs SET output = ?, provenance = ? WHERE key = ?", (output, stamp, key))
+            else:
+                self._db.execute("INSERT INTO docs(key, sig, output, provenance) VALUES (?, ?, ?, ?)",
+                                 (key, sig.tobytes(), output, stamp))
+                self._db.executemany("INSERT INTO bands(band, bucket, key) VALUES (?, ?, ?)",
+                                     [(band, bucket, key) for band, bucket in enumerate(self._buckets(sig))])
+            self._db.commit()
+        return key
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM docs").fetchone()[0]
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "indexed": len(self),
+            "hits": self.hits,
+            "rejected": self.rejected,
+            "misses": self.misses,
+            "hit_rate": (self.hits / lookups) if lookups else 0.0,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Estimated Jaccard similarity of two JDs.")
+    parser.add_argument("a", help="JD text file")
+    parser.add_argument("b", help="JD text file")
+    args = parser.parse_args(argv)
+
+    def read(path):
+        with open(path, "r", encoding="utf-8") as f:
+            return f.read()
+
+    hasher = MinHasher()
+    sig_a, sig_b = (hasher.signature(shingles(read(p))) for p in (args.a, args.b))
+    print(json.dumps({"similarity": round(similarity(sig_a, sig_b), 3)}))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
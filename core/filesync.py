@@ -0,0 +1,178 @@
+# core/filesync.py
+import atexit
+import os
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# "always": fsync every group commit; "interval": at most once per FSYNC_INTERVAL seconds
+# (and on close); "never": leave it to the OS
+FSYNC_POLICIES = ("always", "interval", "never")
+FSYNC_INTERVAL = 1.0
+_fsync_policy = "interval"
+
+
+def set_fsync_policy(policy: str) -> None:
+    global _fsync_policy
+    if policy not in FSYNC_POLICIES:
+        raise ValueError(f"fsync policy must be one of {FSYNC_POLICIES}")
+    _fsync_policy = policy
+
+def get_fsync_policy() -> str:
+    return _fsync_policy
+
+
+# ---------------- Advisory file locks ----------------
+# flock is per open file description, so one process's threads still need a mutex of their own
+_THREAD_LOCKS: Dict[str, threading.Lock] = {}
+_THREAD_LOCKS_LOCK = threading.Lock()
+
+@contextmanager
+def file_lock(path: str) -> Iterator[None]:
+    """Exclusive lock on `<path>.lock`, across threads and processes."""
+    lock_path = os.path.abspath(path) + ".lock"
+    with _THREAD_LOCKS_LOCK:
+        tlock = _THREAD_LOCKS.setdefault(lock_path, threading.Lock())
+    with tlock:
+        os.makedirs(os.path.dirname(lock_path), exist_ok=True)
+        fd = os.open(lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            else:
+                msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            else:
+                os.lseek(fd, 0, os.SEEK_SET)
+                msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+            os.close(fd)
+
+
+# ---------------- Group-committed appends ----------------
+class _Entry:
+    __slots__ = ("text", "done", "error")
+
+    def __init__(self, text: str):
+        self.text = text
+        self.done = False
+        self.error: Optional[BaseException] = None
+
+
+class AppendLog:
+    """
+    Line-oriented append-only file shared by many threads and processes.
+    append() blocks until its lines are on disk, but lines queued by concurrent callers are
+    written together: whichever caller finds no write in progress takes everything pending
+    and commits it with one locked write (and at most one fsync, per the fsync policy).
+    `lock_path` names the file whose lock guards writes (defaults to `path` itself).
+    """
+
+    def __init__(self, path: str, lock_path: Optional[str] = None):
+        self.path = path
+        self.lock_path = lock_path or path
+        self._cond = threading.Condition()
+        self._pending: List[_Entry] = []
+        self._writing = False
+        self._last_fsync = 0.0
+        self.commits = 0
+        self.lines = 0
+
+    def append(self, lines: List[str]) -> None:
+        if not lines:
+            return
+        entry = _Entry("".join(line if line.endswith("\n") else line + "\n" for line in lines))
+        with self._cond:
+            self._pending.append(entry)
+            while not entry.done:
+                if self._writing:
+                    self._cond.wait()
+                    continue
+                batch, self._pending, self._writing = self._pending, [], True
+                self._cond.release()
+                error = None
+                try:
+                    self._write(batch)
+                except BaseException as exc:
+                    error = exc
+                finally:
+                    self._cond.acquire()
+                    for done in batch:
+                        done.done, done.error = True, error
+                    self._writing = False
+                    self._cond.notify_all()
+        if entry.error is not None:
+            raise entry.error
+
+    def _write(self, batch: List[_Entry]) -> None:
+        with file_lock(self.lock_path):
+            self._write_locked("".join(e.text for e in batch))
+
+    def _write_locked(self, text: str) -> None:
+        # caller holds file_lock(self.lock_path)
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(text)
+            f.flush()
+            policy = _fsync_policy
+            now = time.monotonic()
+            if policy == "always" or (policy == "interval" and now - self._last_fsync >= FSYNC_INTERVAL):
+                os.fsync(f.fileno())
+                self._last_fsync = now
+        self.commits += 1
+        self.lines += text.count("\n")
+
+    def sync(self) -> None:
+        """fsync the file (e.g. at exit under the "interval" policy)."""
+        if _fsync_policy == "never" or not os.path.exists(self.path):
+            return
+        with file_lock(self.lock_path):
+            fd = os.open(self.path, os.O_RDONLY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+
+
+def append_together(parts: List[Tuple[AppendLog, List[str]]]) -> None:
+    """
+    Append lines to several logs as one group commit: every log's file lock is held (taken
+    in path order, so concurrent groups cannot deadlock) while all of them are written.
+    """
+    parts = [(log, lines) for log, lines in parts if lines]
+    lock_paths = sorted({os.path.abspath(log.lock_path) for log, _ in parts})
+    with ExitStack() as stack:
+        for path in lock_paths:
+            stack.enter_context(file_lock(path))
+        for log, lines in parts:
+            log._write_locked("".join(line if line.endswith("\n") else line + "\n" for line in lines))
+
+
+_LOGS: Dict[tuple, AppendLog] = {}
+_LOGS_LOCK = threading.Lock()
+
+def get_append_log(path: str, lock_path: Optional[str] = None) -> AppendLog:
+    """Process-wide AppendLog for `path`, so every writer in the process shares its group commits."""
+    key = (os.path.abspath(path), os.path.abspath(lock_path or path))
+    with _LOGS_LOCK:
+        log = _LOGS.get(key)
+        if log is None:
+            log = _LOGS[key] = AppendLog(path, lock_path)
+        return log
+
+@atexit.register
+def _sync_all() -> None:
+    for log in list(_LOGS.values()):
+        try:
+            log.sync()
+        except OSError:
+            pass
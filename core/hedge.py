@@ -0,0 +1,197 @@
+# core/hedge.py
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Tuple
+
+from .storage import parse_record
+from .metrics import METRICS
+
+Key = Tuple[str, str]  # (provider, model)
+
+# blocking SDK calls can't be interrupted, so a losing hedge runs to completion here and is discarded
+_POOL = ThreadPoolExecutor(max_workers=128, thread_name_prefix="jd-hedge")
+
+
+def passes_validation(text: str) -> bool:
+    try:
+        parse_record(text, canonicalize=False)
+        return True
+    except ValueError:
+        return False
+
+
+class Hedger:
+    """
+    Hedged requests: when the primary model has not produced a valid answer by its
+    adaptive deadline (a latency percentile of its recent successful calls), the same
+    request goes to a secondary model and the first valid response wins.
+    A primary that fails or answers invalidly before the deadline is hedged at once.
+    """
+
+    def __init__(
+        self,
+        window: int = 200,
+        min_samples: int = 20,
+        default_deadline: float = 10.0,   # seconds, until min_samples latencies are known
+        min_deadline: float = 0.05,
+    ):
+        self.window = int(window)
+        self.min_samples = int(min_samples)
+        self.default_deadline = float(default_deadline)
+        self.min_deadline = float(min_deadline)
+        self._lock = threading.Lock()
+        self._latency: Dict[Key, Deque[float]] = {}
+        self.calls = 0
+        self.hedged = 0
+        self.secondary_wins = 0
+        self.failed = 0
+
+    # ------ Latency tracking ------
+    def observe(self, key: Key, seconds: float) -> None:
+        with self._lock:
+            self._latency.setdefault(key, deque(maxlen=self.window)).append(seconds)
+
+    def deadline(self, key: Key, quantile: float = 0.95) -> float:
+        with self._lock:
+            samples = sorted(self._latency.get(key, ()))
+        if len(samples) < self.min_samples:
+            return self.default_deadline
+        return max(self.min_deadline, samples[int(quantile * (len(samples) - 1))])
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            calls, hedged, wins = self.calls, self.hedged, self.secondary_wins
+            keys = list(self._latency)
+        return {
+            "calls": calls,
+            "hedged": hedged,
+            "hedge_rate": round(hedged / calls, 4) if calls else 0.0,
+            "secondary_wins": wins,
+            "win_rate": round(wins / hedged, 4) if hedged else 0.0,
+            "failed": self.failed,
+            "p95_deadline": {f"{p}:{m}": round(self.deadline((p, m)), 3) for p, m in keys},
+        }
+
+    def _finish(self, primary: Key, hedged: bool, winner: Optional[str]) -> None:
+        with self._lock:
+            self.calls += 1
+            self.hedged += hedged
+            self.secondary_wins += winner == "secondary"
+            self.failed += winner is None
+        outcome = "failed" if winner is None else (f"{winner}_won" if hedged else "not_hedged")
+        METRICS.inc("jd_hedge_requests_total", provider=primary[0], model=primary[1], outcome=outcome)
+
+    # ------ Blocking ------
+    def call(
+        self,
+        primary: Callable[[], str],
+        secondary: Callable[[], str],
+        primary_key: Key,
+        secondary_key: Key,
+        quantile: float = 0.95,
+        accept: Callable[[str], bool] = passes_validation,
+    ) -> str:
+        """First accepted text of primary() / secondary(); if neither passes, the primary's result (or error)."""
+        def timed(key, fn):
+            t0 = time.perf_counter()
+            text = fn()
+            self.observe(key, time.perf_counter() - t0)
+            return text
+
+        t0 = time.perf_counter()
+        deadline = self.deadline(primary_key, quantile)
+        pending = {_POOL.submit(timed, primary_key, primary): "primary"}
+        hedged = False
+        fallback = None
+        while pending:
+            timeout = None if hedged else max(0.0, deadline - (time.perf_counter() - t0))
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                hedged = True
+                pending[_POOL.submit(timed, secondary_key, secondary)] = "secondary"
+                continue
+            for fut in done:
+                who = pending.pop(fut)
+                try:
+                    result = fut.result()
+                    ok = accept(result)
+                except Exception as e:
+                    result, ok = e, False
+                if ok:
+                    for other in pending:
+                        other.cancel()
+                    self._finish(primary_key, hedged, who)
+                    return result
+                if who == "primary" or fallback is None:
+                    fallback = result
+                if not hedged:
+                    hedged = True
+                    pending[_POOL.submit(timed, secondary_key, secondary)] = "secondary"
+        self._finish(primary_key, hedged, None)
+        if isinstance(fallback, Exception):
+            raise fallback
+        return fallback
+
+    # ------ Async ------
+    async def acall(
+        self,
+        primary: Callable[[], Awaitable[str]],
+        secondary: Callable[[], Awaitable[str]],
+        primary_key: Key,
+        secondary_key: Key,
+        quantile: float = 0.95,
+        accept: Callable[[str], bool] = passes_validation,
+    ) -> str:
+        """Like call(); the losing request is cancelled."""
+        async def timed(key, fn):
+            t0 = time.perf_counter()
+            text = await fn()
+            self.observe(key, time.perf_counter() - t0)
+            return text
+
+        t0 = time.perf_counter()
+        deadline = self.deadline(primary_key, quantile)
+        pending = {asyncio.ensure_future(timed(primary_key, primary)): "primary"}
+        hedged = False
+        fallback = None
+        while pending:
+            timeout = None if hedged else max(0.0, deadline - (time.perf_counter() - t0))
+            done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                hedged = True
+                pending[asyncio.ensure_future(timed(secondary_key, secondary))] = "secondary"
+                continue
+            for task in done:
+                who = pending.pop(task)
+                err = task.exception()
+                result = err if err is not None else task.result()
+                ok = err is None and accept(result)
+                if ok:
+                    for other in pending:
+                        other.cancel()
+                    self._finish(primary_key, hedged, who)
+                    return result
+                if who == "primary" or fallback is None:
+                    fallback = result
+                if not hedged:
+                    hedged = True
+                    pending[asyncio.ensure_future(timed(secondary_key, secondary))] = "secondary"
+        self._finish(primary_key, hedged, None)
+        if isinstance(fallback, BaseException):
+            raise fallback
+        return fallback
+
+
+_HEDGER: Optional[Hedger] = None
+_HEDGER_LOCK = threading.Lock()
+
+def get_hedger() -> Hedger:
+    """Process-wide Hedger, so latency history is shared by every worker."""
+    global _HEDGER
+    with _HEDGER_LOCK:
+        if _HEDGER is None:
+            _HEDGER = Hedger()
+        return _HEDGER
@@ -0,0 +1,136 @@
+# core/jobs.py
+import random
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional
+
+from .batch import load_jds
+from .logic import JDWorker
+from .scheduler import retry_after_of
+from .storage import save_to_jsonl
+
+STATUSES = ["queued", "running", "retrying", "ok", "failed", "cancelled"]
+
+
+@dataclass
+class JobItem:
+    id: str
+    text: str
+    status: str = "queued"
+    attempts: int = 0
+    error: Optional[str] = None
+    seconds: float = 0.0
+
+
+@dataclass
+class Job:
+    id: str
+    out_path: str
+    items: List[JobItem]
+    max_attempts: int = 3
+    created: float = field(default_factory=time.time)
+    finished: Optional[float] = None
+    cancelled: bool = False
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+    _cancel: threading.Event = field(default_factory=threading.Event, repr=False)  # wakes items backing off
+
+    def counts(self) -> Dict[str, int]:
+        out = {s: 0 for s in STATUSES}
+        for it in self.items:
+            out[it.status] += 1
+        return out
+
+    @property
+    def done(self) -> bool:
+        return all(it.status in ("ok", "failed", "cancelled") for it in self.items)
+
+    @property
+    def progress(self) -> float:
+        c = self.counts()
+        return (c["ok"] + c["failed"] + c["cancelled"]) / len(self.items) if self.items else 1.0
+
+
+class JobQueue:
+    """
+    Background extraction jobs on one bounded thread pool shared by every caller
+    (the Streamlit app keeps a single instance via st.cache_resource).
+    Each JD is retried up to max_attempts times, with full-jitter exponential backoff (at least
+    any Retry-After); results are appended to the job's JSONL path. Finished jobs are forgotten
+    after `finished_ttl` seconds, or oldest first once more than `max_finished` are kept.
+    """
+
+    def __init__(self, max_workers: int = 16, base_delay: float = 1.0, max_delay: float = 60.0,
+                 max_finished: int = 100, finished_ttl: float = 24 * 3600):
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="jd-job")
+        self._lock = threading.Lock()
+        self.jobs: Dict[str, Job] = {}
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_finished = max_finished
+        self.finished_ttl = finished_ttl
+
+    def submit(self, worker: JDWorker, jds: Iterable, out_path: str, max_attempts: int = 3) -> Job:
+        """Enqueue JDs (anything load_jds accepts); the worker is cloned so later setting changes don't leak in."""
+        items = [JobItem(it.id, it.text) for it in load_jds(jds)]
+        job = Job(uuid.uuid4().hex[:8], out_path, items, max(1, int(max_attempts)))
+        with self._lock:
+            self._evict_locked()
+            self.jobs[job.id] = job
+        snapshot = worker.clone()
+        for item in items:
+            self._pool.submit(self._run, job, snapshot, item)
+        if not items:
+            job.finished = time.time()
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self.jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> None:
+        """Skip the job's items that have not started yet."""
+        job = self.jobs.get(job_id)
+        if job:
+            job.cancelled = True
+            job._cancel.set()
+
+    def _evict_locked(self) -> None:
+        finished = sorted((j for j in self.jobs.values() if j.finished is not None), key=lambda j: j.finished)
+        cutoff = time.time() - self.finished_ttl
+        excess = len(finished) - self.max_finished
+        for i, job in enumerate(finished):
+            if i < excess or job.finished < cutoff:
+                del self.jobs[job.id]
+
+    def _backoff(self, attempt: int, exc: BaseException) -> float:
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * (2 ** (attempt - 1))))
+        ra = retry_after_of(exc)
+        return max(delay, ra) if ra is not None else delay
+
+    def _run(self, job: Job, worker: JDWorker, item: JobItem) -> None:
+        if job.cancelled:
+            item.status = "cancelled"
+        else:
+            t0 = time.perf_counter()
+            while item.status not in ("ok", "failed"):
+                item.attempts += 1
+                item.status = "running" if item.attempts == 1 else "retrying"
+                try:
+                    text = worker.generate(item.text)
+                    save_to_jsonl(text, job.out_path, provenance=worker.provenance(item.text))
+                    item.status, item.error = "ok", None
+                except Exception as e:
+                    item.error = str(e)
+                    if item.attempts >= job.max_attempts:
+                        item.status = "failed"
+                        continue
+                    item.status = "retrying"
+                    if job._cancel.wait(self._backoff(item.attempts, e)):
+                        item.status = "cancelled"
+                        break
+            item.seconds = time.perf_counter() - t0
+        with job._lock:
+            if job.finished is None and job.done:
+                job.finished = time.time()
@@ -1,7 +1,85 @@
-from openai import OpenAI
-from google import genai
-from google.genai import types
+import asyncio
+import hashlib
+import json
 import os
+import threading
+import time
+import weakref
+
+from .cache import ResponseCache, make_key
+from .retrieval import estimate_tokens
+from .scheduler import Scheduler
+from .schema import RECORD_SCHEMA, openai_response_format, gemini_response_schema, validate_answer
+from .storage import _strip_code_fences
+from .metrics import METRICS, usage_of
+
+# output tokens reserved per request when budgeting against a TPM quota
+EXPECTED_OUTPUT_TOKENS = 1500
+
+_SCHEMA_TAGS: dict = {}  # id(schema) -> (schema, tag); holding the schema keeps its id from being reused
+
+def _schema_tag(schema: dict) -> str:
+    hit = _SCHEMA_TAGS.get(id(schema))
+    if hit is None:
+        tag = hashlib.sha256(json.dumps(schema, sort_keys=True).encode("utf-8")).hexdigest()[:12]
+        hit = _SCHEMA_TAGS[id(schema)] = (schema, tag)
+    return hit[1]
+
+# ---------------- Shared SDK clients ----------------
+# The provider SDKs are slow to import, so each is only imported when a client for it is first built.
+# SDK clients own the HTTP connection pools, so one per (provider, api_key) is shared
+# by every LLMClient in the process; rebuilding an LLMClient keeps TLS/keep-alive.
+_CLIENT_POOL: dict = {}
+_POOL_LOCK = threading.Lock()
+# async clients bind their connections to the event loop that first used them
+_ASYNC_POOLS: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+def get_shared_client(provider: str, api_key: str, base_url: str | None = None):
+    """Process-wide blocking SDK client for (provider, api_key, base_url)."""
+    with _POOL_LOCK:
+        client = _CLIENT_POOL.get((provider, api_key, base_url))
+        if client is None:
+            if provider == "openai":
+                from openai import OpenAI
+                client = OpenAI(api_key=api_key, base_url=base_url)
+            elif provider == "gemini":
+                from google import genai
+                from google.genai import types
+                http_options = types.HttpOptions(base_url=base_url) if base_url else None
+                client = genai.Client(api_key=api_key, http_options=http_options)
+            else:
+                raise NotImplementedError(f"Unsupported provider: {provider}")
+            _CLIENT_POOL[(provider, api_key, base_url)] = client
+        return client
+
+def get_shared_async_client(provider: str, api_key: str, base_url: str | None = None):
+    """Async SDK client for (provider, api_key, base_url), shared within the running event loop."""
+    if provider == "gemini":
+        # genai.Client exposes its async surface as .aio
+        return get_shared_client(provider, api_key, base_url).aio
+    loop = asyncio.get_running_loop()
+    with _POOL_LOCK:
+        pool = _ASYNC_POOLS.setdefault(loop, {})
+        client = pool.get((provider, api_key, base_url))
+        if client is None:
+            if provider == "openai":
+                from openai import AsyncOpenAI
+                client = AsyncOpenAI(api_key=api_key, base_url=base_url)
+            else:
+                raise NotImplementedError(f"Unsupported provider: {provider}")
+            pool[(provider, api_key, base_url)] = client
+        return client
+
+def _primed(raw, first):
+    """Re-attach an already fetched first chunk; closing this closes the underlying stream."""
+    try:
+        if first is not None:
+            yield first
+        yield from raw
+    finally:
+        close = getattr(raw, "close", None)
+        if close:
+            close()
 
 class LLMClient:
     def __init__(
@@ -11,7 +89,12 @@ class LLMClient:
         model: str,
         system_prompt: str = "",
         temperature: float = 0.0,
-        reasoning_effort: str = "low"
+        reasoning_effort: str = "low",
+        cache: ResponseCache | None = None,
+        api_key: str | None = None,
+        scheduler: Scheduler | None = None,
+        structured_output: bool = False,
+        base_url: str | None = None
     ):
         # Basic fields
         self.provider = provider                  # "openai" | "gemini"
@@ -21,6 +104,11 @@ class LLMClient:
         self.temperature = float(temperature)     # 0.0 ~ 1.0
         # ["high","medium","low","minimal","dynamic"]; "dynamic" is for Gemini thinking
         self.reasoning_effort = reasoning_effort
+        self.cache = cache                        # optional ResponseCache
+        self.api_key = api_key                    # used to look up the pooled async client
+        self.scheduler = scheduler                # optional rate limiting / retry
+        self.structured_output = structured_output  # provider-enforced RECORD_SCHEMA output
+        self.base_url = base_url                  # API endpoint override (proxy / local mock server)
 
     # ---------------- OpenAI ----------------
     @classmethod
@@ -30,20 +118,25 @@ class LLMClient:
         api_key=None,
         system_prompt: str = "",
         temperature: float = 0.0,
-        reasoning_effort: str = "low"
+        reasoning_effort: str = "low",
+        cache: ResponseCache | None = None,
+        base_url: str | None = None
     ):
         """Initialize an OpenAI chat client."""
         key = api_key or os.environ.get("OPENAI_API_KEY")
         if not key:
             raise ValueError("Missing OPENAI_API_KEY")
-        client = OpenAI(api_key=key)
+        client = get_shared_client("openai", key, base_url)
         return cls(
             provider="openai",
             client_obj=client,
             model=model,
             system_prompt=system_prompt,
             temperature=temperature,
-            reasoning_effort=reasoning_effort
+            reasoning_effort=reasoning_effort,
+            cache=cache,
+            api_key=key,
+            base_url=base_url
         )
 
     # ---------------- Gemini (google-genai) ----------------
@@ -54,61 +147,254 @@ class LLMClient:
         api_key=None,
         system_prompt: str = "",
         temperature: float = 0.0,
-        reasoning_effort: str = "low"
+        reasoning_effort: str = "low",
+        cache: ResponseCache | None = None,
+        base_url: str | None = None
     ):
         """Initialize a Gemini client (google-genai)."""
         key = api_key or os.environ.get("GEMINI_API_KEY")
         if not key:
             raise ValueError("Missing GEMINI_API_KEY")
-        client = genai.Client(api_key=key)
+        client = get_shared_client("gemini", key, base_url)
         return cls(
             provider="gemini",
             client_obj=client,
             model=model,
             system_prompt=system_prompt,
             temperature=temperature,
-            reasoning_effort=reasoning_effort
+            reasoning_effort=reasoning_effort,
+            cache=cache,
+            api_key=key,
+            base_url=base_url
         )
 
     # ---------------- Query ----------------
-    def query(self, prompt: str) -> str:
-        """Send prompt and get plain text response."""
-        if self.provider == "openai":
-            resp = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": self.system_prompt},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=self.temperature,
-                reasoning_effort=self.reasoning_effort
+    def query(self, prompt: str, system_prompt: str | None = None, schema: dict | None = None) -> str:
+        """
+        Send prompt and get plain text response (served from cache when possible).
+        `system_prompt` overrides self.system_prompt for this call only; `schema` replaces
+        RECORD_SCHEMA as the enforced output schema in structured mode (e.g. PACKED_SCHEMA).
+        """
+        system_prompt = self.system_prompt if system_prompt is None else system_prompt
+        key = self._cache_key(prompt, system_prompt, schema)
+        if key is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                METRICS.inc("jd_llm_cache_hits_total", provider=self.provider, model=self.model)
+                return cached
+        self._observe_prompt(prompt, system_prompt)
+        if self.scheduler is None:
+            text = self._query_raw(prompt, system_prompt, schema)
+        else:
+            text = self.scheduler.call(
+                self.provider, self.model, self._estimate_tokens(prompt, system_prompt),
+                self._query_raw, prompt, system_prompt, schema
             )
-            return (resp.choices[0].message.content or "").strip()
+        if key is not None and self._cacheable(text, schema):
+            self.cache.put(key, text)
+        return text
 
-        elif self.provider == "gemini":
-            text = (self.system_prompt + "\n" + prompt).strip() if self.system_prompt else prompt
+    async def aquery(self, prompt: str, system_prompt: str | None = None, schema: dict | None = None) -> str:
+        """Async variant of query() using the pooled async SDK client."""
+        system_prompt = self.system_prompt if system_prompt is None else system_prompt
+        key = self._cache_key(prompt, system_prompt, schema)
+        if key is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                METRICS.inc("jd_llm_cache_hits_total", provider=self.provider, model=self.model)
+                return cached
+        self._observe_prompt(prompt, system_prompt)
+        if self.scheduler is None:
+            text = await self._aquery_raw(prompt, system_prompt, schema)
+        else:
+            text = await self.scheduler.acall(
+                self.provider, self.model, self._estimate_tokens(prompt, system_prompt),
+                self._aquery_raw, prompt, system_prompt, schema
+            )
+        if key is not None and self._cacheable(text, schema):
+            self.cache.put(key, text)
+        return text
 
-            # Always map reasoning_effort -> thinking_budget; if None, don't pass it.
-            budget = self._get_thinking_budget()
-            thinking_cfg = types.ThinkingConfig(thinking_budget=budget) if isinstance(budget, int) else None
+    def stream(self, prompt: str, system_prompt: str | None = None):
+        """
+        Yield the response text chunk by chunk. Closing the generator early aborts the
+        HTTP stream; a fully consumed response is stored in the cache.
+        """
+        system_prompt = self.system_prompt if system_prompt is None else system_prompt
+        key = self._cache_key(prompt, system_prompt)
+        if key is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                METRICS.inc("jd_llm_cache_hits_total", provider=self.provider, model=self.model)
+                yield cached
+                return
+        self._observe_prompt(prompt, system_prompt)
 
-            gen_config = types.GenerateContentConfig(
-                temperature=self.temperature,
-                thinking_config=thinking_cfg  # None is fine
+        # retries only cover opening the stream; a failure mid-stream propagates
+        if self.scheduler is None:
+            raw = self._open_stream(prompt, system_prompt)
+        else:
+            raw = self.scheduler.call(
+                self.provider, self.model, self._estimate_tokens(prompt, system_prompt),
+                self._open_stream, prompt, system_prompt
             )
 
-            resp = self.client.models.generate_content(
-                model=self.model,
-                contents=text,
-                config=gen_config
-            )
-            content = resp.text or ""
-            return content.strip()
+        parts = []
+        usage = None
+        t0 = time.perf_counter()
+        try:
+            for chunk in raw:
+                usage = usage_of(self.provider, chunk) or usage
+                if self.provider == "openai":
+                    piece = (chunk.choices[0].delta.content or "") if chunk.choices else ""
+                else:
+                    piece = chunk.text or ""
+                if piece:
+                    parts.append(piece)
+                    yield piece
+        finally:
+            close = getattr(raw, "close", None)
+            if close:
+                close()
+
+        METRICS.observe("jd_stage_seconds", time.perf_counter() - t0,
+                        stage="llm_stream", provider=self.provider, model=self.model)
+        if usage:
+            METRICS.record_usage(self.provider, self.model, **usage)
+        text = "".join(parts).strip()
+        if key is not None and self._cacheable(text):
+            self.cache.put(key, text)
 
+    def _open_stream(self, prompt: str, system_prompt: str):
+        if self.provider == "openai":
+            return self.client.chat.completions.create(
+                stream=True, stream_options={"include_usage": True}, **self._openai_request(prompt, system_prompt)
+            )
+        elif self.provider == "gemini":
+            # google-genai sends the request lazily; pull the first chunk here so that
+            # errors (429 etc.) surface inside the scheduler's retry loop
+            raw = self.client.models.generate_content_stream(**self._gemini_request(prompt, system_prompt))
+            return _primed(raw, next(raw, None))
         else:
             raise NotImplementedError(f"Unsupported provider: {self.provider}")
 
+    def _query_raw(self, prompt: str, system_prompt: str, schema: dict | None = None) -> str:
+        with METRICS.span("llm_call", provider=self.provider, model=self.model):
+            if self.provider == "openai":
+                resp = self.client.chat.completions.create(**self._openai_request(prompt, system_prompt, schema))
+                text = (resp.choices[0].message.content or "").strip()
+
+            elif self.provider == "gemini":
+                resp = self.client.models.generate_content(**self._gemini_request(prompt, system_prompt, schema))
+                content = resp.text or ""
+                text = content.strip()
+
+            else:
+                raise NotImplementedError(f"Unsupported provider: {self.provider}")
+        self._record_usage(resp)
+        return text
+
+    async def _aquery_raw(self, prompt: str, system_prompt: str, schema: dict | None = None) -> str:
+        aclient = self._async_client()
+        with METRICS.span("llm_call", provider=self.provider, model=self.model):
+            if self.provider == "openai":
+                resp = await aclient.chat.completions.create(**self._openai_request(prompt, system_prompt, schema))
+                text = (resp.choices[0].message.content or "").strip()
+
+            elif self.provider == "gemini":
+                resp = await aclient.models.generate_content(**self._gemini_request(prompt, system_prompt, schema))
+                content = resp.text or ""
+                text = content.strip()
+
+            else:
+                raise NotImplementedError(f"Unsupported provider: {self.provider}")
+        self._record_usage(resp)
+        return text
+
+    def _openai_request(self, prompt: str, system_prompt: str, schema: dict | None = None) -> dict:
+        req = dict(
+            model=self.model,
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": prompt}
+            ],
+            temperature=self.temperature,
+            reasoning_effort=self.reasoning_effort
+        )
+        if self.structured_output:
+            req["response_format"] = openai_response_format(schema or RECORD_SCHEMA)
+        return req
+
+    def _gemini_request(self, prompt: str, system_prompt: str, schema: dict | None = None) -> dict:
+        from google.genai import types
+        text = (system_prompt + "\n" + prompt).strip() if system_prompt else prompt
+
+        # Always map reasoning_effort -> thinking_budget; if None, don't pass it.
+        budget = self._get_thinking_budget()
+        thinking_cfg = types.ThinkingConfig(thinking_budget=budget) if isinstance(budget, int) else None
+
+        schema_cfg = {}
+        if self.structured_output:
+            schema_cfg = dict(response_mime_type="application/json", response_schema=gemini_response_schema(schema or RECORD_SCHEMA))
+
+        gen_config = types.GenerateContentConfig(
+            temperature=self.temperature,
+            thinking_config=thinking_cfg,  # None is fine
+            **schema_cfg
+        )
+        return dict(model=self.model, contents=text, config=gen_config)
+
     # ---------------- Helpers ----------------
+    def _cache_key(self, prompt: str, system_prompt: str, schema: dict | None = None):
+        if self.cache is None:
+            return None
+        # the requested answer shape (record / compact / packed) and the endpoint are part of the
+        # request; the defaults add nothing, so entries cached before they were keyed stay valid
+        extra = []
+        if self.structured_output:
+            extra.append("structured")
+        if schema is not None and schema is not RECORD_SCHEMA:
+            extra.append(f"schema={_schema_tag(schema)}")
+        if self.base_url:
+            extra.append(f"base_url={self.base_url}")
+        return make_key(
+            self.provider, self.model, self.temperature, self.reasoning_effort,
+            system_prompt, prompt, *extra
+        )
+
+    @staticmethod
+    def _cacheable(text: str, schema: dict | None = None) -> bool:
+        """Only answers matching the requested schema are cached, so a truncated or invalid one is asked again."""
+        if not text:
+            return False
+        try:
+            obj = json.loads(_strip_code_fences(text)[0])
+        except ValueError:
+            return False
+        ok = not validate_answer(obj, schema or RECORD_SCHEMA)
+        if not ok:
+            METRICS.inc("jd_llm_cache_rejected_total")
+        return ok
+
+    def _observe_prompt(self, prompt: str, system_prompt: str) -> None:
+        METRICS.observe("jd_prompt_tokens", estimate_tokens(system_prompt) + estimate_tokens(prompt),
+                        provider=self.provider, model=self.model)
+
+    def _record_usage(self, resp) -> None:
+        usage = usage_of(self.provider, resp)
+        if usage:
+            METRICS.record_usage(self.provider, self.model, **usage)
+
+    def _estimate_tokens(self, prompt: str, system_prompt: str) -> int:
+        return estimate_tokens(system_prompt) + estimate_tokens(prompt) + EXPECTED_OUTPUT_TOKENS
+
+    def _async_client(self):
+        if self.provider == "gemini":
+            return self.client.aio
+        if not self.api_key:
+            raise ValueError("aquery needs the api_key the client was built with")
+        return get_shared_async_client(self.provider, self.api_key, self.base_url)
+
     def _get_thinking_budget(self):
         """Map reasoning_effort to Gemini thinking_budget."""
         mapping = {
@@ -134,6 +420,15 @@ class LLMClient:
     def set_model(self, model: str):
         self.model = model
 
+    def set_cache(self, cache: ResponseCache | None):
+        self.cache = cache
+
+    def set_scheduler(self, scheduler: Scheduler | None):
+        self.scheduler = scheduler
+
+    def set_structured_output(self, structured_output: bool):
+        self.structured_output = bool(structured_output)
+
 
 # For debugging and an example to use
 if __name__ == "__main__":
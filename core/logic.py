@@ -1,9 +1,30 @@
-from dataclasses import dataclass, field
-from typing import Optional
+import asyncio
+import json
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field, replace
+from typing import Callable, List, Optional, Tuple
 
-from .prompt_builder import SYSTEM_PROMPT, build_prompt
+from .prompt_builder import (
+    COMPACT_SECTION, build_prompt, build_packed_prompt, build_system_prompt, get_system_prompt,
+)
+from .retrieval import get_vocab_index
+from .preprocess import prune_jd
+from .vocab import DEFAULT_PATH as VOCAB_PATH
 from .llm_client import LLMClient
-from .storage import save_to_jsonl
+from .storage import save_to_jsonl, parse_record, expand_compact_text
+from .cache import ResponseCache, get_cache
+from .scheduler import RateLimits, get_scheduler
+from .streaming import IncrementalRecordParser
+from .chunking import split_jd, merge_records
+from .metrics import METRICS
+from .cascade import CascadePolicy, CascadeStep, LOCAL_STEP, review, record_escalation
+from .hedge import get_hedger, passes_validation
+from .packing import split_packed
+from .provenance import provenance
+from .prepass import extract_local
+from .schema import COMPACT_SCHEMA, PACKED_COMPACT_SCHEMA, PACKED_SCHEMA
 
 @dataclass
 class Configurations:
@@ -11,7 +32,24 @@ class Configurations:
     model: str            = "gpt-5"
     temperature: float    = 0.0
     reasoning_effort: str = "low"
-    system_prompt: str    = SYSTEM_PROMPT
+    system_prompt: str    = ""         # empty: built-in prompt, kept in step with the vocab
+    cache_path: Optional[str] = None   # SQLite response cache; None disables caching
+    vocab_budget: Optional[int] = None # prompt tokens for per-JD vocab; None sends the whole vocab
+    prune_jd: bool        = False      # strip job-board chrome / EEO / salary / benefits sections first
+    rpm: Optional[int]    = None       # provider quota for this model (requests / tokens per minute)
+    tpm: Optional[int]    = None
+    structured_output: bool = False    # provider-enforced JSON schema (response_format / response_schema)
+    compact_output: bool = False       # model answers in the compact wire encoding, expanded before parsing
+    chunk_tokens: Optional[int] = None # JDs longer than this are split on sections and extracted in parallel
+    base_url: Optional[str] = None     # API endpoint override, e.g. a proxy or core.mockserver
+    cascade: Optional[List[CascadeStep]] = None  # cheapest first; replaces provider/model/reasoning_effort when set
+    cascade_policy: CascadePolicy = field(default_factory=CascadePolicy)
+    hedge: Optional[CascadeStep] = None  # secondary provider/model raced against a slow or failing primary (each cascade step)
+    hedge_quantile: float = 0.95         # primary latency percentile after which the hedge fires
+    local_only: bool = False             # fast mode: vocab dictionary pre-pass only, no model call
+
+def _answer_valid(answer: Tuple[str, CascadeStep]) -> bool:
+    return passes_validation(answer[0])
 
 @dataclass
 class ApiKeys:
@@ -26,6 +64,15 @@ class JDWorker:
         self._keys = ApiKeys()
         self._llm: Optional[LLMClient] = None
         self._need_rebuild = True
+        self._lock = threading.Lock()  # generate() may run on several threads (core.batch)
+        self._subs: Optional[tuple] = None  # ((config, keys), {CascadeStep: JDWorker}) for cascade / hedging
+        self._answered: "OrderedDict[str, List[CascadeStep]]" = OrderedDict()  # JD text -> who answered, newest last
+
+    def clone(self) -> "JDWorker":
+        """An independent worker with a copy of this one's settings and keys (SDK clients stay shared)."""
+        other = JDWorker(replace(self.config))
+        other._keys = replace(self._keys)
+        return other
 
     # ------ Configuration change ------
     def set_provider(self, provider: str):
@@ -35,17 +82,23 @@ class JDWorker:
 
     def set_api_key(self, provider: str, key: Optional[str]):
         p = (provider or "").lower()
+        # Streamlit calls this on every rerun; only an actual key change needs a new client
         if p == "openai":
-            self._keys.openai = key
-            if self.config.provider == "openai":
+            if key != self._keys.openai and self.config.provider == "openai":
                 self._need_rebuild = True
+            self._keys.openai = key
         elif p == "gemini":
-            self._keys.gemini = key
-            if self.config.provider == "gemini":
+            if key != self._keys.gemini and self.config.provider == "gemini":
                 self._need_rebuild = True
+            self._keys.gemini = key
         else:
             raise ValueError("provider must be 'openai' or 'gemini'")
 
+    def set_base_url(self, base_url: Optional[str]):
+        if (base_url or None) != self.config.base_url:
+            self.config.base_url = base_url or None
+            self._need_rebuild = True
+
     def set_model(self, model: str):
         self.config.model = model
         if self._llm:
@@ -66,25 +119,394 @@ class JDWorker:
         if self._llm:
             self._llm.set_system_prompt(system_prompt)
 
+    def set_cache_path(self, cache_path: Optional[str]):
+        self.config.cache_path = cache_path or None
+        if self._llm:
+            self._llm.set_cache(self._get_cache())
+
+    def set_vocab_budget(self, vocab_budget: Optional[int]):
+        self.config.vocab_budget = vocab_budget
+
+    def set_rate_limits(self, rpm: Optional[int] = None, tpm: Optional[int] = None):
+        self.config.rpm = rpm
+        self.config.tpm = tpm
+
+    def scheduler_stats(self) -> dict:
+        return get_scheduler().stats()
+
+    def set_structured_output(self, structured_output: bool):
+        self.config.structured_output = bool(structured_output)
+        if self._llm:
+            self._llm.set_structured_output(self.config.structured_output)
+
+    def set_compact_output(self, compact_output: bool):
+        self.config.compact_output = bool(compact_output)
+
+    def set_prune_jd(self, prune: bool):
+        self.config.prune_jd = bool(prune)
+
+    def set_local_only(self, local_only: bool):
+        self.config.local_only = bool(local_only)
+
+    def set_chunk_tokens(self, chunk_tokens: Optional[int]):
+        self.config.chunk_tokens = chunk_tokens
+
+    def set_cascade(self, cascade: Optional[List[CascadeStep]], policy: Optional[CascadePolicy] = None):
+        self.config.cascade = list(cascade) if cascade else None
+        if policy is not None:
+            self.config.cascade_policy = policy
+
+    def set_hedge(self, hedge: Optional[CascadeStep], quantile: Optional[float] = None):
+        self.config.hedge = hedge
+        if quantile is not None:
+            self.config.hedge_quantile = float(quantile)
+
+    def hedge_stats(self) -> dict:
+        return get_hedger().stats()
+
+    def cache_stats(self) -> Optional[dict]:
+        cache = self._get_cache()
+        return cache.stats() if cache else None
+
     # ------ Actions ------
     def generate(self, jd_text: str) -> str:
+        with METRICS.span("generate"):
+            chunks = self._chunks(jd_text)
+            if len(chunks) > 1:
+                with ThreadPoolExecutor(max_workers=len(chunks)) as pool:
+                    answers = list(pool.map(self._answer_one, chunks))
+                text = self._merge([t for t, _ in answers])
+            else:
+                answers = [self._answer_one(chunks[0])]
+                text = answers[0][0]
+            self._remember(jd_text, [step for _, step in answers])
+            return text
+
+    def generate_stream(self, jd_text: str, on_event: Optional[Callable[[tuple], None]] = None) -> str:
+        """
+        Stream the generation, passing parser events (e.g. ("skill", "required", item)) to on_event
+        as they complete. Raises StreamAborted, closing the stream, when the output leaves the schema.
+        A chunked JD, or any JD under a cascade, hedging, local_only or compact_output, is extracted
+        as in generate() and its record is replayed as events.
+        """
+        chunks = self._chunks(jd_text)
+        parser = IncrementalRecordParser()
+        c = self.config
+        if len(chunks) > 1 or c.cascade or c.hedge or c.local_only or c.compact_output:
+            text = self.generate(jd_text)
+            for event in parser.feed(text):
+                if on_event:
+                    on_event(event)
+            return text
+
+        llm, user_prompt, system_prompt = self._prepare(chunks[0])
+        stream = llm.stream(user_prompt, system_prompt=system_prompt)
+        try:
+            for chunk in stream:
+                for event in parser.feed(chunk):
+                    if on_event:
+                        on_event(event)
+        finally:
+            stream.close()
+        return parser.text if parser.done else parser.buf.strip()
+
+    async def agenerate(self, jd_text: str) -> str:
+        with METRICS.span("generate"):
+            chunks = self._chunks(jd_text)
+            answers = await asyncio.gather(*(self._aanswer_one(c) for c in chunks))
+            text = self._merge([t for t, _ in answers]) if len(chunks) > 1 else answers[0][0]
+            self._remember(jd_text, [step for _, step in answers])
+            return text
+
+    def generate_packed(self, jd_texts: List[str]) -> List[Tuple[Optional[str], Optional[Exception]]]:
+        """
+        Extract several short JDs with one request so the system prompt is sent once.
+        Returns (text, error) per JD, in order; a JD whose record is missing or invalid
+        in the packed answer is extracted again on its own with generate().
+        Under a cascade, hedging or local_only every JD goes through generate() instead.
+        """
+        def single(i):
+            try:
+                return self.generate(jd_texts[i]), None
+            except Exception as e:
+                return None, e
+
+        def each(indices):
+            if not indices:
+                return []
+            with ThreadPoolExecutor(max_workers=len(indices)) as pool:
+                return list(pool.map(single, indices))
+
+        if not self._packable():
+            return each(list(range(len(jd_texts))))
+        with METRICS.span("generate_packed"):
+            records = {}
+            try:
+                llm, user_prompt, system_prompt = self._prepare_packed(jd_texts)
+                text = llm.query(user_prompt, system_prompt=system_prompt, schema=self._packed_schema())
+                records = split_packed(text, len(jd_texts), self.config.compact_output)
+            except Exception as e:
+                self._packed_failed(len(jd_texts), e)
+            retry = [i for i in range(len(jd_texts)) if i not in records]
+            self._count_packed(len(jd_texts), len(retry))
+            for i in records:
+                self._remember(jd_texts[i], [self._own_step()])
+
+            results = {i: (json.dumps(r, ensure_ascii=False), None) for i, r in records.items()}
+            results.update(zip(retry, each(retry)))
+            return [results[i] for i in range(len(jd_texts))]
+
+    async def agenerate_packed(self, jd_texts: List[str]) -> List[Tuple[Optional[str], Optional[Exception]]]:
+        """Async variant of generate_packed()."""
+        async def single(i):
+            try:
+                return await self.agenerate(jd_texts[i]), None
+            except Exception as e:
+                return None, e
+
+        if not self._packable():
+            return list(await asyncio.gather(*(single(i) for i in range(len(jd_texts)))))
+        with METRICS.span("generate_packed"):
+            records = {}
+            try:
+                llm, user_prompt, system_prompt = self._prepare_packed(jd_texts)
+                text = await llm.aquery(user_prompt, system_prompt=system_prompt, schema=self._packed_schema())
+                records = split_packed(text, len(jd_texts), self.config.compact_output)
+            except Exception as e:
+                self._packed_failed(len(jd_texts), e)
+            retry = [i for i in range(len(jd_texts)) if i not in records]
+            self._count_packed(len(jd_texts), len(retry))
+            for i in records:
+                self._remember(jd_texts[i], [self._own_step()])
+
+            results = {i: (json.dumps(r, ensure_ascii=False), None) for i, r in records.items()}
+            results.update(zip(retry, await asyncio.gather(*(single(i) for i in retry))))
+            return [results[i] for i in range(len(jd_texts))]
+
+    def save(self, ai_text: str, path: str, jd_text: Optional[str] = None) -> None:
+        save_to_jsonl(ai_text, path, provenance=self.provenance(jd_text))
+
+    def provenance(self, jd_text: Optional[str] = None) -> dict:
+        """
+        Stamp for records extracted with the current settings (see core.provenance), naming
+        the model that actually answered when this worker extracted jd_text recently.
+        """
+        answered = None
+        if jd_text is not None:
+            with self._lock:
+                answered = self._answered.get(jd_text)
+        return provenance(self.config, jd_text, answered)
+
+    _ANSWERED_MAX = 4096  # JDs whose answering model is remembered for provenance()
+
+    def _remember(self, jd_text: str, steps: List[CascadeStep]) -> None:
+        with self._lock:
+            self._answered.pop(jd_text, None)
+            self._answered[jd_text] = steps
+            while len(self._answered) > self._ANSWERED_MAX:
+                self._answered.popitem(last=False)
+
+    def _own_step(self) -> CascadeStep:
+        return CascadeStep(self.config.provider, self.config.model, self.config.reasoning_effort)
+
+    def _answer_one(self, jd_text: str) -> Tuple[str, CascadeStep]:
+        """(text, the step whose model answered) for one JD or chunk."""
+        if self.config.local_only:
+            return self._local(jd_text), LOCAL_STEP
+        if self.config.cascade:
+            return self._cascade(jd_text)
+        if self.config.hedge:
+            return self._hedged(jd_text)
+        llm, user_prompt, system_prompt = self._prepare(jd_text)
+        text = llm.query(user_prompt, system_prompt=system_prompt, schema=self._wire_schema())
+        return self._from_wire(text), self._own_step()
+
+    async def _aanswer_one(self, jd_text: str) -> Tuple[str, CascadeStep]:
+        if self.config.local_only:
+            return self._local(jd_text), LOCAL_STEP
+        if self.config.cascade:
+            return await self._acascade(jd_text)
+        if self.config.hedge:
+            return await self._ahedged(jd_text)
+        llm, user_prompt, system_prompt = self._prepare(jd_text)
+        text = await llm.aquery(user_prompt, system_prompt=system_prompt, schema=self._wire_schema())
+        return self._from_wire(text), self._own_step()
+
+    def _wire_schema(self) -> Optional[dict]:
+        return COMPACT_SCHEMA if self.config.compact_output else None
+
+    def _from_wire(self, text: str) -> str:
+        if not self.config.compact_output:
+            return text
+        with METRICS.span("expand"):
+            return expand_compact_text(text)
+
+    @staticmethod
+    def _local(jd_text: str) -> str:
+        with METRICS.span("prepass"):
+            return json.dumps(extract_local(jd_text, VOCAB_PATH), ensure_ascii=False)
+
+    # ------ Model cascade ------
+    def _cascade(self, jd_text: str) -> Tuple[str, CascadeStep]:
+        steps = self._step_workers()
+        for i, (step, worker) in enumerate(steps):
+            try:
+                text, answered = worker._answer_one(jd_text)
+            except Exception as e:
+                if i == len(steps) - 1:
+                    raise
+                record_escalation(step, "error", str(e))
+                continue
+            if self._accept(step, text, jd_text, last=i == len(steps) - 1):
+                return text, answered
+
+    async def _acascade(self, jd_text: str) -> Tuple[str, CascadeStep]:
+        steps = self._step_workers()
+        for i, (step, worker) in enumerate(steps):
+            try:
+                text, answered = await worker._aanswer_one(jd_text)
+            except Exception as e:
+                if i == len(steps) - 1:
+                    raise
+                record_escalation(step, "error", str(e))
+                continue
+            if self._accept(step, text, jd_text, last=i == len(steps) - 1):
+                return text, answered
+
+    def _accept(self, step: CascadeStep, text: str, jd_text: str, last: bool) -> bool:
+        # the last step's output is returned as is; saving still rejects an invalid record
+        if not last:
+            with METRICS.span("review"):
+                verdict = review(text, jd_text, self.config.cascade_policy)
+            if verdict is not None:
+                record_escalation(step, *verdict)
+                return False
+        METRICS.inc("jd_cascade_accepted_total", provider=step.provider, model=step.model)
+        return True
+
+    def _step_workers(self) -> List[tuple]:
+        # each step is hedged on its own, so a slow cheap step still races the hedge before escalating
+        hedge = self.config.hedge
+        return [(step, self._sub_worker(step, hedge=hedge if hedge != step else None))
+                for step in self.config.cascade]
+
+    # ------ Hedged requests ------
+    def _hedge_args(self, jd_text: str, run: str) -> tuple:
+        primary_step = self._own_step()
+        hedge_step = self.config.hedge
+        primary, secondary = self._sub_worker(primary_step), self._sub_worker(hedge_step)
+        return (
+            lambda: getattr(primary, run)(jd_text), lambda: getattr(secondary, run)(jd_text),
+            (primary_step.provider, primary_step.model), (hedge_step.provider, hedge_step.model),
+            self.config.hedge_quantile,
+        )
+
+    # both sides return (text, step), so the winner's step is what answered
+    def _hedged(self, jd_text: str) -> Tuple[str, CascadeStep]:
+        return get_hedger().call(*self._hedge_args(jd_text, "_answer_one"), accept=_answer_valid)
+
+    async def _ahedged(self, jd_text: str) -> Tuple[str, CascadeStep]:
+        return await get_hedger().acall(*self._hedge_args(jd_text, "_aanswer_one"), accept=_answer_valid)
+
+    def _sub_worker(self, step: CascadeStep, hedge: Optional[CascadeStep] = None) -> "JDWorker":
+        """Worker for one cascade / hedge step, rebuilt whenever this worker's settings or keys change."""
+        key = (replace(self.config), replace(self._keys))
+        with self._lock:
+            if self._subs is None or self._subs[0] != key:
+                self._subs = (key, {})
+            workers = self._subs[1]
+            if (step, hedge) not in workers:
+                # pruning / chunking already happened in this worker
+                w = JDWorker(replace(
+                    self.config, provider=step.provider, model=step.model,
+                    reasoning_effort=step.reasoning_effort, cascade=None, hedge=hedge,
+                    prune_jd=False, chunk_tokens=None,
+                ))
+                w._keys = replace(self._keys)
+                workers[(step, hedge)] = w
+            return workers[(step, hedge)]
+
+    def _pruned(self, jd_text: str) -> str:
+        if self.config.prune_jd:
+            with METRICS.span("prune"):
+                return prune_jd(jd_text).text
+        return jd_text
+
+    def _chunks(self, jd_text: str) -> List[str]:
+        jd_text = self._pruned(jd_text)
+        if not self.config.chunk_tokens:
+            return [jd_text]
+        with METRICS.span("split"):
+            return split_jd(jd_text, self.config.chunk_tokens)
+
+    @staticmethod
+    def _merge(outputs: List[str]) -> str:
+        # every chunk must parse; canonicalization is left to the save step as for single calls
+        records = [parse_record(text, canonicalize=False) for text in outputs]
+        with METRICS.span("merge"):
+            return json.dumps(merge_records(records), ensure_ascii=False)
+
+    def _prepare_packed(self, jd_texts: List[str]):
+        texts = [self._pruned(t) for t in jd_texts]
+        return self._prepare("\n".join(texts), build_packed_prompt(texts, self.config.structured_output, self.config.compact_output))
+
+    def _packable(self) -> bool:
+        # a cascade / hedge picks the answering model per JD; the local pre-pass has no prompt to share
+        c = self.config
+        return not (c.cascade or c.hedge or c.local_only)
+
+    def _packed_schema(self) -> dict:
+        return PACKED_COMPACT_SCHEMA if self.config.compact_output else PACKED_SCHEMA
+
+    def _packed_failed(self, n: int, error: Exception) -> None:
+        METRICS.inc("jd_packed_requests_failed_total", provider=self.config.provider, model=self.config.model,
+                    error=type(error).__name__)
+        METRICS.log({"type": "packed_failed", "provider": self.config.provider, "model": self.config.model,
+                     "jds": n, "error": f"{type(error).__name__}: {error}"})
+
+    @staticmethod
+    def _count_packed(packed: int, retried: int) -> None:
+        METRICS.inc("jd_packed_items_total", packed - retried, outcome="packed")
+        METRICS.inc("jd_packed_items_total", retried, outcome="retried_alone")
+
+    def _prepare(self, jd_text: str, user_prompt: Optional[str] = None):
         llm = self._ensure_client()
-        llm.set_system_prompt(self.config.system_prompt)
-        user_prompt = build_prompt(jd_text)
-        return llm.query(user_prompt)
+        if self.config.rpm or self.config.tpm:
+            get_scheduler().set_limits(
+                self.config.provider, self.config.model,
+                RateLimits(rpm=self.config.rpm, tpm=self.config.tpm)
+            )
+        structured = self.config.structured_output
+        with METRICS.span("build_prompt"):
+            if user_prompt is None:
+                user_prompt = build_prompt(jd_text, structured)
+            return llm, user_prompt, self._system_prompt_for(jd_text)
 
-    def save(self, ai_text: str, path: str) -> None:
-        save_to_jsonl(ai_text, path)
+    def _system_prompt_for(self, jd_text: str) -> str:
+        # a hand-edited system prompt is sent verbatim, plus the encoding it cannot know about
+        if self.config.system_prompt:
+            return self.config.system_prompt + (COMPACT_SECTION if self.config.compact_output else "")
+        structured, compact = self.config.structured_output, self.config.compact_output
+        if self.config.vocab_budget is None:
+            return get_system_prompt(structured, VOCAB_PATH, compact)
+        vocab = get_vocab_index(VOCAB_PATH).select(jd_text, self.config.vocab_budget)
+        return build_system_prompt(vocab, structured, compact)
 
     # ------ Buildup/Rebuild LLM Client ------
     def _ensure_client(self) -> LLMClient:
+        with self._lock:
+            return self._ensure_client_locked()
+
+    def _ensure_client_locked(self) -> LLMClient:
         if self._llm is None or self._need_rebuild:
             if self.config.provider == "openai":
-                self._llm = LLMClient.init_openai_cilent(
+                self._llm = LLMClient.init_openai_client(
                     model=self.config.model,
                     temperature=self.config.temperature,
                     reasoning_effort=self.config.reasoning_effort,
                     api_key=self._keys.openai,
+                    cache=self._get_cache(),
+                    base_url=self.config.base_url,
                 )
             else:  # "gemini"
                 self._llm = LLMClient.init_gemini_client(
@@ -92,7 +514,14 @@ class JDWorker:
                     temperature=self.config.temperature,
                     reasoning_effort=self.config.reasoning_effort,
                     api_key=self._keys.gemini,
+                    cache=self._get_cache(),
+                    base_url=self.config.base_url,
                 )
             self._llm.set_system_prompt(self.config.system_prompt)
+            self._llm.set_scheduler(get_scheduler())
+            self._llm.set_structured_output(self.config.structured_output)
             self._need_rebuild = False
-        return self._llm
\ No newline at end of file
+        return self._llm
+
+    def _get_cache(self) -> Optional[ResponseCache]:
+        return get_cache(self.config.cache_path) if self.config.cache_path else None
@@ -0,0 +1,269 @@
+# core/metrics.py
+import bisect
+import cProfile
+import json
+import pstats
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# seconds per pipeline stage (LLM calls are the "llm_call" stage)
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 40, 80, 160)
+# estimated prompt tokens (system + user) per LLM call
+PROMPT_BUCKETS = (250, 500, 1000, 2000, 4000, 8000, 16000, 32000, 64000, 128000)
+
+# USD per 1M (input, output) tokens, matched by longest model-name prefix; reasoning tokens bill as output.
+# List prices at the time of writing -- override with set_price() for your contract.
+PRICES: Dict[str, Tuple[float, float]] = {
+    "gpt-5-nano": (0.05, 0.40),
+    "gpt-5-mini": (0.25, 2.00),
+    "gpt-5": (1.25, 10.00),
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+    "gemini-2.5-flash-lite": (0.10, 0.40),
+    "gemini-2.5-flash": (0.30, 2.50),
+    "gemini-2.5-pro": (1.25, 10.00),
+}
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _labels(labels: Dict[str, Any]) -> Labels:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+def _fmt_labels(labels: Labels, extra: Labels = ()) -> str:
+    items = labels + extra
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in items) + "}"
+
+def _fmt_value(v: float) -> str:
+    return str(int(v)) if float(v).is_integer() else repr(float(v))
+
+def set_price(model_prefix: str, input_per_m: float, output_per_m: float) -> None:
+    PRICES[model_prefix] = (input_per_m, output_per_m)
+
+def price_of(model: str) -> Optional[Tuple[float, float]]:
+    best = max((p for p in PRICES if (model or "").startswith(p)), key=len, default=None)
+    return PRICES[best] if best else None
+
+
+class Histogram:
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)   # last: +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Metrics:
+    """
+    Process-wide counters and histograms, rendered as Prometheus text and optionally
+    mirrored event by event (spans, LLM usage) to a JSONL log.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters: Dict[Tuple[str, Labels], float] = {}
+        self.histograms: Dict[Tuple[str, Labels], Histogram] = {}
+        self._buckets: Dict[str, Tuple[float, ...]] = {
+            "jd_stage_seconds": LATENCY_BUCKETS,
+            "jd_prompt_tokens": PROMPT_BUCKETS,
+        }
+        self._log = None
+
+    # ------ Recording ------
+    def inc(self, name: str, value: float = 1, **labels) -> None:
+        key = (name, _labels(labels))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        key = (name, _labels(labels))
+        with self._lock:
+            h = self.histograms.get(key)
+            if h is None:
+                h = self.histograms[key] = Histogram(self._buckets.get(name, LATENCY_BUCKETS))
+            h.observe(value)
+
+    @contextmanager
+    def span(self, stage: str, **labels) -> Iterator[None]:
+        """Time a pipeline stage into jd_stage_seconds{stage=...}; failures also count in jd_stage_errors_total."""
+        t0 = time.perf_counter()
+        status = "ok"
+        try:
+            yield
+        except BaseException:
+            status = "error"
+            raise
+        finally:
+            seconds = time.perf_counter() - t0
+            self.observe("jd_stage_seconds", seconds, stage=stage, **labels)
+            if status == "error":
+                self.inc("jd_stage_errors_total", stage=stage, **labels)
+            self.log({"type": "span", "stage": stage, "seconds": round(seconds, 6), "status": status, **labels})
+
+    def record_usage(
+        self,
+        provider: str,
+        model: str,
+        prompt_tokens: int = 0,
+        completion_tokens: int = 0,
+        reasoning_tokens: int = 0,
+        cached_tokens: int = 0,
+    ) -> float:
+        """Count one call's token usage and its estimated cost; returns the cost in USD."""
+        labels = dict(provider=provider, model=model)
+        self.inc("jd_llm_calls_total", **labels)
+        self.inc("jd_llm_tokens_total", prompt_tokens, kind="prompt", **labels)
+        self.inc("jd_llm_tokens_total", completion_tokens, kind="completion", **labels)
+        self.inc("jd_llm_tokens_total", reasoning_tokens, kind="reasoning", **labels)
+        self.inc("jd_llm_tokens_total", cached_tokens, kind="cached_prompt", **labels)
+        price = price_of(model)
+        cost = 0.0
+        if price:
+            # OpenAI counts reasoning inside completion_tokens; Gemini reports thoughts separately
+            billed_output = completion_tokens + (reasoning_tokens if provider == "gemini" else 0)
+            cost = (prompt_tokens * price[0] + billed_output * price[1]) / 1e6
+            self.inc("jd_llm_cost_usd_total", cost, **labels)
+        self.log({
+            "type": "usage", **labels, "prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+            "reasoning_tokens": reasoning_tokens, "cached_tokens": cached_tokens, "cost_usd": round(cost, 8),
+        })
+        return cost
+
+    # ------ JSONL log ------
+    def set_log(self, path: Optional[str]) -> None:
+        with self._lock:
+            if self._log is not None:
+                self._log.close()
+            self._log = open(path, "a", encoding="utf-8", buffering=1) if path else None
+
+    def log(self, event: Dict[str, Any]) -> None:
+        if self._log is None:
+            return
+        line = json.dumps({"ts": round(time.time(), 3), **event}, ensure_ascii=False)
+        with self._lock:
+            if self._log is not None:
+                self._log.write(line + "\n")
+
+    # ------ Export ------
+    def render(self) -> str:
+        """Prometheus text exposition format."""
+        out: List[str] = []
+        with self._lock:
+            seen = set()
+            for (name, labels), value in sorted(self.counters.items()):
+                if name not in seen:
+                    seen.add(name)
+                    out.append(f"# TYPE {name} counter")
+                out.append(f"{name}{_fmt_labels(labels)} {_fmt_value(value)}")
+            for (name, labels), h in sorted(self.histograms.items(), key=lambda kv: kv[0]):
+                if name not in seen:
+                    seen.add(name)
+                    out.append(f"# TYPE {name} histogram")
+                cum = 0
+                for le, c in zip(list(h.buckets) + ["+Inf"], h.counts):
+                    cum += c
+                    out.append(f"{name}_bucket{_fmt_labels(labels, (('le', str(le)),))} {cum}")
+                out.append(f"{name}_sum{_fmt_labels(labels)} {_fmt_value(h.sum)}")
+                out.append(f"{name}_count{_fmt_labels(labels)} {h.count}")
+        return "\n".join(out) + "\n"
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Per stage: count / total / mean seconds; plus token and cost totals."""
+        with self._lock:
+            stages: Dict[str, Dict[str, float]] = {}
+            for (name, labels), h in self.histograms.items():
+                if name == "jd_stage_seconds":
+                    st = stages.setdefault(dict(labels).get("stage", ""), {"count": 0, "seconds": 0.0})
+                    st["count"] += h.count
+                    st["seconds"] += h.sum
+            totals: Dict[str, float] = {}
+            for (name, labels), v in self.counters.items():
+                if name == "jd_llm_tokens_total":
+                    k = dict(labels)["kind"] + "_tokens"
+                elif name in ("jd_llm_calls_total", "jd_llm_cost_usd_total"):
+                    k = name[len("jd_llm_"):-len("_total")]
+                else:
+                    continue
+                totals[k] = totals.get(k, 0) + v
+        for st in stages.values():
+            st["mean"] = round(st["seconds"] / st["count"], 6) if st["count"] else 0.0
+            st["seconds"] = round(st["seconds"], 6)
+        return {"stages": stages, **totals}
+
+    def serve(self, port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+        """Expose render() at http://host:port/metrics from a daemon thread."""
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = metrics.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+
+METRICS = Metrics()
+
+def get_metrics() -> Metrics:
+    return METRICS
+
+
+# ------ SDK usage ------
+def usage_of(provider: str, resp: Any) -> Optional[Dict[str, int]]:
+    """Token usage reported on an OpenAI chat completion (chunk) or a Gemini response (chunk)."""
+    if provider == "openai":
+        u = getattr(resp, "usage", None)
+        if u is None:
+            return None
+        details = getattr(u, "completion_tokens_details", None)
+        prompt_details = getattr(u, "prompt_tokens_details", None)
+        return {
+            "prompt_tokens": getattr(u, "prompt_tokens", 0) or 0,
+            "completion_tokens": getattr(u, "completion_tokens", 0) or 0,
+            "reasoning_tokens": getattr(details, "reasoning_tokens", 0) or 0,
+            "cached_tokens": getattr(prompt_details, "cached_tokens", 0) or 0,
+        }
+    u = getattr(resp, "usage_metadata", None)
+    if u is None:
+        return None
+    return {
+        "prompt_tokens": getattr(u, "prompt_token_count", 0) or 0,
+        "completion_tokens": getattr(u, "candidates_token_count", 0) or 0,
+        "reasoning_tokens": getattr(u, "thoughts_token_count", 0) or 0,
+        "cached_tokens": getattr(u, "cached_content_token_count", 0) or 0,
+    }
+
+
+# ------ Profiling ------
+@contextmanager
+def profile(path: Optional[str] = None, top: int = 25) -> Iterator[cProfile.Profile]:
+    """cProfile the block; dump stats to `path` (for snakeviz / pstats) or print the top entries."""
+    prof = cProfile.Profile()
+    prof.enable()
+    try:
+        yield prof
+    finally:
+        prof.disable()
+        if path:
+            prof.dump_stats(path)
+        else:
+            pstats.Stats(prof).sort_stats("cumulative").print_stats(top)
@@ -0,0 +1,310 @@
+# core/mockserver.py
+import argparse
+import json
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+
+from .schema import compact_record
+
+_JD_RE = re.compile(r"JOB DESCRIPTION TEXT:\n(.*?)(?:\n\nREMEMBER \*\*NOT\*\*|\Z)", re.DOTALL)
+_SKILL_RE = re.compile(r"experience (?:with|in) ([A-Za-z0-9+#./ -]{2,40}?)(?:[.,;\n]|$)", re.IGNORECASE)
+_YEARS_RE = re.compile(r"(\d+)\+? years")
+_COMPACT_MARKER = b"OUTPUT ENCODING (compact"  # system prompt asking for schema.COMPACT_SCHEMA
+_GEMINI_PATH_RE = re.compile(r"^/[^/]+/models/([^/:]+):(generateContent|streamGenerateContent)")
+
+
+@dataclass
+class MockConfig:
+    """Behaviour of the stub endpoints; rates are per request, latencies in seconds."""
+    latency: float = 0.8             # median time to first token (lognormal)
+    latency_sigma: float = 0.5       # lognormal shape; 0 = fixed latency
+    tokens_per_second: float = 400   # output speed after the first token
+    throttle_rate: float = 0.0       # share of requests answered 429
+    max_concurrency: Optional[int] = None  # requests beyond this many in flight get 429
+    retry_after: float = 0.5         # Retry-After sent with every 429
+    malformed_rate: float = 0.0      # share of answers that are not a valid record
+    reasoning_tokens: int = 0        # reported per answer (usage only)
+    seed: Optional[int] = None
+
+
+def _tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+def fake_record(jd_text: str) -> Dict[str, Any]:
+    """A schema-valid record built from "experience with X" phrases of the JD."""
+    required: List[Dict[str, str]] = []
+    seen = set()
+    for line in jd_text.splitlines():
+        for m in _SKILL_RE.finditer(line):
+            name = m.group(1).strip().lower()
+            if name in seen:
+                continue
+            seen.add(name)
+            y = _YEARS_RE.search(line)
+            required.append({"name": name, "category": "tool", "years": f">={y.group(1)}y" if y else "n/a", "level": "n/a"})
+    lines = [l.strip() for l in jd_text.splitlines() if l.strip()]
+    return {
+        "meta": {"company": lines[1] if len(lines) > 1 else "n/a", "title": lines[0] if lines else "n/a"},
+        "skills": {"required": required[:12], "preferred": required[12:20]},
+        "education": {"degrees": ["bachelor"] if "bachelor" in jd_text.lower() else [], "majors": []},
+    }
+
+
+class MockLLM:
+    """Decides, per request, what the stub answers and how long it takes."""
+
+    def __init__(self, config: MockConfig):
+        self.config = config
+        self._rng = random.Random(config.seed)
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.reset()
+
+    def reset(self) -> None:
+        self.requests = 0
+        self.throttled = 0
+        self.malformed = 0
+        self.prompt_tokens: List[int] = []   # per answered request, as received on the wire
+        self.completion_tokens: List[int] = []
+
+    def admit(self) -> bool:
+        with self._lock:
+            self.requests += 1
+            c = self.config
+            if (c.max_concurrency is not None and self.in_flight >= c.max_concurrency) \
+                    or self._rng.random() < c.throttle_rate:
+                self.throttled += 1
+                return False
+            self.in_flight += 1
+            return True
+
+    def release(self) -> None:
+        with self._lock:
+            self.in_flight -= 1
+
+    def answer(self, prompt: str, compact: bool = False) -> Tuple[str, float, Dict[str, int]]:
+        """(text, seconds to first token, usage) for one prompt; compact answers in the compact wire encoding."""
+        m = _JD_RE.search(prompt)
+        record = fake_record(m.group(1) if m else prompt)
+        text = json.dumps(compact_record(record) if compact else record, ensure_ascii=False)
+        with self._lock:
+            c = self.config
+            ttft = c.latency * (self._rng.lognormvariate(0, c.latency_sigma) if c.latency_sigma else 1.0)
+            if self._rng.random() < c.malformed_rate:
+                self.malformed += 1
+                text = self._rng.choice([
+                    "Sure! Here is the extracted JSON:\n" + text,
+                    text[:len(text) // 2],
+                    text[:-1] + ', "notes": "n/a"}',
+                ])
+            usage = {"prompt": _tokens(prompt), "completion": _tokens(text), "reasoning": c.reasoning_tokens}
+            self.prompt_tokens.append(usage["prompt"])
+            self.completion_tokens.append(usage["completion"])
+        return text, ttft, usage
+
+    def stats(self) -> Dict[str, int]:
+        return {"requests": self.requests, "throttled": self.throttled, "malformed": self.malformed}
+
+
+def _chunks(text: str, size: int = 16) -> List[str]:
+    return [text[i:i + size] for i in range(0, len(text), size)] or [""]
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"   # keep-alive, like the real APIs
+    llm: MockLLM = None
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        raw = self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}"
+        body = json.loads(raw)
+        compact = _COMPACT_MARKER in raw
+        path = self.path.split("?")[0]
+        gem = _GEMINI_PATH_RE.match(path)
+        if path.endswith("/chat/completions"):
+            provider, model, stream = "openai", body.get("model", ""), bool(body.get("stream"))
+            prompt = "\n".join(str(m.get("content", "")) for m in body.get("messages", []))
+        elif gem:
+            provider, model, stream = "gemini", gem.group(1), gem.group(2) == "streamGenerateContent"
+            prompt = "\n".join(p.get("text", "") for c in body.get("contents", []) for p in c.get("parts", []))
+        else:
+            return self._json(404, {"error": {"message": f"unknown path {self.path}"}})
+
+        if not self.llm.admit():
+            return self._throttled(provider)
+        try:
+            text, ttft, usage = self.llm.answer(prompt, compact)
+            gen_seconds = usage["completion"] / self.llm.config.tokens_per_second
+            time.sleep(ttft)
+            if not stream:
+                time.sleep(gen_seconds)
+                return self._json(200, self._openai_body(model, text, usage) if provider == "openai"
+                                  else self._gemini_body(model, text, usage))
+            self._stream(provider, model, text, usage, gen_seconds, body)
+        finally:
+            self.llm.release()
+
+    # ------ Responses ------
+    def _json(self, status: int, obj: Any, headers: Optional[Dict[str, str]] = None) -> None:
+        data = json.dumps(obj).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _throttled(self, provider: str) -> None:
+        ra = self.llm.config.retry_after
+        if provider == "openai":
+            err = {"error": {"message": "Rate limit reached (mock)", "type": "rate_limit_error", "code": "rate_limit_exceeded"}}
+        else:
+            err = {"error": {"code": 429, "message": "Resource has been exhausted (mock)", "status": "RESOURCE_EXHAUSTED"}}
+        self._json(429, err, {"Retry-After": f"{ra:g}", "retry-after-ms": str(int(ra * 1000))})
+
+    @staticmethod
+    def _openai_usage(usage: Dict[str, int]) -> Dict[str, Any]:
+        return {
+            "prompt_tokens": usage["prompt"],
+            "completion_tokens": usage["completion"] + usage["reasoning"],
+            "total_tokens": usage["prompt"] + usage["completion"] + usage["reasoning"],
+            "completion_tokens_details": {"reasoning_tokens": usage["reasoning"]},
+            "prompt_tokens_details": {"cached_tokens": 0},
+        }
+
+    def _openai_body(self, model: str, text: str, usage: Dict[str, int]) -> Dict[str, Any]:
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex}", "object": "chat.completion", "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+            "usage": self._openai_usage(usage),
+        }
+
+    @staticmethod
+    def _gemini_usage(usage: Dict[str, int]) -> Dict[str, int]:
+        return {
+            "promptTokenCount": usage["prompt"], "candidatesTokenCount": usage["completion"],
+            "thoughtsTokenCount": usage["reasoning"],
+            "totalTokenCount": usage["prompt"] + usage["completion"] + usage["reasoning"],
+        }
+
+    def _gemini_body(self, model: str, text: str, usage: Optional[Dict[str, int]], final: bool = True) -> Dict[str, Any]:
+        cand = {"content": {"role": "model", "parts": [{"text": text}]}, "index": 0}
+        if final:
+            cand["finishReason"] = "STOP"
+        out = {"candidates": [cand], "modelVersion": model}
+        if usage:
+            out["usageMetadata"] = self._gemini_usage(usage)
+        return out
+
+    def _stream(self, provider: str, model: str, text: str, usage: Dict[str, int], gen_seconds: float, body) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        pieces = _chunks(text)
+        delay = gen_seconds / len(pieces)
+        cid = f"chatcmpl-{uuid.uuid4().hex}"
+
+        def send(obj):
+            self.wfile.write(b"data: " + (obj if isinstance(obj, bytes) else json.dumps(obj).encode("utf-8")) + b"\n\n")
+            self.wfile.flush()
+
+        try:
+            for i, piece in enumerate(pieces):
+                last = i == len(pieces) - 1
+                if provider == "openai":
+                    send({"id": cid, "object": "chat.completion.chunk", "created": int(time.time()), "model": model,
+                          "choices": [{"index": 0, "delta": {"content": piece},
+                                       "finish_reason": "stop" if last else None}]})
+                else:
+                    send(self._gemini_body(model, piece, usage if last else None, final=last))
+                time.sleep(delay)
+            if provider == "openai":
+                if (body.get("stream_options") or {}).get("include_usage"):
+                    send({"id": cid, "object": "chat.completion.chunk", "created": int(time.time()), "model": model,
+                          "choices": [], "usage": self._openai_usage(usage)})
+                send(b"[DONE]")
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # client aborted the stream
+        self.close_connection = True
+
+
+class MockServer:
+    """
+    Local OpenAI- and Gemini-compatible endpoints (chat completions / generateContent, plain and
+    streamed) answering with fake records. Point JDWorker at it with Configurations.base_url.
+    """
+
+    def __init__(self, config: Optional[MockConfig] = None, host: str = "127.0.0.1", port: int = 0):
+        self.llm = MockLLM(config or MockConfig())
+        handler = type("Handler", (_Handler,), {"llm": self.llm})
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def base_url(self, provider: str) -> str:
+        # the OpenAI SDK appends /chat/completions, google-genai appends /{api_version}/models/...
+        return self.url + "/v1" if provider == "openai" else self.url
+
+    def start(self) -> "MockServer":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Local mock OpenAI / Gemini endpoint for benchmarks.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.8, help="median seconds to first token")
+    parser.add_argument("--latency-sigma", type=float, default=0.5)
+    parser.add_argument("--tokens-per-second", type=float, default=400)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--max-concurrency", type=int, default=None)
+    parser.add_argument("--retry-after", type=float, default=0.5)
+    parser.add_argument("--malformed-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    config = MockConfig(
+        latency=args.latency, latency_sigma=args.latency_sigma, tokens_per_second=args.tokens_per_second,
+        throttle_rate=args.throttle_rate, max_concurrency=args.max_concurrency,
+        retry_after=args.retry_after, malformed_rate=args.malformed_rate, seed=args.seed,
+    )
+    server = MockServer(config, port=args.port)
+    print(f"[INFO] OpenAI base_url {server.base_url('openai')}, Gemini base_url {server.base_url('gemini')}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    print(f"[INFO] {server.llm.stats()}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
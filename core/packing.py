@@ -0,0 +1,62 @@
+# core/packing.py
+import json
+from typing import Any, Callable, Dict, Iterable, Iterator, List
+
+from .retrieval import estimate_tokens
+from .schema import expand_compact, validate_record
+from .storage import _strip_code_fences
+
+MAX_PACK = 16  # JDs per request; output length grows with every packed JD
+
+
+def pack(
+    items: Iterable[Any],
+    token_budget: int,
+    max_items: int = MAX_PACK,
+    text_of: Callable[[Any], str] = lambda it: it.text,
+) -> Iterator[List[Any]]:
+    """
+    Group items greedily, in input order, into packs whose JD texts fit token_budget.
+    A JD larger than the budget on its own travels alone.
+    """
+    cur: List[Any] = []
+    used = 0
+    for it in items:
+        size = estimate_tokens(text_of(it))
+        if cur and (used + size > token_budget or len(cur) >= max_items):
+            yield cur
+            cur, used = [], 0
+        cur.append(it)
+        used += size
+    if cur:
+        yield cur
+
+def split_packed(text: str, n: int, compact: bool = False) -> Dict[int, dict]:
+    """
+    Valid records of a packed response by JD position (0..n-1). Entries that are missing,
+    duplicated, unknown or fail RECORD_SCHEMA are left out so the caller can retry them alone.
+    With compact=True the entries are in the compact wire encoding and are expanded first.
+    """
+    cleaned, _ = _strip_code_fences(text)
+    try:
+        obj = json.loads(cleaned)
+    except ValueError:
+        return {}
+    entries = obj.get("records") if isinstance(obj, dict) else None
+    out: Dict[int, dict] = {}
+    for entry in entries if isinstance(entries, list) else []:
+        if not isinstance(entry, dict):
+            continue
+        try:
+            pos = int(str(entry.get("id")).strip()) - 1
+        except ValueError:
+            continue
+        record = entry.get("record")
+        if compact:
+            try:
+                record = expand_compact(record)
+            except ValueError:
+                continue
+        if 0 <= pos < n and pos not in out and not validate_record(record):
+            out[pos] = record
+    return out
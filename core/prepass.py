@@ -0,0 +1,260 @@
+# core/prepass.py
+import argparse
+import json
+import re
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from .retrieval import tokenize, _fold
+from .vocab import get_store, DEFAULT_PATH
+
+FIELDS = ["skills", "degrees", "majors"]
+
+_YEARS_RE = re.compile(r"(\d{1,2})\s*\+?\s*(?:-\s*\d{1,2}\s*)?(?:years?|yrs?)\b", re.IGNORECASE)
+LEVELS = [
+    ("senior", re.compile(r"\b(?:senior|sr\.?|lead|principal|staff|expert|advanced)\b", re.IGNORECASE)),
+    ("junior", re.compile(r"\b(?:junior|jr\.?|entry[- ]level|graduate|basic|beginner)\b", re.IGNORECASE)),
+    ("mid", re.compile(r"\b(?:mid[- ]level|intermediate|solid|working knowledge)\b", re.IGNORECASE)),
+]
+_PREFERRED_RE = re.compile(r"\b(?:preferred|nice[- ]to[- ]have|bonus|a plus|desired|desirable|ideally)\b", re.IGNORECASE)
+_REQUIRED_RE = re.compile(r"\b(?:required|requirements|must[- ]have|minimum|qualifications|what you.ll need)\b",
+                          re.IGNORECASE)
+
+# the vocab has no categories; these are the ones worth telling apart in bulk trend analysis
+LANGUAGES = {
+    "python", "java", "javascript", "typescript", "c", "c++", "c#", "go", "rust", "ruby", "php", "scala",
+    "kotlin", "swift", "r", "matlab", "sql", "bash", "perl", "haskell", "julia", "verilog", "vhdl",
+}
+SOFT_SKILLS = {
+    "communication", "teamwork", "leadership", "collaboration", "problem solving", "mentoring",
+    "attention to detail", "time management", "presentation", "stakeholder management",
+}
+
+
+@dataclass
+class Match:
+    cat: str
+    term: str
+    line: int
+
+
+class DictionaryMatcher:
+    """
+    Word-level Aho-Corasick automaton over vocab terms: a JD is scanned once, token by token,
+    whatever the vocab size. Terms only match on whole tokens ("go" never matches in "google")
+    and overlapping matches resolve leftmost-longest. New terms are inserted into the trie as
+    they arrive (by one writer at a time); build() compiles the trie and its failure links into
+    a snapshot that find() reads, so scans never see a half-inserted term.
+    """
+
+    def __init__(self, vocab: Optional[Dict[str, List[str]]] = None):
+        self.terms: List[Tuple[str, str]] = []
+        self.lengths: List[int] = []
+        self.goto: List[Dict[str, int]] = [{}]
+        self.ends: List[List[int]] = [[]]        # terms ending at a node
+        self.counts: Dict[str, int] = {}         # terms consumed per category when synced
+        self._seen = set()
+        self.pending = 0                         # terms added since the last build()
+        self.built_at = 0.0
+        # (goto, fail, out, terms, lengths) as of the last build(), replaced in one assignment;
+        # out[node] lists the ends of the node and of its failure chain
+        self._compiled: tuple = ([{}], [0], [[]], [], [])
+        for cat in FIELDS:
+            for term in (vocab or {}).get(cat) or []:
+                self.add(cat, term)
+        self.build()
+
+    def add(self, cat: str, term: str) -> None:
+        toks = [_fold(t) for t in tokenize(term)]
+        if not toks or (cat, term) in self._seen:
+            return
+        self._seen.add((cat, term))
+        node = 0
+        for t in toks:
+            nxt = self.goto[node].get(t)
+            if nxt is None:
+                nxt = len(self.goto)
+                self.goto[node][t] = nxt
+                self.goto.append({})
+                self.ends.append([])
+            node = nxt
+        self.ends[node].append(len(self.terms))
+        self.terms.append((cat, term))
+        self.lengths.append(len(toks))
+        self.pending += 1
+
+    def build(self) -> None:
+        """Compile the trie into a fresh snapshot for find(); callers serialize it with add()."""
+        goto = [dict(edges) for edges in self.goto]
+        n = len(goto)
+        fail, out = [0] * n, [[] for _ in range(n)]
+        queue = []
+        for child in goto[0].values():
+            out[child] = list(self.ends[child])
+            queue.append(child)
+        for node in queue:  # BFS; the list grows while iterating
+            for tok, child in goto[node].items():
+                f = fail[node]
+                while f and tok not in goto[f]:
+                    f = fail[f]
+                fail[child] = goto[f].get(tok, 0)
+                out[child] = self.ends[child] + out[fail[child]]
+                queue.append(child)
+        self._compiled = (goto, fail, out, list(self.terms), list(self.lengths))
+        self.pending = 0
+        self.built_at = time.monotonic()
+
+    def find(self, text: str) -> List[Match]:
+        """Vocab terms in text, line by line; a match never spans lines. Safe alongside add() / build()."""
+        goto, fail, out, terms, lengths = self._compiled
+        found: List[Match] = []
+        for lineno, line in enumerate((text or "").splitlines()):
+            spans = []
+            node = 0
+            for i, tok in enumerate(tokenize(line)):
+                tok = _fold(tok)
+                while node and tok not in goto[node]:
+                    node = fail[node]
+                node = goto[node].get(tok, 0)
+                for tid in out[node]:
+                    spans.append((i - lengths[tid] + 1, -lengths[tid], tid))
+            # leftmost-longest, non-overlapping
+            end = -1
+            for start, neg_len, tid in sorted(spans):
+                if start > end:
+                    cat, term = terms[tid]
+                    found.append(Match(cat, term, lineno))
+                    end = start - neg_len - 1
+        return found
+
+
+# ------ Shared matcher, kept in sync with the process-wide VocabStore ------
+_MATCHERS: Dict[str, DictionaryMatcher] = {}
+_MATCHERS_LOCK = threading.Lock()
+# a build walks the whole trie, so while the vocab grows terms are compiled in batches
+REBUILD_TERMS = 256
+REBUILD_SECONDS = 1.0
+
+def get_matcher(path: str = DEFAULT_PATH) -> DictionaryMatcher:
+    store = get_store(path)
+    with _MATCHERS_LOCK:
+        matcher = _MATCHERS.get(path)
+        fresh = matcher is None
+        if fresh:
+            matcher = _MATCHERS[path] = DictionaryMatcher()
+        # store lists are append-only, so only the tail needs inserting
+        for cat in FIELDS:
+            terms = store.terms(cat)
+            for term in terms[matcher.counts.get(cat, 0):]:
+                matcher.add(cat, term)
+            matcher.counts[cat] = len(terms)
+        if matcher.pending and (fresh or matcher.pending >= REBUILD_TERMS
+                                or time.monotonic() - matcher.built_at >= REBUILD_SECONDS):
+            matcher.build()
+        return matcher
+
+def dictionary_skills(jd_text: str, path: str = DEFAULT_PATH) -> List[str]:
+    """Vocab skills found in the JD, in order of first occurrence."""
+    out = []
+    for m in get_matcher(path).find(jd_text):
+        if m.cat == "skills" and m.term not in out:
+            out.append(m.term)
+    return out
+
+
+# ------ Local extraction ------
+def _category(term: str) -> str:
+    if term in LANGUAGES:
+        return "language"
+    if term in SOFT_SKILLS:
+        return "soft"
+    return "tool"
+
+def extract_local(jd_text: str, path: str = DEFAULT_PATH) -> Dict[str, Any]:
+    """
+    A record in RECORD_SCHEMA built without a model: vocab matches, "N+ years" and seniority
+    phrases on the same line, and required / preferred from section headings or inline wording.
+    Only terms already in the vocab can be found; meta is left "n/a".
+    """
+    lines = (jd_text or "").splitlines()
+    by_line: Dict[int, List[Match]] = {}
+    for m in get_matcher(path).find(jd_text):
+        by_line.setdefault(m.line, []).append(m)
+
+    skills: Dict[str, Dict[str, Any]] = {}
+    bucket_of: Dict[str, str] = {}
+    edu: Dict[str, List[str]] = {"degrees": [], "majors": []}
+    section = "required"
+    for i, line in enumerate(lines):
+        matches = by_line.get(i, [])
+        if not matches:
+            # short lines without vocab terms are headings that switch the section
+            if len(line.split()) <= 6:
+                if _PREFERRED_RE.search(line):
+                    section = "preferred"
+                elif _REQUIRED_RE.search(line):
+                    section = "required"
+            continue
+        bucket = "preferred" if _PREFERRED_RE.search(line) else section
+        years = [int(y) for y in _YEARS_RE.findall(line)]
+        level = next((name for name, rx in LEVELS if rx.search(line)), "n/a")
+        for m in matches:
+            if m.cat != "skills":
+                if m.term not in edu[m.cat]:
+                    edu[m.cat].append(m.term)
+                continue
+            item = skills.get(m.term)
+            if item is None:
+                item = skills[m.term] = {"name": m.term, "category": _category(m.term), "years": "n/a", "level": "n/a"}
+                bucket_of[m.term] = bucket
+            elif bucket == "required":
+                bucket_of[m.term] = "required"  # required wins over preferred
+            if years and item["years"] == "n/a":
+                item["years"] = f">={max(years)}y"
+            if level != "n/a" and item["level"] == "n/a":
+                item["level"] = level
+    return {
+        "meta": {"company": "n/a", "title": "n/a"},
+        "skills": {
+            "required": [s for name, s in skills.items() if bucket_of[name] == "required"],
+            "preferred": [s for name, s in skills.items() if bucket_of[name] == "preferred"],
+        },
+        "education": edu,
+    }
+
+def dictionary_recall(record: Dict[str, Any], jd_text: str, path: str = DEFAULT_PATH) -> Optional[float]:
+    """Fraction of the vocab skills found in the JD that the record also lists (None if none were found)."""
+    found = set(dictionary_skills(jd_text, path))
+    if not found:
+        return None
+    skills = record.get("skills") or {}
+    names = {(it.get("name") or "").strip().lower()
+             for bucket in ("required", "preferred") for it in (skills.get(bucket) or []) if isinstance(it, dict)}
+    return len(found & names) / len(found)
+
+
+# ------ CLI ------
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Extract skills locally from the vocab, without a model.")
+    parser.add_argument("source", help="a JD .txt file, or a .jsonl / .csv / directory of JDs to time a bulk scan")
+    args = parser.parse_args(argv)
+
+    from .batch import load_jds
+    items = list(load_jds(args.source))
+    get_matcher()  # compile outside the timing
+    t0 = time.perf_counter()
+    records = [extract_local(item.text) for item in items]
+    seconds = time.perf_counter() - t0
+    if len(records) == 1:
+        print(json.dumps(records[0], ensure_ascii=False, indent=2))
+    chars = sum(len(item.text) for item in items)
+    print(f"[INFO] {len(records)} JDs ({chars / 1e6:.1f}M chars) in {seconds:.2f}s "
+          f"({len(records) / seconds if seconds else 0:.0f} JDs/s)", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
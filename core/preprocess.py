@@ -0,0 +1,225 @@
+# core/preprocess.py
+import argparse
+import json
+import re
+import sys
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from .retrieval import estimate_tokens
+from .prepass import dictionary_skills
+
+# job-board UI chrome: whole lines matching any of these are removed
+CHROME_PATTERNS = [
+    r"apply( now)?", r"save", r"share", r"show (more|all|less)( options)?", r"show match details",
+    r"beta", r"is this information helpful\??", r"try premium.*", r"people you can reach out to",
+    r"promoted by hirer.*", r"responses managed off .*", r"save .* at .*", r".* logo",
+    r".*reposted \d+ \w+ ago.*", r".*posted \d+ \w+ ago.*", r".*\d+ (people|applicants) clicked apply.*",
+    r".*and others in your network", r"your profile is missing required qualifications",
+    r"get personalized tips.*", r"find jobs where you.*", r"message", r"follow", r"easy apply",
+    r"(hybrid|remote|on-site|onsite|full-time|part-time|contract|internship)",
+    r"\$[\d,.]+k?(/yr|/hr)?( - \$[\d,.]+k?(/yr|/hr)?)?",
+]
+_CHROME_RE = re.compile(r"^(?:%s)$" % "|".join(CHROME_PATTERNS), re.IGNORECASE)
+
+# headings of sections that never hold skills
+DROP_HEADINGS = re.compile(
+    r"equal (employment )?opportunit|\beeo\b|our commitment|diversity|inclusion|"
+    r"salary|compensation|pay (range|transparency)|benefits|perks|disclaimer|"
+    r"accommodation|privacy|e-verify|how to apply",
+    re.IGNORECASE,
+)
+
+# body phrases typical of legal / HR boilerplate vs. of requirements; whole words only,
+# so "tracing", "supervision" or "computer vision" are not boilerplate
+BOILERPLATE_TERMS = re.compile(
+    r"\b(?:equal opportunity|discriminat\w*|race|religio\w*|national origin|gender identity|sexual orientation|"
+    r"veterans?|disabilit\w*|salary|compensation|base pay|bonus(?:es)?|401\(?k\)?|paid time off|pto|"
+    r"insurance|dental|vision (?:insurance|coverage|care|plans?)|parental leave|reasonable accommodations?|"
+    r"applicable (?:federal|state|local) laws?)(?!\w)",
+    re.IGNORECASE,
+)
+SKILL_SIGNALS = re.compile(
+    r"experience|proficien|knowledge|familiar|skill|degree|bachelor|master|phd|\d+\+? years|"
+    r"qualification|requirement|required|preferred|ability to|expertise|understanding of|"
+    r"responsibilit|you will|design|develop|analy|nice to have|a plus|hands-on",
+    re.IGNORECASE,
+)
+_BULLET_RE = re.compile(r"^(?:[-*•·▪◦–]|\d{1,2}[.)])\s")
+MIN_KEPT_RATIO = 0.1  # pruning that would keep less of the JD than this is not trusted
+
+
+@dataclass
+class Section:
+    heading: str
+    lines: List[str]
+
+    @property
+    def text(self) -> str:
+        return "\n".join(([self.heading] if self.heading else []) + self.lines)
+
+
+@dataclass
+class PruneResult:
+    text: str
+    original_tokens: int
+    kept_tokens: int
+    dropped: List[Dict[str, Any]] = field(default_factory=list)  # heading, reason, tokens
+    fallback: bool = False  # pruning would have removed (nearly) everything; text is the original JD
+
+    @property
+    def removed_tokens(self) -> int:
+        return self.original_tokens - self.kept_tokens
+
+    @property
+    def removed_ratio(self) -> float:
+        return self.removed_tokens / self.original_tokens if self.original_tokens else 0.0
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "original_tokens": self.original_tokens,
+            "kept_tokens": self.kept_tokens,
+            "removed_tokens": self.removed_tokens,
+            "removed_ratio": round(self.removed_ratio, 3),
+            "dropped": self.dropped,
+            "fallback": self.fallback,
+        }
+
+
+# ------ Segmentation ------
+def _is_heading(line: str, next_line: str) -> bool:
+    s = line.strip()
+    if not s or len(s) > 60 or s[-1] in ".;," or _BULLET_RE.match(s):
+        return False
+    words = s.rstrip(":").split()
+    # "Minimum of 5 years" style bullets are content, not headings
+    return 1 <= len(words) <= 8 and (s.endswith(":") or not next_line.strip())
+
+def segment(jd_text: str) -> List[Section]:
+    """Split a JD into sections at heading-like lines (short line followed by a blank line or ending in ':')."""
+    lines = (jd_text or "").splitlines()
+    sections = [Section("", [])]
+    for i, line in enumerate(lines):
+        nxt = lines[i + 1] if i + 1 < len(lines) else ""
+        if _is_heading(line, nxt) and (sections[-1].lines or sections[-1].heading):
+            sections.append(Section(line.strip(), []))
+        elif line.strip():
+            sections[-1].lines.append(line.rstrip())
+    return [s for s in sections if s.heading or s.lines]
+
+
+# ------ Pruning ------
+def _drop_reason(section: Section) -> Optional[str]:
+    body = " ".join(section.lines)
+    boiler = len(BOILERPLATE_TERMS.findall(body))
+    signal = len(SKILL_SIGNALS.findall(body))
+    if section.heading and DROP_HEADINGS.search(section.heading):
+        # "Data Privacy Engineering:" or "Benefits Platform Requirements:" still hold skills
+        if SKILL_SIGNALS.search(section.heading) or signal > boiler:
+            return None
+        # a section naming known vocab skills is never boilerplate, whatever else it says
+        return None if dictionary_skills(section.text) else "heading"
+    if boiler < 2:
+        return None
+    if boiler > 2 * signal and not dictionary_skills(section.text):
+        return "boilerplate"
+    return None
+
+def _blocks(lines: List[str]) -> List[List[str]]:
+    """Runs of non-blank lines, each with the blank lines that follow it."""
+    blocks: List[List[str]] = [[]]
+    for line in lines:
+        if line.strip() and blocks[-1] and not blocks[-1][-1].strip():
+            blocks.append([])
+        blocks[-1].append(line)
+    return blocks
+
+def _repeated(block: List[str], seen: set) -> bool:
+    """An exact repeat of an earlier block (job boards repeat company blurbs), unless it lists skills."""
+    key = "\n".join(line.strip().lower() for line in block if line.strip())
+    if not key:
+        return False
+    if key not in seen:
+        seen.add(key)
+        return False
+    # the same skill bullets can appear under both Required and Preferred
+    return not any(_BULLET_RE.match(line.strip()) for line in block) and not dictionary_skills(key)
+
+def prune_jd(jd_text: str) -> PruneResult:
+    """Drop job-board chrome, repeated blocks and sections that cannot contain skills."""
+    original_tokens = estimate_tokens(jd_text or "")
+    kept: List[str] = []
+    dropped: List[Dict[str, Any]] = []
+
+    # chrome lines and repeated blocks are removed before segmenting so they don't look like headings
+    lines = [line for line in (jd_text or "").splitlines()
+             if not (line.strip() and _CHROME_RE.match(line.strip()))]
+    seen_blocks: set = set()
+    lines = [line for block in _blocks(lines) if not _repeated(block, seen_blocks) for line in block]
+
+    for section in segment("\n".join(lines)):
+        reason = _drop_reason(section)
+        if reason:
+            dropped.append({
+                "heading": section.heading or (section.lines[0][:60] if section.lines else ""),
+                "reason": reason,
+                "tokens": estimate_tokens(section.text),
+            })
+        else:
+            kept.append(section.text)
+
+    text = "\n\n".join(kept)
+    if original_tokens and estimate_tokens(text) < MIN_KEPT_RATIO * original_tokens:
+        return PruneResult(text=jd_text, original_tokens=original_tokens, kept_tokens=original_tokens,
+                           dropped=dropped, fallback=True)
+    return PruneResult(text=text, original_tokens=original_tokens,
+                       kept_tokens=estimate_tokens(text) if text else 0, dropped=dropped)
+
+
+# ------ Recall check ------
+def _skill_names(record: Dict[str, Any]) -> set:
+    skills = record.get("skills") or {}
+    return {
+        (it.get("name") or "").strip().lower()
+        for bucket in ("required", "preferred")
+        for it in (skills.get(bucket) or [])
+        if isinstance(it, dict) and it.get("name")
+    }
+
+def skill_recall(reference: Dict[str, Any], candidate: Dict[str, Any]) -> float:
+    """Fraction of the reference record's skill names also present in the candidate record."""
+    ref = _skill_names(reference)
+    if not ref:
+        return 1.0
+    return len(ref & _skill_names(candidate)) / len(ref)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Prune JD boilerplate or compare extraction recall.")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p_prune = sub.add_parser("prune", help="print the pruned JD and a token report")
+    p_prune.add_argument("jd_file")
+    p_recall = sub.add_parser("recall", help="skill recall of pruned-run records vs. full-run records")
+    p_recall.add_argument("baseline_jsonl")
+    p_recall.add_argument("pruned_jsonl")
+    args = parser.parse_args(argv)
+
+    if args.cmd == "prune":
+        with open(args.jd_file, "r", encoding="utf-8") as f:
+            result = prune_jd(f.read())
+        print(result.text)
+        print(json.dumps(result.report(), ensure_ascii=False, indent=2), file=sys.stderr)
+        return 0
+
+    # records are paired by line number, i.e. both runs over the same input in order (--concurrency 1)
+    recalls = []
+    with open(args.baseline_jsonl, encoding="utf-8") as fa, open(args.pruned_jsonl, encoding="utf-8") as fb:
+        for la, lb in zip(fa, fb):
+            recalls.append(skill_recall(json.loads(la), json.loads(lb)))
+    mean = sum(recalls) / len(recalls) if recalls else 0.0
+    print(f"[INFO] {len(recalls)} pairs, mean skill recall {mean:.3f}, min {min(recalls, default=0.0):.3f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,37 +1,43 @@
-from .vocab import load_vocab, DEFAULT_PATH
+from .vocab import get_store, load_vocab, DEFAULT_PATH
+from .schema import SCHEMA_JSON, COMPACT_SKETCH
 import json
+import threading
 
-VOCAB = load_vocab(DEFAULT_PATH)
-vocab_json = json.dumps(VOCAB)
-
-SCHEMA_JSON = """
-{
-  "meta": {
-    "company": "string|n/a",
-    "title": "string|n/a"
-  },
-  "skills": {
-    "required": [
-      {"name": "string(lowercase)", "category": "language|framework|tool|concept|soft", "years": ">=Ny|n/a", "level": "junior|mid|senior|n/a"}
-    ],
-    "preferred": [
-      {"name": "string(lowercase)", "category": "language|framework|tool|concept|soft", "years": ">=Ny|n/a", "level": "junior|mid|senior|n/a"}
-    ]
-  },
-  "education": {
-    "degrees": ["string"],
-    "majors": ["string"]
-  }
-}
-""".strip()
-
-SYSTEM_PROMPT = f"""You are an information extractor.
-STRICT RULES:
-- Output **ONLY** JSON. No explanations, NO MARKDOWN CODE FENCES (EXRTEMELY IMPORTANT), no extra keys.
+COMPACT_SECTION = f"""
+OUTPUT ENCODING (compact; positional arrays, one-letter codes; do not add or remove fields):
+{COMPACT_SKETCH}
+"""
+
+def build_system_prompt(vocab, structured: bool = False, compact: bool = False) -> str:
+    """
+    System prompt with the given vocabulary lists (full vocab or a per-JD subset).
+    With structured=True the provider enforces the schema, so the output-format rules are left out.
+    With compact=True the answer is asked for in the compact wire encoding (schema.COMPACT_SCHEMA),
+    whose codes are spelled out even in structured mode.
+    """
+
+    vocab_json = json.dumps(vocab)
+
+    if structured:
+        format_rules = ""
+        schema_section = ""
+    else:
+        format_rules = """- Output **ONLY** JSON. No explanations, NO MARKDOWN CODE FENCES (EXRTEMELY IMPORTANT), no extra keys.
 - Use the exact schema and field names specified below.
-- Extract ONLY what appears in the JD text. Do not speculate or add missing items.
+"""
+        schema_section = f"""
+OUTPUT SCHEMA (strict; do not add or remove fields):
+{SCHEMA_JSON}
+"""
+    if compact:
+        schema_section = COMPACT_SECTION
+
+    not_explicit = '"-" (see OUTPUT ENCODING)' if compact else '"n/a"'
+    return f"""You are an information extractor.
+STRICT RULES:
+{format_rules}- Extract ONLY what appears in the JD text. Do not speculate or add missing items.
 - Try your best to include all skills mentioned inside the JD and not to omit any item.
-- Normalize skill names to lowercase; remove decorations (versions in parentheses). If years/level not explicit, use "n/a".
+- Normalize skill names to lowercase; remove decorations (versions in parentheses). If years/level not explicit, use {not_explicit}.
 - Separate requirements into "required" vs "preferred" based on JD wording.
 
 VOCABULARY (REFERENCE ONLY; NON-EXHAUSTIVE; NOT A WHITELIST):
@@ -41,16 +47,46 @@ VOCABULARY (REFERENCE ONLY; NON-EXHAUSTIVE; NOT A WHITELIST):
 - If not close enough, keep the JD term (normalized). DO NOT OMIT IT.
 vocabulary lists (JSON; REFERENCE ONLY; DO NOT COPY INTO OUTPUT):
 {vocab_json}
-
-OUTPUT SCHEMA (strict; do not add or remove fields):
-{SCHEMA_JSON}
-
+{schema_section}
 SCOPE:
 - Consider all parts of the JD (requirements/qualifications/responsibilities/role description/plus/preferred).
 - Only include items truly mentioned in the JD.
 """
 
-def build_prompt(jd_text: str) -> str:
+# full-vocab prompts per (vocab path, structured, compact), tagged with the VocabStore version they were built from
+_PROMPTS = {}
+_PROMPTS_LOCK = threading.Lock()
+
+def get_system_prompt(structured: bool = False, path: str = DEFAULT_PATH, compact: bool = False) -> str:
+    """System prompt with the whole vocabulary; rebuilt only after the vocab has gained terms."""
+    store = get_store(path)
+    version = store.version
+    key = (path, structured, compact)
+    with _PROMPTS_LOCK:
+        hit = _PROMPTS.get(key)
+        if hit is not None and hit[0] == version:
+            return hit[1]
+    prompt = build_system_prompt(store.vocab, structured, compact)
+    with _PROMPTS_LOCK:
+        _PROMPTS[key] = (version, prompt)
+    return prompt
+
+def __getattr__(name):
+    # SYSTEM_PROMPT / STRUCTURED_SYSTEM_PROMPT / VOCAB used to be built at import time
+    if name == "SYSTEM_PROMPT":
+        return get_system_prompt()
+    if name == "STRUCTURED_SYSTEM_PROMPT":
+        return get_system_prompt(structured=True)
+    if name == "VOCAB":
+        return load_vocab(DEFAULT_PATH)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def build_prompt(jd_text: str, structured: bool = False) -> str:
+
+    if structured:
+        return f"""JOB DESCRIPTION TEXT:
+{jd_text}
+"""
 
     prompt = f"""JOB DESCRIPTION TEXT:
 {jd_text}
@@ -62,6 +98,29 @@ REMEMBER **NOT** TO ADD MARKDOWN CODE FENCES LIKE:
 
     return prompt
 
+def build_packed_prompt(jd_texts, structured: bool = False, compact: bool = False) -> str:
+    """
+    One request for several JDs, tagged "1".."n"; the answer is a keyed array of records
+    (PACKED_SCHEMA, or PACKED_COMPACT_SCHEMA with compact=True).
+    """
+
+    shape = "OUTPUT ENCODING" if compact else "OUTPUT SCHEMA"
+    jds = "\n".join(f'<JD id="{i}">\n{text}\n</JD>' for i, text in enumerate(jd_texts, 1))
+    prompt = f"""There are {len(jd_texts)} job descriptions below, each between <JD id="..."> and </JD>.
+Extract each one on its own, exactly as you would a single JD; never mix items between JDs.
+Return ONE JSON object with one entry per JD, in order:
+{{"records": [{{"id": "<JD id>", "record": <the JD's object in the {shape}>}}]}}
+
+{jds}
+"""
+    if not structured:
+        prompt += """
+REMEMBER **NOT** TO ADD MARKDOWN CODE FENCES LIKE:
+```json
+```
+"""
+    return prompt
+
 # For debugging and an example to use
 if __name__ == "__main__":
     from dotenv import load_dotenv
@@ -74,7 +133,7 @@ if __name__ == "__main__":
 
     model = "gemini-2.5-pro"
     llm = LLMClient.init_gemini_client(model=model)
-    llm.set_system_prompt(SYSTEM_PROMPT)
+    llm.set_system_prompt(get_system_prompt())
 
     job_description = """Lam Research logo
 Lam Research
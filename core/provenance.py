@@ -0,0 +1,91 @@
+# core/provenance.py
+import hashlib
+import json
+import time
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+from .prompt_builder import COMPACT_SECTION, build_prompt, build_system_prompt
+from .recordstore import jd_hash
+from .vocab import get_store, CATEGORIES, DEFAULT_PATH as VOCAB_PATH
+
+FIELD = "provenance"  # key of the stamp in saved records
+
+
+def _sha(text: str, n: int = 16) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:n]
+
+@lru_cache(maxsize=64)
+def prompt_version(structured: bool = False, system_prompt: str = "", compact: bool = False) -> str:
+    """Hash of the prompt templates (the built-in system prompt without its vocab, or a custom one)."""
+    if system_prompt:
+        system = system_prompt + (COMPACT_SECTION if compact else "")
+    else:
+        system = build_system_prompt({}, structured, compact)
+    return _sha(system + "\0" + build_prompt("", structured), 12)
+
+def settings_of(config) -> Dict[str, Any]:
+    """Everything in a Configurations that changes what the model is asked, or which model answers."""
+    out = {
+        "provider": config.provider,
+        "model": config.model,
+        "reasoning_effort": config.reasoning_effort,
+        "temperature": config.temperature,
+        "structured_output": config.structured_output,
+        "prompt": prompt_version(config.structured_output, config.system_prompt, config.compact_output),
+        "vocab_budget": config.vocab_budget,
+        "prune_jd": config.prune_jd,
+        "chunk_tokens": config.chunk_tokens,
+        "cascade": [str(s) for s in config.cascade] if config.cascade else None,
+    }
+    # only when set, so records stamped before these settings existed stay fresh
+    if config.hedge:
+        out["hedge"] = str(config.hedge)
+    if config.local_only:
+        out["local_only"] = True
+    if config.compact_output:
+        out["wire"] = "compact"
+    return out
+
+def fingerprint(config) -> str:
+    return _sha(json.dumps(settings_of(config), sort_keys=True))
+
+def vocab_terms(path: str = VOCAB_PATH) -> int:
+    store = get_store(path)
+    return sum(len(store.terms(cat)) for cat in CATEGORIES)
+
+def provenance(config, jd_text: Optional[str] = None, answered: Optional[List[Any]] = None) -> Dict[str, Any]:
+    """
+    Stamp for a record extracted under `config`; vocab_terms is the vocab size at extraction time.
+    `answered` lists the step (CascadeStep) whose model answered each chunk; provider / model /
+    reasoning_effort name that step when there was one, and the configured model otherwise.
+    """
+    steps = list(dict.fromkeys(answered or []))
+    step = steps[0] if len(steps) == 1 else None
+    out: Dict[str, Any] = {}
+    if jd_text is not None:
+        out["jd_hash"] = jd_hash(jd_text)
+    out.update(
+        fingerprint=fingerprint(config),
+        provider=step.provider if step else config.provider,
+        model=step.model if step else config.model,
+        reasoning_effort=step.reasoning_effort if step else config.reasoning_effort,
+        prompt=prompt_version(config.structured_output, config.system_prompt, config.compact_output),
+        vocab_terms=vocab_terms(),
+        extracted_at=time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+    )
+    if steps:
+        out["answered_by"] = [str(s) for s in steps]
+    return out
+
+def reused(jd_text: str, source_key: str, similarity: float, source: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Stamp for a record copied from a near-duplicate JD's output rather than extracted: the source
+    record's stamp (the model that actually answered), this JD's hash, and `reused_from` / `similarity`.
+    Without a source stamp (indexes from before stamps were stored) the fingerprint is left empty.
+    """
+    out = dict(source or {"fingerprint": "", "provider": "n/a", "model": "n/a"})
+    out["jd_hash"] = jd_hash(jd_text)
+    out["reused_from"] = source_key
+    out["similarity"] = round(similarity, 3)
+    return out
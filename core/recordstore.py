@@ -0,0 +1,239 @@
+# core/recordstore.py
+import gzip
+import hashlib
+import io
+import json
+import os
+import re
+import threading
+import time
+import zlib
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+try:
+    import zstandard
+except ImportError:  # optional: pip install zstandard
+    zstandard = None
+
+EXTENSIONS = {None: ".jsonl", "gzip": ".jsonl.gz", "zstd": ".jsonl.zst"}
+_SEGMENT_RE = re.compile(r"^segment-(\d{6})\.jsonl(\.gz|\.zst)?$")
+_WS_RE = re.compile(r"\s+")
+
+
+def jd_hash(jd_text: str) -> str:
+    """Content hash of a JD (whitespace-insensitive)."""
+    norm = _WS_RE.sub(" ", jd_text or "").strip()
+    return hashlib.sha256(norm.encode("utf-8")).hexdigest()
+
+def record_hash(record: Dict[str, Any]) -> str:
+    return hashlib.sha256(json.dumps(record, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+class RecordStore:
+    """
+    Append-only record store in `root`: numbered segments rotated at `segment_bytes`,
+    optionally compressed (gzip / zstd), plus a sidecar `index.jsonl` mapping a key
+    (JD content hash) to (segment, frame offset, line in frame).
+
+    Records are group-committed: buffered in memory and written as one frame every
+    `flush_records` records, `flush_interval` seconds, on flush() and on close().
+    """
+
+    def __init__(
+        self,
+        root: str,
+        segment_bytes: int = 256 * 1024 * 1024,
+        compression: Optional[str] = None,
+        flush_records: int = 64,
+        flush_interval: float = 1.0,
+        fsync: bool = False,
+    ):
+        if compression not in EXTENSIONS:
+            raise ValueError("compression must be None, 'gzip' or 'zstd'")
+        if compression == "zstd" and zstandard is None:
+            raise ValueError("zstd compression needs the 'zstandard' package")
+        self.root = root
+        self.segment_bytes = int(segment_bytes)
+        self.compression = compression
+        self.flush_records = max(1, int(flush_records))
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+
+        self._lock = threading.RLock()
+        self._pending: List[Tuple[str, str]] = []      # (key, json line)
+        self._last_flush = time.monotonic()
+        self.index: Dict[str, Tuple[int, int, int]] = {}
+
+        os.makedirs(root, exist_ok=True)
+        self._load_index()
+        segs = self.segments()
+        self._segment = segs[-1][0] if segs else 1
+        if segs and segs[-1][1] != self._segment_path(self._segment):
+            self._segment += 1  # compression changed: start a fresh segment
+
+    # ------ Paths / Index ------
+    def segments(self) -> List[Tuple[int, str]]:
+        """(number, path) of every segment, oldest first."""
+        out = []
+        for name in os.listdir(self.root):
+            m = _SEGMENT_RE.match(name)
+            if m:
+                out.append((int(m.group(1)), os.path.join(self.root, name)))
+        return sorted(out)
+
+    def _segment_path(self, num: int) -> str:
+        return os.path.join(self.root, f"segment-{num:06d}{EXTENSIONS[self.compression]}")
+
+    def _find_segment(self, num: int) -> str:
+        for ext in EXTENSIONS.values():
+            p = os.path.join(self.root, f"segment-{num:06d}{ext}")
+            if os.path.exists(p):
+                return p
+        raise FileNotFoundError(f"segment {num} missing in {self.root}")
+
+    @property
+    def _index_path(self) -> str:
+        return os.path.join(self.root, "index.jsonl")
+
+    def _load_index(self) -> None:
+        if not os.path.exists(self._index_path):
+            return
+        with open(self._index_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    key, seg, off, n = json.loads(line)
+                except ValueError:
+                    continue  # torn last line
+                self.index[key] = (seg, off, n)
+
+    # ------ Write ------
+    def append(self, record: Dict[str, Any], key: Optional[str] = None, jd_text: Optional[str] = None) -> str:
+        """Buffer a record; key defaults to the JD hash, else the record's own hash."""
+        if key is None:
+            key = jd_hash(jd_text) if jd_text is not None else record_hash(record)
+        line = json.dumps(record, ensure_ascii=False)
+        with self._lock:
+            self._pending.append((key, line))
+            if (len(self._pending) >= self.flush_records
+                    or time.monotonic() - self._last_flush >= self.flush_interval):
+                self._flush_locked()
+        return key
+
+    def flush(self) -> None:
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self) -> None:
+        self._last_flush = time.monotonic()
+        if not self._pending:
+            return
+        path = self._segment_path(self._segment)
+        if os.path.exists(path) and os.path.getsize(path) >= self.segment_bytes:
+            self._segment += 1
+            path = self._segment_path(self._segment)
+
+        lines = [line + "\n" for _, line in self._pending]
+        with open(path, "ab") as f:
+            offset = f.tell()
+            entries = []
+            if self.compression is None:
+                data = "".join(lines).encode("utf-8")
+                pos = offset
+                for (key, _), line in zip(self._pending, lines):
+                    entries.append((key, self._segment, pos, 0))
+                    pos += len(line.encode("utf-8"))
+            else:
+                raw = "".join(lines).encode("utf-8")
+                if self.compression == "gzip":
+                    data = gzip.compress(raw)
+                else:
+                    data = zstandard.ZstdCompressor().compress(raw)
+                entries = [(key, self._segment, offset, n) for n, (key, _) in enumerate(self._pending)]
+            f.write(data)
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+
+        with open(self._index_path, "a", encoding="utf-8") as f:
+            f.write("".join(json.dumps(list(e)) + "\n" for e in entries))
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+        for key, seg, off, n in entries:
+            self.index[key] = (seg, off, n)
+        self._pending = []
+
+    def close(self) -> None:
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ------ Read ------
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            return key in self.index or any(k == key for k, _ in self._pending)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self.index) + len(self._pending)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """O(1) lookup of one record by key."""
+        with self._lock:
+            for k, line in reversed(self._pending):
+                if k == key:
+                    return json.loads(line)
+            loc = self.index.get(key)
+        if loc is None:
+            return None
+        seg, off, n = loc
+        path = self._find_segment(seg)
+        with open(path, "rb") as f:
+            f.seek(off)
+            if path.endswith(".jsonl"):
+                return json.loads(f.readline())
+            frame = self._read_frame(f, path)
+        return json.loads(frame.splitlines()[n])
+
+    @staticmethod
+    def _read_frame(f, path: str) -> bytes:
+        if path.endswith(".gz"):
+            d = zlib.decompressobj(wbits=31)  # one gzip member
+            out = []
+            while not d.eof:
+                chunk = f.read(64 * 1024)
+                if not chunk:
+                    break
+                out.append(d.decompress(chunk))
+            return b"".join(out)
+        if zstandard is None:
+            raise ValueError("reading .zst segments needs the 'zstandard' package")
+        with zstandard.ZstdDecompressor().stream_reader(f, read_across_frames=False, closefd=False) as r:
+            return r.read()
+
+    def iter_records(self) -> Iterator[Dict[str, Any]]:
+        """Stream every committed record, segment by segment."""
+        self.flush()
+        for _, path in self.segments():
+            yield from iter_segment(path)
+
+
+def iter_segment(path: str) -> Iterator[Dict[str, Any]]:
+    """Records of one segment file (plain, gzip or zstd JSONL)."""
+    if path.endswith(".gz"):
+        f = gzip.open(path, "rt", encoding="utf-8")
+    elif path.endswith(".zst"):
+        if zstandard is None:
+            raise ValueError("reading .zst segments needs the 'zstandard' package")
+        raw = zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), read_across_frames=True)
+        f = io.TextIOWrapper(raw, encoding="utf-8")
+    else:
+        f = open(path, "r", encoding="utf-8")
+    with f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
@@ -0,0 +1,179 @@
+# core/reextract.py
+import argparse
+import json
+import os
+import random
+import sys
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from .batch import JDItem, add_config_args, config_from_args, load_jds, run_batch
+from .logic import JDWorker
+from .provenance import FIELD, fingerprint, vocab_terms
+from .recordstore import RecordStore, jd_hash
+from .storage import parse_record
+
+
+# (fingerprint, vocab_terms, skill names, reused) of the newest stamped record per JD hash
+Seen = Dict[str, Tuple[str, int, frozenset, bool]]
+
+def _skill_names(record: Dict[str, Any]) -> frozenset:
+    skills = record.get("skills") or {}
+    return frozenset(
+        (it.get("name") or "").strip().lower()
+        for bucket in ("required", "preferred") for it in (skills.get(bucket) or []) if isinstance(it, dict)
+    )
+
+def _iter_records(path: str) -> Iterator[Dict[str, Any]]:
+    if os.path.isdir(path):
+        yield from RecordStore(path).iter_records()
+        return
+    if not os.path.exists(path):
+        return
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue  # torn last line
+
+def index_records(paths: Iterable[str]) -> Tuple[Seen, int]:
+    """Newest stamped record per JD hash across JSONL files / RecordStore dirs, and the count of unstamped records."""
+    seen: Seen = {}
+    unstamped = 0
+    for path in paths:
+        for record in _iter_records(path):
+            stamp = record.get(FIELD) or {}
+            if not stamp.get("jd_hash"):
+                unstamped += 1
+                continue
+            seen[stamp["jd_hash"]] = (stamp.get("fingerprint"), int(stamp.get("vocab_terms") or 0), _skill_names(record),
+                                      bool(stamp.get("reused_from")))
+    return seen, unstamped
+
+
+@dataclass
+class Plan:
+    total: int = 0
+    fresh: int = 0
+    stale: Dict[str, int] = field(default_factory=lambda: {"missing": 0, "config": 0, "vocab": 0, "reused": 0})
+    todo: Set[str] = field(default_factory=set)   # JD hashes to re-extract
+    unstamped_records: int = 0
+
+    def summary(self) -> Dict[str, Any]:
+        return {"total": self.total, "fresh": self.fresh, "stale": dict(self.stale),
+                "to_extract": len(self.todo), "unstamped_records": self.unstamped_records}
+
+def plan(source: Any, seen: Seen, config, vocab_growth: Optional[float] = None) -> Plan:
+    """
+    Which JDs in `source` need (re-)extraction under `config`: no stamped record yet ("missing"),
+    only a near-duplicate's copied output ("reused"), a record from different settings ("config"),
+    or — with vocab_growth — one extracted when the vocab was more than that fraction smaller
+    than it is now ("vocab").
+    """
+    out = Plan()
+    fp = fingerprint(config)
+    terms_now = vocab_terms()
+    for item in load_jds(source):
+        out.total += 1
+        h = jd_hash(item.text)
+        old = seen.get(h)
+        if old is None:
+            reason = "missing"
+        elif old[3]:
+            reason = "reused"
+        elif old[0] != fp:
+            reason = "config"
+        elif vocab_growth is not None and terms_now > old[1] * (1 + vocab_growth):
+            reason = "vocab"
+        else:
+            out.fresh += 1
+            continue
+        if h not in out.todo:
+            out.stale[reason] += 1
+            out.todo.add(h)
+    return out
+
+def iter_todo(source: Any, hashes: Set[str]) -> Iterator[JDItem]:
+    """Re-read `source`, yielding each JD whose hash is in `hashes` once."""
+    left = set(hashes)
+    for item in load_jds(source):
+        h = jd_hash(item.text)
+        if h in left:
+            left.discard(h)
+            yield item
+
+def estimate_diff(worker: JDWorker, source: Any, seen: Seen, todo: Set[str], out: str,
+                  sample: int, concurrency: int = 8, seed: int = 0) -> Dict[str, Any]:
+    """
+    Re-extract a random sample of the stale JDs that already have a record (saving them to `out`)
+    and measure how often the skills actually change, extrapolated to all such JDs.
+    """
+    redo = sorted(h for h in todo if h in seen)
+    picked = set(random.Random(seed).sample(redo, min(sample, len(redo))))
+    changed, similarity = [], []
+
+    def compare(item, text, err):
+        if err is not None:
+            return
+        new = _skill_names(parse_record(text))
+        old = seen[jd_hash(item.text)][2]
+        changed.append(new != old)
+        similarity.append(len(new & old) / len(new | old) if new | old else 1.0)
+
+    stats = run_batch(worker, iter_todo(source, picked), out, concurrency, on_result=compare)
+    rate = sum(changed) / len(changed) if changed else 0.0
+    return {
+        "sampled": len(changed), "failed": stats.failed,
+        "changed_rate": round(rate, 4),
+        "mean_skill_jaccard": round(sum(similarity) / len(similarity), 4) if similarity else None,
+        "estimated_changed": round(rate * len(redo)),
+        "of_rerun": len(redo),
+    }
+
+
+# ------ CLI ------
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Re-extract only the JDs whose records are missing or stale under the given settings.")
+    parser.add_argument("source", help=".jsonl / .csv / .txt file, or a directory of them")
+    parser.add_argument("--records", action="append", default=[], metavar="PATH",
+                        help="existing records (JSONL file or RecordStore dir); repeatable")
+    parser.add_argument("--out", default="data/reextracted.jsonl",
+                        help="JSONL output; also read back, so an interrupted run resumes where it stopped")
+    parser.add_argument("--vocab-growth", type=float, default=None, metavar="FRACTION",
+                        help="also re-extract records made when the vocab was this much smaller (e.g. 0.2)")
+    parser.add_argument("--sample", type=int, default=None, metavar="N",
+                        help="only re-extract N random stale JDs and estimate how many records would change")
+    parser.add_argument("--dry-run", action="store_true", help="print the plan and exit")
+    parser.add_argument("--concurrency", type=int, default=8)
+    add_config_args(parser)
+    args = parser.parse_args(argv)
+
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    worker = JDWorker(config_from_args(args))
+    seen, unstamped = index_records(args.records + [args.out])
+    todo = plan(args.source, seen, worker.config, args.vocab_growth)
+    todo.unstamped_records = unstamped
+    print(f"[INFO] plan: {json.dumps(todo.summary())}")
+    if args.dry_run or not todo.todo:
+        return 0
+
+    if args.sample:
+        est = estimate_diff(worker, args.source, seen, todo.todo, args.out, args.sample, args.concurrency)
+        print(f"[INFO] sample: {json.dumps(est)}")
+        return 0
+
+    def report(item, text, err):
+        status = "ok" if err is None else f"FAILED: {err}"
+        print(f"[{item.id}] {status}", file=sys.stderr)
+
+    stats = run_batch(worker, iter_todo(args.source, todo.todo), args.out, args.concurrency, on_result=report)
+    print(f"[INFO] {stats.ok}/{stats.total} re-extracted to {args.out} ({stats.failed} failed) in {stats.seconds:.1f}s")
+    return 0 if stats.failed == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
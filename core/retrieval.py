@@ -0,0 +1,121 @@
+# core/retrieval.py
+import json
+import math
+import re
+import threading
+from collections import defaultdict
+from typing import Dict, List, Optional, Set
+
+from .vocab import get_store, CATEGORIES, DEFAULT_PATH
+
+# keeps c++, c#, .net, node.js together as single tokens
+_TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9+#.]*|\.[a-z0-9]+")
+
+# categories are emitted in this order when the budget is tight
+PRIORITY = ["skills", "degrees", "majors", "title", "company"]
+
+
+def tokenize(text: str) -> List[str]:
+    return [t.rstrip(".") or t for t in _TOKEN_RE.findall((text or "").lower())]
+
+def _fold(tok: str) -> str:
+    # crude plural folding so "databases" and "database" share a posting
+    if len(tok) > 3 and tok.endswith("s") and not tok.endswith("ss"):
+        return tok[:-1]
+    return tok
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 chars per token) used for prompt budgeting."""
+    return max(1, math.ceil(len(text) / 4))
+
+
+class VocabIndex:
+    """
+    Inverted token index over the vocabulary.
+    A term matches a JD when every one of its tokens occurs in the JD text.
+    add() and match() may run on different threads; both hold the index lock.
+    """
+
+    def __init__(self, vocab: Optional[Dict[str, List[str]]] = None):
+        self.terms: List[tuple] = []                      # id -> (category, term)
+        self.postings: Dict[str, Set[int]] = defaultdict(set)
+        self._term_tokens: List[List[str]] = []
+        self._seen: Set[tuple] = set()
+        self.counts: Dict[str, int] = {}                  # terms consumed per category when synced
+        self._lock = threading.Lock()
+        for cat in CATEGORIES:
+            for term in (vocab or {}).get(cat) or []:
+                self.add(cat, term)
+
+    def add(self, cat: str, term: str) -> None:
+        key = (cat, term)
+        if not term or key in self._seen:
+            return
+        toks = [_fold(t) for t in tokenize(term)]
+        if not toks:
+            return
+        with self._lock:
+            self._seen.add(key)
+            tid = len(self.terms)
+            self.terms.append(key)
+            self._term_tokens.append(toks)
+            for t in toks:
+                self.postings[t].add(tid)
+
+    def match(self, jd_text: str) -> List[int]:
+        """Ids of vocab terms whose tokens all appear in jd_text, most specific first."""
+        jd_tokens = {_fold(t) for t in tokenize(jd_text)}
+
+        scored = []
+        with self._lock:
+            candidates: Set[int] = set()
+            for t in jd_tokens:
+                candidates |= self.postings.get(t, set())
+
+            n = max(1, len(self.terms))
+            for tid in candidates:
+                toks = self._term_tokens[tid]
+                if all(t in jd_tokens for t in toks):
+                    # rarer and longer terms carry more signal
+                    idf = sum(math.log(n / len(self.postings[t])) for t in toks)
+                    scored.append((-len(toks), -idf, tid))
+        scored.sort()
+        return [tid for _, _, tid in scored]
+
+    def select(self, jd_text: str, token_budget: Optional[int] = None) -> Dict[str, List[str]]:
+        """Vocab subset (same shape as load_vocab) relevant to jd_text, within token_budget."""
+        matched = self.match(jd_text)
+        by_cat: Dict[str, List[str]] = {k: [] for k in CATEGORIES}
+        for tid in matched:
+            cat, term = self.terms[tid]
+            by_cat[cat].append(term)
+
+        out: Dict[str, List[str]] = {k: [] for k in CATEGORIES}
+        used = estimate_tokens(json.dumps(out))
+        for cat in PRIORITY:
+            for term in by_cat[cat]:
+                cost = estimate_tokens(json.dumps(term)) + 1
+                if token_budget is not None and used + cost > token_budget:
+                    return out
+                out[cat].append(term)
+                used += cost
+        return out
+
+
+# ------ Shared index, kept in sync with the process-wide VocabStore ------
+_INDEXES: Dict[str, VocabIndex] = {}
+_INDEXES_LOCK = threading.Lock()
+
+def get_vocab_index(path: str = DEFAULT_PATH) -> VocabIndex:
+    store = get_store(path)
+    with _INDEXES_LOCK:
+        index = _INDEXES.get(path)
+        if index is None:
+            index = _INDEXES[path] = VocabIndex()
+        # store lists are append-only, so only the tail needs indexing
+        for cat in CATEGORIES:
+            terms = store.terms(cat)
+            for term in terms[index.counts.get(cat, 0):]:
+                index.add(cat, term)
+            index.counts[cat] = len(terms)
+        return index
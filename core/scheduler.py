@@ -0,0 +1,297 @@
+# core/scheduler.py
+import asyncio
+import email.utils
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional
+
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+THROTTLE_STATUS = {429, 503}
+
+
+# ---------------- Error classification ----------------
+def status_of(exc: BaseException) -> Optional[int]:
+    """HTTP status of an SDK error (openai: status_code, google-genai: code), if any."""
+    for attr in ("status_code", "code"):
+        v = getattr(exc, attr, None)
+        if isinstance(v, int):
+            return v
+    resp = getattr(exc, "response", None)
+    v = getattr(resp, "status_code", None)
+    return v if isinstance(v, int) else None
+
+def retry_after_of(exc: BaseException) -> Optional[float]:
+    """Seconds requested by a Retry-After / retry-after-ms response header, if any."""
+    headers = getattr(getattr(exc, "response", None), "headers", None) or {}
+    try:
+        ms = headers.get("retry-after-ms")
+        if ms is not None:
+            return float(ms) / 1000.0
+        ra = headers.get("retry-after")
+        if ra is None:
+            return None
+        try:
+            return max(0.0, float(ra))
+        except ValueError:
+            when = email.utils.parsedate_to_datetime(ra)
+            return max(0.0, when.timestamp() - time.time())
+    except (TypeError, ValueError, AttributeError):
+        return None
+
+def is_retryable(exc: BaseException) -> bool:
+    status = status_of(exc)
+    if status is not None:
+        return status in RETRYABLE_STATUS
+    # transport failures (openai.APIConnectionError / APITimeoutError, httpx errors, ...)
+    name = type(exc).__name__
+    return "Timeout" in name or "Connection" in name or isinstance(exc, (TimeoutError, ConnectionError))
+
+
+# ---------------- Token bucket ----------------
+class TokenBucket:
+    """Refills `rate` units per second up to `capacity`; rate None means unlimited."""
+
+    def __init__(self, rate: Optional[float], capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else (rate or 0.0)
+        self._level = self.capacity
+        self._stamp = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, amount: float) -> float:
+        """Take `amount` now (possibly going negative) and return how long to wait before using it."""
+        if not self.rate:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._level = min(self.capacity, self._level + (now - self._stamp) * self.rate)
+            self._stamp = now
+            # a request bigger than the bucket still gets through, after a full refill
+            self._level -= min(amount, self.capacity)
+            return 0.0 if self._level >= 0 else -self._level / self.rate
+
+
+# ---------------- AIMD concurrency ----------------
+class AdaptiveLimiter:
+    """
+    Concurrency limit with additive increase (+1 per `limit` successes) and
+    multiplicative decrease (x`backoff` on throttling, at most once per `cooldown` s).
+    """
+
+    def __init__(self, initial: int = 8, minimum: int = 1, maximum: int = 256,
+                 backoff: float = 0.5, cooldown: float = 1.0):
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.backoff = backoff
+        self.cooldown = cooldown
+        self.in_flight = 0
+        self._last_decrease = 0.0
+        self._cond = threading.Condition()
+
+    def try_acquire(self) -> bool:
+        with self._cond:
+            if self.in_flight < int(self.limit):
+                self.in_flight += 1
+                return True
+            return False
+
+    def acquire(self) -> None:
+        with self._cond:
+            while self.in_flight >= int(self.limit):
+                self._cond.wait()
+            self.in_flight += 1
+
+    async def aacquire(self) -> None:
+        delay = 0.005
+        while not self.try_acquire():
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 0.1)
+
+    def release(self, throttled: bool = False) -> None:
+        with self._cond:
+            self.in_flight -= 1
+            now = time.monotonic()
+            if throttled:
+                if now - self._last_decrease >= self.cooldown:
+                    self.limit = max(self.minimum, self.limit * self.backoff)
+                    self._last_decrease = now
+            else:
+                self.limit = min(self.maximum, self.limit + 1.0 / max(1.0, self.limit))
+            self._cond.notify_all()
+
+
+# ---------------- Scheduler ----------------
+@dataclass
+class RateLimits:
+    rpm: Optional[int] = None   # requests per minute
+    tpm: Optional[int] = None   # (estimated) tokens per minute
+
+
+class _Lane:
+    """Quota buckets + adaptive limiter for one (provider, model)."""
+
+    def __init__(self, limits: RateLimits, initial_concurrency: int, max_concurrency: int):
+        self.limits = limits
+        self.requests = TokenBucket(limits.rpm / 60.0 if limits.rpm else None, limits.rpm)
+        self.tokens = TokenBucket(limits.tpm / 60.0 if limits.tpm else None, limits.tpm)
+        self.limiter = AdaptiveLimiter(initial=initial_concurrency, maximum=max_concurrency)
+
+
+class Scheduler:
+    """
+    Runs LLM calls under per-(provider, model) RPM/TPM token buckets and AIMD concurrency,
+    retrying 429/5xx/transport errors with full-jitter exponential backoff that honours Retry-After.
+    """
+
+    def __init__(self, max_retries: int = 6, base_delay: float = 1.0, max_delay: float = 60.0,
+                 initial_concurrency: int = 32, max_concurrency: int = 256):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.initial_concurrency = initial_concurrency
+        self.max_concurrency = max_concurrency
+        self._lanes: Dict[tuple, _Lane] = {}
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.retries = 0
+        self.throttled = 0
+        self.failures = 0
+
+    def set_limits(self, provider: str, model: str, limits: RateLimits) -> None:
+        with self._lock:
+            lane = self._lanes.get((provider, model))
+            if lane is not None and lane.limits == limits:
+                return
+            self._lanes[(provider, model)] = _Lane(limits, self.initial_concurrency, self.max_concurrency)
+
+    def _lane(self, provider: str, model: str) -> _Lane:
+        with self._lock:
+            lane = self._lanes.get((provider, model))
+            if lane is None:
+                lane = self._lanes[(provider, model)] = _Lane(
+                    RateLimits(), self.initial_concurrency, self.max_concurrency)
+            return lane
+
+    def _backoff(self, attempt: int, exc: BaseException) -> float:
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+        ra = retry_after_of(exc)
+        return max(delay, ra) if ra is not None else delay
+
+    def _quota_wait(self, lane: _Lane, est_tokens: int) -> float:
+        return max(lane.requests.reserve(1), lane.tokens.reserve(est_tokens))
+
+    def _on_error(self, exc: BaseException, attempt: int) -> Optional[float]:
+        """Delay before the next attempt, or None to give up."""
+        throttled = status_of(exc) in THROTTLE_STATUS
+        with self._lock:
+            self.throttled += int(throttled)
+            if attempt >= self.max_retries or not is_retryable(exc):
+                self.failures += 1
+                return None
+            self.retries += 1
+        return self._backoff(attempt, exc)
+
+    def call(self, provider: str, model: str, est_tokens: int, fn: Callable, *args, **kwargs) -> Any:
+        lane = self._lane(provider, model)
+        with self._lock:
+            self.calls += 1
+        attempt = 0
+        while True:
+            time.sleep(self._quota_wait(lane, est_tokens))
+            lane.limiter.acquire()
+            throttled = False
+            try:
+                return fn(*args, **kwargs)
+            except Exception as e:
+                throttled = status_of(e) in THROTTLE_STATUS
+                delay = self._on_error(e, attempt)
+                if delay is None:
+                    raise
+            finally:
+                lane.limiter.release(throttled)
+            time.sleep(delay)
+            attempt += 1
+
+    async def acall(self, provider: str, model: str, est_tokens: int, fn: Callable, *args, **kwargs) -> Any:
+        """Async variant of call(); `fn` returns an awaitable."""
+        lane = self._lane(provider, model)
+        with self._lock:
+            self.calls += 1
+        attempt = 0
+        while True:
+            await asyncio.sleep(self._quota_wait(lane, est_tokens))
+            await lane.limiter.aacquire()
+            throttled = False
+            try:
+                return await fn(*args, **kwargs)
+            except Exception as e:
+                throttled = status_of(e) in THROTTLE_STATUS
+                delay = self._on_error(e, attempt)
+                if delay is None:
+                    raise
+            finally:
+                lane.limiter.release(throttled)
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lanes = {f"{p}/{m}": round(l.limiter.limit, 2) for (p, m), l in self._lanes.items()}
+            return {
+                "calls": self.calls,
+                "retries": self.retries,
+                "throttled": self.throttled,
+                "failures": self.failures,
+                "concurrency_limits": lanes,
+            }
+
+
+_SCHEDULER: Optional[Scheduler] = None
+_SCHEDULER_LOCK = threading.Lock()
+
+def get_scheduler() -> Scheduler:
+    """Process-wide scheduler shared by every LLMClient."""
+    global _SCHEDULER
+    with _SCHEDULER_LOCK:
+        if _SCHEDULER is None:
+            _SCHEDULER = Scheduler()
+        return _SCHEDULER
+
+
+# For debugging: a fake provider that throttles above a fixed concurrency
+if __name__ == "__main__":
+    from concurrent.futures import ThreadPoolExecutor
+
+    class FakeThrottle(Exception):
+        status_code = 429
+
+        class response:
+            headers = {"retry-after-ms": "200"}
+
+    active = 0
+    active_lock = threading.Lock()
+
+    def fake_call(i):
+        global active
+        with active_lock:
+            active += 1
+            over = active > 12
+        try:
+            time.sleep(0.05)
+            if over:
+                raise FakeThrottle()
+            return i
+        finally:
+            with active_lock:
+                active -= 1
+
+    sched = Scheduler(max_retries=10, base_delay=0.2, max_delay=2.0, initial_concurrency=32)
+    sched.set_limits("fake", "m", RateLimits(rpm=6000, tpm=None))
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(64) as pool:
+        results = list(pool.map(lambda i: sched.call("fake", "m", 100, fake_call, i), range(400)))
+    print(f"{len(results)} calls in {time.perf_counter() - t0:.2f}s")
+    print(sched.stats())
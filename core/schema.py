@@ -0,0 +1,321 @@
+# core/schema.py
+import copy
+import json
+import re
+from typing import Any, Callable, Dict, List
+
+# Single definition of an extracted record. SCHEMA_JSON (the prompt sketch), the
+# providers' structured-output schemas and the validator are all derived from it.
+_SKILL = {
+    "type": "object",
+    "properties": {
+        "name": {"type": "string", "description": "string(lowercase)"},
+        "category": {"type": "string", "enum": ["language", "framework", "tool", "concept", "soft"]},
+        "years": {"type": "string", "pattern": r"^(>=\d+y|n/a)$", "description": ">=Ny|n/a"},
+        "level": {"type": "string", "enum": ["junior", "mid", "senior", "n/a"]},
+    },
+    "required": ["name", "category", "years", "level"],
+    "additionalProperties": False,
+}
+
+RECORD_SCHEMA: Dict[str, Any] = {
+    "type": "object",
+    "properties": {
+        "meta": {
+            "type": "object",
+            "properties": {
+                "company": {"type": "string", "description": "string|n/a"},
+                "title": {"type": "string", "description": "string|n/a"},
+            },
+            "required": ["company", "title"],
+            "additionalProperties": False,
+        },
+        "skills": {
+            "type": "object",
+            "properties": {
+                "required": {"type": "array", "items": _SKILL},
+                "preferred": {"type": "array", "items": _SKILL},
+            },
+            "required": ["required", "preferred"],
+            "additionalProperties": False,
+        },
+        "education": {
+            "type": "object",
+            "properties": {
+                "degrees": {"type": "array", "items": {"type": "string"}},
+                "majors": {"type": "array", "items": {"type": "string"}},
+            },
+            "required": ["degrees", "majors"],
+            "additionalProperties": False,
+        },
+    },
+    "required": ["meta", "skills", "education"],
+    "additionalProperties": False,
+}
+
+
+# What is saved (core.storage): a record plus, optionally, its provenance stamp (core.provenance).
+# The stamp stays open to new fields so older readers keep accepting newer stamps.
+PROVENANCE_SCHEMA: Dict[str, Any] = {
+    "type": "object",
+    "properties": {
+        "jd_hash": {"type": "string"},
+        "fingerprint": {"type": "string"},
+        "provider": {"type": "string"},
+        "model": {"type": "string"},
+        "reasoning_effort": {"type": "string"},
+        "prompt": {"type": "string"},
+        "vocab_terms": {"type": "integer"},
+        "extracted_at": {"type": "string"},
+        "answered_by": {"type": "array", "items": {"type": "string"}},
+        "reused_from": {"type": "string"},  # jd_hash of the near-duplicate whose output was copied
+        "similarity": {"type": "number"},
+    },
+    "required": ["fingerprint", "provider", "model"],
+}
+
+SAVED_RECORD_SCHEMA: Dict[str, Any] = dict(
+    RECORD_SCHEMA, properties=dict(RECORD_SCHEMA["properties"], provenance=PROVENANCE_SCHEMA),
+)
+
+# ---------------- Compact wire format ----------------
+# What the model may be asked for instead of RECORD_SCHEMA: each skill is a positional
+# [name, category, years, level] array with one-letter codes, so the keys and long enum
+# values are not generated again for every skill. expand_compact() turns it back into a record.
+CATEGORY_CODES = {"language": "l", "framework": "f", "tool": "t", "concept": "c", "soft": "s"}
+LEVEL_CODES = {"junior": "j", "mid": "m", "senior": "s", "n/a": "-"}
+_CATEGORIES = {v: k for k, v in CATEGORY_CODES.items()}
+_LEVELS = {v: k for k, v in LEVEL_CODES.items()}
+_YEARS_RE = re.compile(r"^>=(\d+)y$")
+
+_STRINGS = {"type": "array", "items": {"type": "string"}}
+_COMPACT_SKILLS = {"type": "array", "items": _STRINGS}  # providers cannot enforce tuples; expand_compact checks them
+
+COMPACT_SCHEMA: Dict[str, Any] = {
+    "type": "object",
+    "properties": {"m": _STRINGS, "req": _COMPACT_SKILLS, "pref": _COMPACT_SKILLS, "deg": _STRINGS, "maj": _STRINGS},
+    "required": ["m", "req", "pref", "deg", "maj"],
+    "additionalProperties": False,
+}
+
+COMPACT_SKETCH = """{"m": ["company|n/a", "title|n/a"],
+ "req": [["skill name (lowercase)", "category", "years", "level"]],
+ "pref": [["skill name (lowercase)", "category", "years", "level"]],
+ "deg": ["string"], "maj": ["string"]}
+req = required skills, pref = preferred skills, deg = degrees, maj = majors.
+category: l=language f=framework t=tool c=concept s=soft
+years: minimum years as digits ("3" for 3+ years), "-" if not explicit
+level: j=junior m=mid s=senior, "-" if not explicit"""
+
+def _expand_skill(item: Any, path: str) -> Dict[str, str]:
+    if not isinstance(item, list) or len(item) != 4 or not all(isinstance(v, (str, int)) for v in item):
+        raise ValueError(f"{path}: expected [name, category, years, level]")
+    name, cat, years, level = (str(v).strip() for v in item)
+    if cat not in _CATEGORIES:
+        raise ValueError(f"{path}: category {cat!r} not in {sorted(_CATEGORIES)}")
+    if level in ("n/a", ""):
+        level = "-"
+    if level not in _LEVELS:
+        raise ValueError(f"{path}: level {level!r} not in {sorted(_LEVELS)}")
+    if years in ("-", "n/a", ""):
+        years = "n/a"
+    elif years.isdigit():
+        years = f">={int(years)}y"
+    else:
+        raise ValueError(f"{path}: years {years!r} is neither digits nor '-'")
+    return {"name": name, "category": _CATEGORIES[cat], "years": years, "level": _LEVELS[level]}
+
+def expand_compact(obj: Any) -> Dict[str, Any]:
+    """Record (RECORD_SCHEMA shape) from a compact wire object; raises ValueError on a malformed one."""
+    if not isinstance(obj, dict):
+        raise ValueError("$: expected object")
+    missing = [k for k in COMPACT_SCHEMA["required"] if k not in obj]
+    if missing:
+        raise ValueError(f"missing keys {missing}")
+    extra = [k for k in obj if k not in COMPACT_SCHEMA["properties"]]
+    if extra:
+        raise ValueError(f"unexpected keys {extra}")
+    meta = obj["m"]
+    if not isinstance(meta, list) or len(meta) != 2:
+        raise ValueError("m: expected [company, title]")
+    for k in ("req", "pref", "deg", "maj"):
+        if not isinstance(obj[k], list):
+            raise ValueError(f"{k}: expected array")
+    return {
+        "meta": {"company": meta[0], "title": meta[1]},
+        "skills": {
+            "required": [_expand_skill(it, f"req[{i}]") for i, it in enumerate(obj["req"])],
+            "preferred": [_expand_skill(it, f"pref[{i}]") for i, it in enumerate(obj["pref"])],
+        },
+        "education": {"degrees": list(obj["deg"]), "majors": list(obj["maj"])},
+    }
+
+def compact_record(record: Dict[str, Any]) -> Dict[str, Any]:
+    """Inverse of expand_compact() for a valid record."""
+    def skill(it):
+        m = _YEARS_RE.match(it["years"])
+        return [it["name"], CATEGORY_CODES[it["category"]], m.group(1) if m else "-", LEVEL_CODES[it["level"]]]
+    return {
+        "m": [record["meta"]["company"], record["meta"]["title"]],
+        "req": [skill(it) for it in record["skills"]["required"]],
+        "pref": [skill(it) for it in record["skills"]["preferred"]],
+        "deg": list(record["education"]["degrees"]),
+        "maj": list(record["education"]["majors"]),
+    }
+
+
+# Several JDs in one request (core.packing): one keyed record per JD
+def packed_schema(record_schema: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "type": "object",
+        "properties": {
+            "records": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {"id": {"type": "string"}, "record": record_schema},
+                    "required": ["id", "record"],
+                    "additionalProperties": False,
+                },
+            },
+        },
+        "required": ["records"],
+        "additionalProperties": False,
+    }
+
+PACKED_SCHEMA = packed_schema(RECORD_SCHEMA)
+PACKED_COMPACT_SCHEMA = packed_schema(COMPACT_SCHEMA)
+
+
+# ---------------- Prompt sketch ----------------
+def _sketch_value(node: Dict[str, Any]) -> Any:
+    if node.get("type") == "object":
+        return {k: _sketch_value(v) for k, v in node["properties"].items()}
+    if node.get("type") == "array":
+        return [_sketch_value(node["items"])]
+    if "description" in node:
+        return node["description"]
+    if "enum" in node:
+        return "|".join(node["enum"])
+    return node.get("type", "string")
+
+def _render(value: Any, indent: int) -> str:
+    pad = "  " * indent
+    if isinstance(value, dict):
+        body = ",\n".join(f'{pad}  {json.dumps(k)}: {_render(v, indent + 1)}' for k, v in value.items())
+        return "{\n" + body + "\n" + pad + "}"
+    if isinstance(value, list) and value and isinstance(value[0], dict):
+        return "[\n" + pad + "  " + json.dumps(value[0], ensure_ascii=False) + "\n" + pad + "]"
+    return json.dumps(value, ensure_ascii=False)
+
+def schema_sketch(schema: Dict[str, Any] = RECORD_SCHEMA) -> str:
+    """Human-readable shape of the schema, as shown to the model in the system prompt."""
+    return _render(_sketch_value(schema), 0)
+
+SCHEMA_JSON = schema_sketch()
+
+
+# ---------------- Provider structured-output schemas ----------------
+def openai_response_format(schema: Dict[str, Any] = RECORD_SCHEMA) -> Dict[str, Any]:
+    """`response_format` for OpenAI chat completions (strict JSON schema)."""
+    name = "jd_records" if "records" in schema["properties"] else "jd_record"
+    return {
+        "type": "json_schema",
+        "json_schema": {"name": name, "strict": True, "schema": schema},
+    }
+
+def gemini_response_schema(schema: Dict[str, Any] = RECORD_SCHEMA) -> Dict[str, Any]:
+    """`response_schema` for Gemini (OpenAPI subset: no additionalProperties / pattern)."""
+    def strip(node):
+        if isinstance(node, dict):
+            return {k: strip(v) for k, v in node.items() if k not in ("additionalProperties", "pattern")}
+        if isinstance(node, list):
+            return [strip(v) for v in node]
+        return node
+    return strip(copy.deepcopy(schema))
+
+
+# ---------------- Validator ----------------
+Validator = Callable[[Any, str, List[str]], None]
+
+def compile_validator(node: Dict[str, Any]) -> Validator:
+    """Compile a schema node into a closure that appends error strings for `value` at `path`."""
+    t = node.get("type")
+
+    if t == "object":
+        props = {k: compile_validator(v) for k, v in node.get("properties", {}).items()}
+        required = tuple(node.get("required", ()))
+        closed = node.get("additionalProperties") is False
+
+        def check_object(value, path, errors):
+            if not isinstance(value, dict):
+                errors.append(f"{path or '$'}: expected object")
+                return
+            for k in required:
+                if k not in value:
+                    errors.append(f"{path}.{k}: missing")
+            for k, v in value.items():
+                sub = props.get(k)
+                if sub is not None:
+                    sub(v, f"{path}.{k}", errors)
+                elif closed:
+                    errors.append(f"{path}.{k}: unexpected key")
+        return check_object
+
+    if t == "array":
+        item = compile_validator(node.get("items", {}))
+
+        def check_array(value, path, errors):
+            if not isinstance(value, list):
+                errors.append(f"{path}: expected array")
+                return
+            for i, v in enumerate(value):
+                item(v, f"{path}[{i}]", errors)
+        return check_array
+
+    if t == "string":
+        enum = frozenset(node["enum"]) if "enum" in node else None
+        pattern = re.compile(node["pattern"]) if "pattern" in node else None
+
+        def check_string(value, path, errors):
+            if not isinstance(value, str):
+                errors.append(f"{path}: expected string")
+            elif enum is not None and value not in enum:
+                errors.append(f"{path}: {value!r} not in {sorted(enum)}")
+            elif pattern is not None and not pattern.match(value):
+                errors.append(f"{path}: {value!r} does not match {pattern.pattern}")
+        return check_string
+
+    return lambda value, path, errors: None
+
+_RECORD_VALIDATOR = compile_validator(RECORD_SCHEMA)
+_SAVED_VALIDATOR = compile_validator(SAVED_RECORD_SCHEMA)
+
+def validate_record(record: Any) -> List[str]:
+    """Schema errors of an extracted record (empty list when valid)."""
+    errors: List[str] = []
+    _RECORD_VALIDATOR(record, "", errors)
+    return errors
+
+_ANSWER_VALIDATORS: Dict[int, tuple] = {}  # id(schema) -> (schema, validator)
+
+def validate_answer(obj: Any, schema: Dict[str, Any] = RECORD_SCHEMA) -> List[str]:
+    """Schema errors of a decoded model answer against the schema it was asked for; compact answers must also expand."""
+    if schema is COMPACT_SCHEMA:
+        try:
+            obj = expand_compact(obj)
+        except ValueError as e:
+            return [str(e)]
+        schema = RECORD_SCHEMA
+    hit = _ANSWER_VALIDATORS.get(id(schema))
+    if hit is None:
+        hit = _ANSWER_VALIDATORS[id(schema)] = (schema, compile_validator(schema))
+    errors: List[str] = []
+    hit[1](obj, "", errors)
+    return errors
+
+def validate_saved_record(record: Any) -> List[str]:
+    """Schema errors of a saved line (a record, optionally stamped with its provenance)."""
+    errors: List[str] = []
+    _SAVED_VALIDATOR(record, "", errors)
+    return errors
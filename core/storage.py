@@ -1,8 +1,15 @@
 import json
 import re
-import os
+import threading
+import time
 
-from .vocab import update_vocab_from_record, DEFAULT_PATH
+from .vocab import get_store, journal_lines, record_terms, update_vocab_from_record, DEFAULT_PATH
+from .canonical import get_canonicalizer
+from .schema import expand_compact, validate_record, validate_saved_record
+from .recordstore import RecordStore
+from .metrics import METRICS
+from .filesync import append_together, get_append_log
+from .provenance import FIELD as PROVENANCE_FIELD
 
 _CODEBLOCK_RE = re.compile(
     r"^```(?:json)?\s*(.*?)\s*```$", re.DOTALL | re.IGNORECASE
@@ -16,18 +23,129 @@ def _strip_code_fences(text: str):
         return m.group(1), True
     return text, False
 
-def save_to_jsonl(text: str, path: str) -> None:
-    """save AI's response to jsonl if they are legal json"""
+def expand_compact_text(text: str) -> str:
+    """JSON text of the record encoded by a compact wire answer (schema.COMPACT_SCHEMA); raises ValueError"""
 
     cleaned, _ = _strip_code_fences(text)
-
     try:
         obj = json.loads(cleaned)
     except Exception as e:
         raise ValueError(f"Not legal JSON: {e}")
-    
-    os.makedirs(os.path.dirname(path or "."), exist_ok=True)
-    with open(path, "a", encoding="utf-8") as f:
-        f.write(json.dumps(obj, ensure_ascii=False) + "\n")
+    try:
+        record = expand_compact(obj)
+    except ValueError as e:
+        raise ValueError(f"JSON does not match the compact encoding: {e}")
+    return json.dumps(record, ensure_ascii=False)
+
+def parse_record(text: str, canonicalize: bool = True) -> dict:
+    """parse AI's response into a record; raises ValueError if it is not legal json matching RECORD_SCHEMA"""
+
+    with METRICS.span("parse"):
+        cleaned, _ = _strip_code_fences(text)
+
+        try:
+            obj = json.loads(cleaned)
+        except Exception as e:
+            raise ValueError(f"Not legal JSON: {e}")
+
+        errors = validate_record(obj)
+        if errors:
+            more = f" (+{len(errors) - 5} more)" if len(errors) > 5 else ""
+            raise ValueError(f"JSON does not match schema: {'; '.join(errors[:5])}{more}")
+
+    # map skill names / degrees / majors onto their vocab forms
+    if canonicalize:
+        with METRICS.span("canonicalize"):
+            get_canonicalizer(DEFAULT_PATH).canonicalize_record(obj)
+    return obj
+
+def _stamped(obj: dict, provenance: dict | None) -> dict:
+    """the record with its provenance stamp; checked against SAVED_RECORD_SCHEMA so every saved line reads back valid"""
+
+    if provenance:
+        obj[PROVENANCE_FIELD] = provenance
+        errors = validate_saved_record(obj)
+        if errors:
+            raise ValueError(f"Stamped record does not match the saved schema: {'; '.join(errors[:5])}")
+    return obj
+
+def save_to_jsonl(text: str, path: str, canonicalize: bool = True, provenance: dict | None = None) -> None:
+    """
+    save AI's response to jsonl if they are legal json and match RECORD_SCHEMA;
+    concurrent saves to the same file (any thread or process) are group-committed under a file lock.
+    `provenance` (see core.provenance) is stored under the record's "provenance" key
+    """
+
+    obj = _stamped(parse_record(text, canonicalize), provenance)
+
+    with METRICS.span("write"):
+        get_append_log(path).append([json.dumps(obj, ensure_ascii=False)])
+
+    with METRICS.span("vocab_update"):
+        update_vocab_from_record(obj, path=DEFAULT_PATH)
+
+class JsonlBuffer:
+    """
+    Buffered save_to_jsonl for the batch path, where results are saved from a single thread
+    and so never group-commit on their own: records are parsed and stamped at once, but their
+    lines and the vocab terms they add are held until `max_records` are pending or `max_seconds`
+    have passed, then written together — record lines and vocab journal lines in one group
+    under both files' locks. A failed write keeps everything buffered for the next attempt;
+    flush() (or close()), which must be called when done, raises if the write still fails.
+    """
+
+    def __init__(self, path: str, max_records: int = 64, max_seconds: float = 1.0, vocab_path: str = DEFAULT_PATH):
+        self.path = path
+        self.max_records = int(max_records)
+        self.max_seconds = float(max_seconds)
+        self._log = get_append_log(path)
+        self._store = get_store(vocab_path)
+        self._lines: list = []
+        self._terms: list = []
+        self._since = time.monotonic()
+        self._lock = threading.Lock()
+
+    def add(self, text: str, canonicalize: bool = True, provenance: dict | None = None) -> None:
+        """Parse and stamp like save_to_jsonl (raising the same ValueError), then buffer."""
+        obj = _stamped(parse_record(text, canonicalize), provenance)
+        line = json.dumps(obj, ensure_ascii=False)
+        with self._lock:
+            with METRICS.span("vocab_update"):
+                # in memory now, so the next prompts see the terms; journaled with the record
+                self._terms.extend(self._store.stage_terms(record_terms(obj)))
+            self._lines.append(line)
+            if len(self._lines) >= self.max_records or time.monotonic() - self._since >= self.max_seconds:
+                try:
+                    self._flush_locked()
+                except OSError:
+                    # not this record's fault; kept buffered, retried on the next flush
+                    METRICS.inc("jd_save_flush_failed_total")
+
+    def flush(self) -> None:
+        with self._lock:
+            self._flush_locked()
+
+    close = flush
+
+    def _flush_locked(self) -> None:
+        self._since = time.monotonic()
+        if not self._lines and not self._terms:
+            return
+        # journal first: if the record write then fails, the retry re-journals terms (replay
+        # dedupes them) rather than duplicating record lines
+        with METRICS.span("write"):
+            append_together([(self._store.journal, journal_lines(self._terms)), (self._log, self._lines)])
+        if self._terms:
+            self._store.journaled(len(self._terms))
+        self._lines, self._terms = [], []
+
+def save_to_store(text: str, store: RecordStore, jd_text: str | None = None, canonicalize: bool = True,
+                  provenance: dict | None = None) -> str:
+    """save AI's response to a RecordStore, keyed by the JD's content hash; returns the key"""
 
-    update_vocab_from_record(obj, path=DEFAULT_PATH)
\ No newline at end of file
+    obj = _stamped(parse_record(text, canonicalize), provenance)
+    with METRICS.span("write"):
+        key = store.append(obj, jd_text=jd_text)
+    with METRICS.span("vocab_update"):
+        update_vocab_from_record(obj, path=DEFAULT_PATH)
+    return key
@@ -0,0 +1,159 @@
+# core/streaming.py
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+from .schema import RECORD_SCHEMA
+
+# characters of an offending preamble quoted in StreamAborted
+MAX_PREAMBLE = 32
+
+
+class StreamAborted(ValueError):
+    """The streamed output diverged from the record schema; the generation should be cancelled."""
+
+
+def _schema_at(path: Tuple) -> Optional[Dict[str, Any]]:
+    node = RECORD_SCHEMA
+    for part in path:
+        if node is None:
+            return None
+        if isinstance(part, int):
+            node = node.get("items")
+        else:
+            node = (node.get("properties") or {}).get(part)
+    return node
+
+
+class _Frame:
+    __slots__ = ("kind", "path", "start", "key", "expect_key", "index")
+
+    def __init__(self, kind: str, path: Tuple, start: int):
+        self.kind = kind          # "obj" | "arr"
+        self.path = path
+        self.start = start        # buffer offset of the opening bracket
+        self.key = None           # obj: last key read
+        self.expect_key = True    # obj: next string is a key
+        self.index = 0            # arr: index of the current element
+
+
+class IncrementalRecordParser:
+    """
+    Consumes a streamed record chunk by chunk and emits events as soon as parts complete:
+    ("skill", "required"|"preferred", item), ("meta", obj), ("education", obj), ("done", record).
+    Raises StreamAborted on a prose preamble or a key the schema does not allow.
+    A leading ```json fence is tolerated.
+    """
+
+    def __init__(self):
+        self.buf = ""
+        self._pos = 0               # next buffer offset to scan
+        self._started = False       # seen the opening '{'
+        self._done = False
+        self._stack: List[_Frame] = []
+        self._in_string = False
+        self._escape = False
+        self._str_start = 0
+        self._root_start = 0
+
+    def feed(self, chunk: str) -> List[tuple]:
+        self.buf += chunk or ""
+        events: List[tuple] = []
+        if self._done:
+            return events
+        if not self._started and not self._find_start():
+            return events
+
+        buf = self.buf
+        i = self._pos
+        n = len(buf)
+        while i < n:
+            c = buf[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                    top = self._stack[-1] if self._stack else None
+                    if top is not None and top.kind == "obj" and top.expect_key:
+                        top.key = json.loads(buf[self._str_start:i + 1])
+                        top.expect_key = False
+                        self._check_key(top)
+            elif c == '"':
+                self._in_string = True
+                self._str_start = i
+            elif c == "{" or c == "[":
+                self._stack.append(_Frame("obj" if c == "{" else "arr", self._child_path(), i))
+            elif c == "}" or c == "]":
+                if not self._stack:
+                    raise StreamAborted(f"unbalanced {c!r} in output")
+                frame = self._stack.pop()
+                self._emit(frame, buf[frame.start:i + 1], events)
+                if not self._stack:
+                    self._done = True
+                    self._pos = i + 1
+                    return events
+            elif c == "," and self._stack:
+                top = self._stack[-1]
+                if top.kind == "obj":
+                    top.expect_key = True
+                else:
+                    top.index += 1
+            i += 1
+        self._pos = i
+        return events
+
+    # ------ internals ------
+    def _find_start(self) -> bool:
+        head = self.buf.lstrip()
+        offset = len(self.buf) - len(head)
+        if head.startswith("```"):
+            nl = head.find("\n")
+            if nl < 0:
+                return False
+            rest = head[nl + 1:]
+            offset += nl + 1 + (len(rest) - len(rest.lstrip()))
+            head = rest.lstrip()
+        if not head:
+            return False
+        if head[0] != "{":
+            if head[0] == "`" and len(head) < 3:
+                return False
+            raise StreamAborted(f"output does not start with a JSON object: {head[:MAX_PREAMBLE]!r}")
+        self._started = True
+        self._pos = offset
+        self._root_start = offset
+        return True
+
+    def _child_path(self) -> Tuple:
+        if not self._stack:
+            return ()
+        top = self._stack[-1]
+        return top.path + ((top.key,) if top.kind == "obj" else (top.index,))
+
+    def _check_key(self, frame: _Frame) -> None:
+        node = _schema_at(frame.path)
+        if node is None or node.get("type") != "object":
+            return
+        if node.get("additionalProperties") is False and frame.key not in (node.get("properties") or {}):
+            where = ".".join(str(p) for p in frame.path) or "$"
+            raise StreamAborted(f"unexpected key {frame.key!r} at {where}")
+
+    def _emit(self, frame: _Frame, text: str, events: List[tuple]) -> None:
+        path = frame.path
+        if len(path) == 3 and path[0] == "skills" and isinstance(path[2], int):
+            events.append(("skill", path[1], json.loads(text)))
+        elif path in (("meta",), ("education",)):
+            events.append((path[0], json.loads(text)))
+        elif path == ():
+            events.append(("done", json.loads(text)))
+
+    @property
+    def done(self) -> bool:
+        return self._done
+
+    @property
+    def text(self) -> str:
+        """The JSON text consumed so far, without any code fence."""
+        return self.buf[self._root_start:self._pos] if self._started else ""
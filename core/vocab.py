@@ -1,7 +1,11 @@
 # core/vocab.py
+import atexit
 import json
 import os
-from typing import Any, Dict, List
+import threading
+from typing import Any, Dict, List, Set
+
+from .filesync import file_lock, get_append_log
 
 DEFAULT_PATH = "data/vocab.json"
 CATEGORIES = ["company", "title", "skills", "degrees", "majors"]
@@ -9,55 +13,199 @@ CATEGORIES = ["company", "title", "skills", "degrees", "majors"]
 def _normalize(s: str) -> str:
     return (s or "").strip().lower()
 
+def journal_path(path: str) -> str:
+    return path + ".journal"
+
+def _read_journal(path: str):
+    """Yield (category, term) pairs appended since the last compaction."""
+    jpath = journal_path(path)
+    if not os.path.exists(jpath):
+        return
+    with open(jpath, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                cat, term = json.loads(line)
+            except ValueError:
+                continue  # torn last line after a crash
+            yield cat, term
+
+def journal_lines(pairs) -> List[str]:
+    return [json.dumps([c, v], ensure_ascii=False) for c, v in pairs]
+
 def load_vocab(path: str = DEFAULT_PATH) -> Dict[str, List[str]]:
-    if not os.path.exists(path):
-        return {k: [] for k in CATEGORIES}
-    with open(path, "r", encoding="utf-8") as f:
-        data = json.load(f)
+    data: Dict[str, Any] = {}
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
     # keep only known categories; normalize + dedupe
     out: Dict[str, List[str]] = {k: [] for k in CATEGORIES}
+    seen: Dict[str, Set[str]] = {k: set() for k in CATEGORIES}
+
+    def add(cat, item):
+        v = _normalize(item)
+        if cat in seen and v and v not in seen[cat]:
+            seen[cat].add(v)
+            out[cat].append(v)
+
     for k in CATEGORIES:
-        seen = set()
         for item in (data.get(k) or []):
-            v = _normalize(item)
-            if v and v not in seen:
-                seen.add(v)
-                out[k].append(v)
+            add(k, item)
+    for cat, term in _read_journal(path):
+        add(cat, term)
     return out
 
 def save_vocab(vocab: Dict[str, List[str]], path: str = DEFAULT_PATH) -> None:
-    os.makedirs(os.path.dirname(path or "."), exist_ok=True)
-    with open(path, "w", encoding="utf-8") as f:
+    """Write a full snapshot atomically (temp file + rename), under the vocab's file lock."""
+    with file_lock(path):
+        _write_snapshot(vocab, path)
+
+def _write_snapshot(vocab: Dict[str, List[str]], path: str) -> None:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.tmp.{os.getpid()}"
+    with open(tmp, "w", encoding="utf-8") as f:
         json.dump(vocab, f, ensure_ascii=False, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
 
-def update_vocab_from_record(record: Dict[str, Any], path: str = DEFAULT_PATH) -> None:
+
+class VocabStore:
     """
-    Pull terms from a single extracted record and append to vocab.json (deduped, lowercased).
-    Expected record schema matches your extractor: meta/company, meta/title,
-    skills.required/preferred[].name, education.degrees/majors[].
+    In-memory vocab (ordered lists + membership sets) loaded once per process.
+    New terms are appended to `<path>.journal`; the JSON snapshot is rewritten
+    only on compact(), every `compact_every` journaled terms, and at exit.
+
+    Journal appends from concurrent threads are group-committed, and journal writes and
+    compaction take the same file lock, so several processes can share one vocab:
+    compaction first folds in whatever the others have journaled.
     """
-    vocab = load_vocab(path)
 
-    def add(cat: str, value: str):
-        v = _normalize(value)
-        if v and v not in vocab[cat]:
-            vocab[cat].append(v)
+    def __init__(self, path: str = DEFAULT_PATH, compact_every: int = 5000):
+        self.path = path
+        self.compact_every = int(compact_every)
+        self.vocab = load_vocab(path)
+        self._sets: Dict[str, Set[str]] = {k: set(v) for k, v in self.vocab.items()}
+        self._journaled = sum(1 for _ in _read_journal(path))
+        self._journal = get_append_log(journal_path(path), lock_path=path)
+        self._lock = threading.Lock()
+        self.version = 0  # bumped on every new term
+
+    def __contains__(self, item) -> bool:
+        cat, term = item
+        return _normalize(term) in self._sets.get(cat, ())
+
+    def terms(self, cat: str) -> List[str]:
+        return self.vocab[cat]
+
+    def add_terms(self, pairs) -> List[tuple]:
+        """Add (category, term) pairs; returns the pairs that were new."""
+        new = self.stage_terms(pairs)
+        if new:
+            self._journal.append(journal_lines(new))
+            self.journaled(len(new))
+        return new
+
+    def stage_terms(self, pairs) -> List[tuple]:
+        """
+        Add pairs in memory only and return the new ones; the caller journals them
+        (journal_lines() to self.journal, e.g. grouped with other writes) and then calls journaled().
+        """
+        with self._lock:
+            return self._add_locked(pairs)
+
+    @property
+    def journal(self):
+        return self._journal
 
+    def journaled(self, n: int) -> None:
+        with self._lock:
+            self._journaled += n
+            if self._journaled >= self.compact_every:
+                self._compact_locked()
+
+    def _add_locked(self, pairs) -> List[tuple]:
+        new = []
+        for cat, term in pairs:
+            v = _normalize(term)
+            if cat in self._sets and v and v not in self._sets[cat]:
+                self._sets[cat].add(v)
+                self.vocab[cat].append(v)
+                new.append((cat, v))
+        if new:
+            self.version += 1
+        return new
+
+    def add_record(self, record: Dict[str, Any]) -> List[tuple]:
+        return self.add_terms(record_terms(record))
+
+    def compact(self) -> None:
+        with self._lock:
+            self._compact_locked()
+
+    def _compact_locked(self) -> None:
+        if not self._journaled:
+            return
+        with file_lock(self.path):
+            # other processes may have journaled or compacted since we loaded; keep their terms too
+            # (appended, since the lists are append-only for the retrieval / canonical indexes)
+            disk = load_vocab(self.path)
+            self._add_locked((cat, term) for cat in CATEGORIES for term in disk[cat])
+            _write_snapshot(self.vocab, self.path)
+            # the snapshot now holds every journaled term
+            try:
+                os.remove(journal_path(self.path))
+            except FileNotFoundError:
+                pass
+        self._journaled = 0
+
+
+_STORES: Dict[str, VocabStore] = {}
+_STORES_LOCK = threading.Lock()
+
+def get_store(path: str = DEFAULT_PATH) -> VocabStore:
+    """Process-wide VocabStore for `path`, compacted at interpreter exit."""
+    with _STORES_LOCK:
+        store = _STORES.get(path)
+        if store is None:
+            store = _STORES[path] = VocabStore(path)
+        return store
+
+@atexit.register
+def _compact_all() -> None:
+    for store in list(_STORES.values()):
+        try:
+            store.compact()
+        except OSError:
+            pass
+
+def record_terms(record: Dict[str, Any]) -> List[tuple]:
+    """
+    (category, term) pairs of a single extracted record.
+    Expected record schema matches your extractor: meta/company, meta/title,
+    skills.required/preferred[].name, education.degrees/majors[].
+    """
+    out = []
     meta = record.get("meta") or {}
-    if meta.get("company"): add("company", meta["company"])
-    if meta.get("title"):   add("title", meta["title"])
+    if meta.get("company"): out.append(("company", meta["company"]))
+    if meta.get("title"):   out.append(("title", meta["title"]))
 
     skills = record.get("skills") or {}
     for bucket in ("required", "preferred"):
         for it in (skills.get(bucket) or []):
             name = (it or {}).get("name")
             if name:
-                add("skills", name)
+                out.append(("skills", name))
 
     edu = record.get("education") or {}
     for d in (edu.get("degrees") or []):
-        add("degrees", d)
+        out.append(("degrees", d))
     for m in (edu.get("majors")  or []):
-        add("majors", m)
+        out.append(("majors", m))
+    return out
 
-    save_vocab(vocab, path)
+def update_vocab_from_record(record: Dict[str, Any], path: str = DEFAULT_PATH) -> None:
+    """
+    Pull terms from a single extracted record into the vocab (deduped, lowercased).
+    New terms go to the append-only journal; see VocabStore.
+    """
+    get_store(path).add_record(record)